@@ -0,0 +1,206 @@
+"""
+Réplicas distribuidas entre varias máquinas por TCP
+
+Un coordinador parte el lote en unidades (todas las configuraciones sobre un rango
+de réplicas) y los trabajadores, iniciados con `python main.py --worker host:puerto`,
+las piden por un socket TCP simple (una línea JSON por mensaje), las simulan con el
+motor rápido y devuelven los arrays comprimidos. Si un trabajador se cae o no
+responde, su unidad vuelve a la cola. Cada réplica depende solo de la semilla y de
+su índice, así que el resultado es idéntico a ejecutar_lote() sin importar cuántos
+trabajadores participen ni en qué orden terminen.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import socket
+import time
+import zlib
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from lote import Configuracion, ResultadoLote, _crear_metricas, simular_replicas
+from motor_eventos import ParametrosSimulacion
+
+
+def separar_direccion(texto: str, host_por_defecto: str = '127.0.0.1') -> Tuple[str, int]:
+    """Convierte 'host:puerto' o 'puerto' en (host, puerto)"""
+    host, _, puerto = texto.rpartition(':')
+    return host or host_por_defecto, int(puerto)
+
+
+def codificar_array(valores: np.ndarray) -> dict:
+    return {'dtype': str(valores.dtype), 'forma': list(valores.shape),
+            'datos': base64.b64encode(zlib.compress(valores.tobytes())).decode('ascii')}
+
+
+def decodificar_array(datos: dict) -> np.ndarray:
+    crudo = zlib.decompress(base64.b64decode(datos['datos']))
+    return np.frombuffer(crudo, dtype=datos['dtype']).reshape(datos['forma'])
+
+
+def _mensaje(datos: dict) -> bytes:
+    return json.dumps(datos, separators=(',', ':')).encode('utf-8') + b"\n"
+
+
+class Coordinador:
+    """Reparte las unidades de un lote entre los trabajadores conectados y junta los resultados"""
+
+    def __init__(self, configuraciones: List[Configuracion], replicas: int, semilla: Optional[int],
+                 parametros: Optional[ParametrosSimulacion] = None, tamano_unidad: int = 25,
+                 timeout_unidad: float = 600.0,
+                 callback_progreso: Optional[Callable[[int, int], None]] = None,
+                 muestreo: str = 'independiente'):
+        self.configuraciones = list(configuraciones)
+        self.replicas = replicas
+        # Sin semilla se sortea una acá: todos los trabajadores deben usar la misma
+        self.semilla = semilla if semilla is not None else np.random.SeedSequence().entropy
+        self.parametros = parametros or ParametrosSimulacion()
+        self.muestreo = muestreo
+        self.timeout_unidad = timeout_unidad
+        self.callback_progreso = callback_progreso
+        self.unidades = [(desde, min(desde + tamano_unidad, replicas)) for desde in range(0, replicas, tamano_unidad)]
+        self.pendientes = deque(range(len(self.unidades)))
+        self.resultados: Dict[int, Dict[str, np.ndarray]] = {}
+        self.trabajadores = 0
+        self.reasignadas = 0
+        self.puerto: Optional[int] = None  # Puerto en que escucha (el real, si se pidió el 0)
+
+    def terminado(self) -> bool:
+        return len(self.resultados) == len(self.unidades)
+
+    async def tomar_unidad(self) -> Optional[int]:
+        """Próxima unidad pendiente; espera si todas están en curso (alguna puede volver a la cola)"""
+        async with self.cambios:
+            while not self.pendientes and not self.terminado():
+                await self.cambios.wait()
+            return None if self.terminado() else self.pendientes.popleft()
+
+    async def devolver_unidad(self, indice: int):
+        async with self.cambios:
+            if indice not in self.resultados:
+                self.pendientes.appendleft(indice)
+                self.reasignadas += 1
+            self.cambios.notify_all()
+
+    async def guardar_resultado(self, indice: int, metricas: Dict[str, np.ndarray]):
+        async with self.cambios:
+            if indice not in self.resultados:
+                self.resultados[indice] = metricas
+                if self.callback_progreso is not None:
+                    completadas = sum(hasta - desde for desde, hasta in (self.unidades[i] for i in self.resultados))
+                    self.callback_progreso(completadas, self.replicas)
+            self.cambios.notify_all()
+
+    async def atender_trabajador(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        nombre = writer.get_extra_info('peername')
+        indice = None
+        self.trabajadores += 1
+        try:
+            saludo = json.loads(await reader.readline() or b'{}')
+            if saludo.get('tipo') != 'listo':
+                return
+            nombre = saludo.get('nombre', nombre)
+            print(f"🔌 Trabajador conectado: {nombre}")
+            while True:
+                indice = await self.tomar_unidad()
+                if indice is None:
+                    break
+                desde, hasta = self.unidades[indice]
+                writer.write(_mensaje({'tipo': 'unidad', 'indice': indice, 'desde': desde, 'hasta': hasta,
+                                       'semilla': self.semilla, 'configuraciones': self.configuraciones,
+                                       'parametros': self.parametros.a_dict(),
+                                       'replicas': self.replicas, 'muestreo': self.muestreo}))
+                await writer.drain()
+
+                linea = await asyncio.wait_for(reader.readline(), self.timeout_unidad)
+                if not linea:
+                    raise ConnectionError("conexión cerrada")
+                respuesta = json.loads(linea)
+                if respuesta.get('tipo') != 'resultado' or respuesta.get('indice') != indice:
+                    raise ConnectionError(f"respuesta inesperada: {respuesta.get('tipo')}")
+                metricas = {nombre_metrica: decodificar_array(datos)
+                            for nombre_metrica, datos in respuesta['metricas'].items()}
+                await self.guardar_resultado(indice, metricas)
+                indice = None
+            writer.write(_mensaje({'tipo': 'fin'}))
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, KeyError) as e:
+            print(f"⚠️  Trabajador {nombre} perdido ({e}); su unidad vuelve a la cola")
+        finally:
+            if indice is not None:
+                await self.devolver_unidad(indice)
+            self.trabajadores -= 1
+            writer.close()
+
+    async def ejecutar(self, host: str, puerto: int) -> ResultadoLote:
+        self.cambios = asyncio.Condition()
+        servidor = await asyncio.start_server(self.atender_trabajador, host, puerto)
+        self.puerto = servidor.sockets[0].getsockname()[1]
+        print(f"📡 Coordinador en {host}:{self.puerto}: {len(self.unidades)} unidades de trabajo, "
+              f"esperando trabajadores (python main.py --worker HOST:{self.puerto})")
+        async with self.cambios:
+            await self.cambios.wait_for(self.terminado)
+        servidor.close()
+        await servidor.wait_closed()
+
+        # Se arma por índice de unidad: el resultado no depende del orden de llegada
+        metricas = _crear_metricas(len(self.configuraciones), self.replicas)
+        for indice, (desde, hasta) in enumerate(self.unidades):
+            for nombre, valores in self.resultados[indice].items():
+                metricas[nombre][:, desde:hasta] = valores
+        return ResultadoLote(self.configuraciones, self.semilla, metricas, self.muestreo)
+
+
+def ejecutar_lote_distribuido(configuraciones: List[Configuracion], replicas: int, semilla: Optional[int],
+                              direccion: str, parametros: Optional[ParametrosSimulacion] = None,
+                              tamano_unidad: int = 25,
+                              callback_progreso: Optional[Callable[[int, int], None]] = None,
+                              muestreo: str = 'independiente') -> ResultadoLote:
+    """Como ejecutar_lote, pero repartiendo las réplicas entre trabajadores remotos"""
+    host, puerto = separar_direccion(direccion)
+    coordinador = Coordinador(configuraciones, replicas, semilla, parametros, tamano_unidad,
+                              callback_progreso=callback_progreso, muestreo=muestreo)
+    resultado = asyncio.run(coordinador.ejecutar(host, puerto))
+    if coordinador.reasignadas:
+        print(f"🔁 Unidades reasignadas por trabajadores perdidos: {coordinador.reasignadas}")
+    return resultado
+
+
+def ejecutar_trabajador(direccion: str, reintentos: int = 30, espera_reintento: float = 2.0) -> int:
+    """Se conecta al coordinador y procesa unidades hasta que no queden; devuelve cuántas procesó"""
+    host, puerto = separar_direccion(direccion)
+    nombre = f"{socket.gethostname()}-{os.getpid()}"
+
+    for intento in range(reintentos):
+        try:
+            conexion = socket.create_connection((host, puerto))
+            break
+        except OSError:
+            if intento == reintentos - 1:
+                raise
+            time.sleep(espera_reintento)  # El coordinador todavía no arrancó
+
+    procesadas = 0
+    with conexion, conexion.makefile('rwb') as canal:
+        canal.write(_mensaje({'tipo': 'listo', 'nombre': nombre}))
+        canal.flush()
+        print(f"🔧 Trabajador {nombre} conectado a {host}:{puerto}")
+        for linea in canal:
+            pedido = json.loads(linea)
+            if pedido['tipo'] == 'fin':
+                break
+            configuraciones = [c if isinstance(c, int) else tuple(c) for c in pedido['configuraciones']]
+            parametros = ParametrosSimulacion.desde_dict(pedido['parametros'])
+            metricas = simular_replicas(configuraciones, pedido['semilla'], pedido['desde'], pedido['hasta'],
+                                        parametros, pedido.get('replicas'),
+                                        pedido.get('muestreo', 'independiente'))
+            canal.write(_mensaje({'tipo': 'resultado', 'indice': pedido['indice'],
+                                  'metricas': {nombre_metrica: codificar_array(valores)
+                                               for nombre_metrica, valores in metricas.items()}}))
+            canal.flush()
+            procesadas += 1
+    print(f"✅ Trabajador {nombre}: {procesadas} unidades procesadas")
+    return procesadas
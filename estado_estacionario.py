@@ -0,0 +1,179 @@
+"""
+Operación continua y análisis de estado estacionario
+
+En lugar de repetir miles de mañanas de 4 horas (cada una con su arranque en vacío
+y su vaciado después del cierre), simula una única corrida muy larga con el local
+siempre abierto y la corta en lotes. El período de calentamiento se detecta con
+MSER-5 y los intervalos de confianza salen de las medias por lotes no solapados.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+from scipy import stats
+
+from motor_eventos import ParametrosSimulacion
+from simulador import crear_generadores
+
+
+@dataclass
+class IntervaloConfianza:
+    media: float
+    semiancho: float
+    nivel: float = 0.95
+
+    @property
+    def inferior(self) -> float:
+        return self.media - self.semiancho
+
+    @property
+    def superior(self) -> float:
+        return self.media + self.semiancho
+
+
+@dataclass
+class ResultadoEstacionario:
+    """Medidas de largo plazo con operación continua para una cantidad fija de boxes"""
+    boxes: int
+    horas_simuladas: float
+    horas_calentamiento: float
+    num_lotes: int
+    clientes: int
+    perdidos_por_hora: IntervaloConfianza
+    proporcion_perdidos: IntervaloConfianza
+    espera_media_seg: IntervaloConfianza
+    costo_por_manana: IntervaloConfianza  # Boxes + pérdidas de 4 horas al ritmo estacionario
+    calentamiento_confiable: bool = True  # False si MSER-5 llegó al límite de la búsqueda
+
+
+def simular_operacion_continua(boxes: int, duracion: int, semilla=None,
+                               parametros: Optional[ParametrosSimulacion] = None) -> Dict[str, np.ndarray]:
+    """Simula 'duracion' segundos sin cierre y devuelve llegada, espera y abandono de cada cliente
+
+    Mismas reglas que la mañana (llegada Bernoulli por segundo, cola FIFO, abandono
+    a los TIEMPO_MAX_ESPERA, atención normal de mínimo 30 s), pero sin hora de cierre.
+    Las llegadas se sortean como saltos geométricos entre segundos con llegada.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    if parametros.perfil_llegadas is not None:
+        raise ValueError("La operación continua necesita una tasa de llegada constante (sin perfil)")
+    rng_llegadas, rng_atencion = crear_generadores(semilla)
+    p = parametros.prob_llegada
+
+    tramos = []
+    ultimo = -1
+    while ultimo < duracion:
+        saltos = rng_llegadas.geometric(p, int(duracion * p * 1.1) + 100)
+        llegadas = ultimo + np.cumsum(saltos)
+        tramos.append(llegadas)
+        ultimo = llegadas[-1]
+    llegadas = np.concatenate(tramos)
+    llegadas = llegadas[llegadas < duracion]
+
+    normales = rng_atencion.normal(parametros.media_atencion, parametros.desvio_atencion, len(llegadas))
+    atenciones = np.maximum(normales.astype(np.int64), 30).tolist()
+
+    # Boxes idénticos y cola FIFO: el cliente toma el box que se libera primero
+    libres = [0] * boxes
+    paciencia = parametros.tiempo_max_espera
+    esperas = np.empty(len(llegadas), dtype=np.int64)
+    perdidos = np.zeros(len(llegadas), dtype=bool)
+    servidos = 0
+    for i, llegada in enumerate(llegadas.tolist()):
+        inicio = max(llegada, libres[0])
+        if inicio > llegada + paciencia:
+            perdidos[i] = True
+            esperas[i] = paciencia
+            continue
+        heapq.heapreplace(libres, inicio + atenciones[servidos])
+        servidos += 1
+        esperas[i] = inicio - llegada
+
+    return {'llegadas': llegadas, 'esperas': esperas, 'perdidos': perdidos}
+
+
+def mser5(serie: np.ndarray) -> int:
+    """Cantidad de observaciones iniciales a descartar según MSER-5
+
+    Agrupa la serie de a 5 y elige el corte d que minimiza la varianza de la media
+    de lo que queda, sum((x - media)^2) / (n - d)^2, sin pasar de la mitad de la serie.
+    """
+    n = len(serie) // 5
+    if n < 2:
+        return 0
+    grupos = serie[:n * 5].reshape(n, 5).mean(axis=1)
+    # Sumas desde el final para evaluar todos los cortes de una vez
+    suma = np.cumsum(grupos[::-1])[::-1]
+    suma_cuadrados = np.cumsum((grupos ** 2)[::-1])[::-1]
+    restantes = np.arange(n, 0, -1)
+    medias = suma / restantes
+    mser = (suma_cuadrados - restantes * medias ** 2) / restantes ** 2
+    return int(np.argmin(mser[:n // 2 + 1])) * 5
+
+
+def medias_por_lotes(serie: np.ndarray, num_lotes: int, nivel: float = 0.95) -> IntervaloConfianza:
+    """Intervalo t de la media a partir de lotes no solapados de igual tamaño"""
+    tamano = len(serie) // num_lotes
+    if tamano == 0:
+        raise ValueError("La corrida es demasiado corta para la cantidad de lotes pedida")
+    lotes = serie[len(serie) - tamano * num_lotes:].reshape(num_lotes, tamano).mean(axis=1)
+    semiancho = stats.t.ppf((1 + nivel) / 2, num_lotes - 1) * lotes.std(ddof=1) / np.sqrt(num_lotes)
+    return IntervaloConfianza(float(lotes.mean()), float(semiancho), nivel)
+
+
+def analizar_estado_estacionario(boxes: int, horas: float = 1000, semilla=None,
+                                 parametros: Optional[ParametrosSimulacion] = None, num_lotes: int = 20,
+                                 intervalo: int = 600, nivel: float = 0.95) -> ResultadoEstacionario:
+    """Corrida larga de operación continua con calentamiento MSER-5 e intervalos por medias de lotes
+
+    La corrida se resume en intervalos de 'intervalo' segundos (llegadas, perdidos y
+    espera acumulada por intervalo); MSER-5 se aplica a la espera por intervalo, que
+    es la serie más afectada por arrancar con el local vacío.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    duracion = int(horas * 3600)
+    clientes = simular_operacion_continua(boxes, duracion, semilla, parametros)
+
+    num_intervalos = duracion // intervalo
+    indice = clientes['llegadas'] // intervalo
+    dentro = indice < num_intervalos
+    indice = indice[dentro]
+    llegadas = np.bincount(indice, minlength=num_intervalos).astype(float)
+    perdidos = np.bincount(indice, weights=clientes['perdidos'][dentro], minlength=num_intervalos)
+    esperas = np.bincount(indice, weights=clientes['esperas'][dentro], minlength=num_intervalos)
+
+    descarte = mser5(esperas)
+    confiable = descarte < (num_intervalos // 5) // 2 * 5
+    llegadas, perdidos, esperas = llegadas[descarte:], perdidos[descarte:], esperas[descarte:]
+    if len(llegadas) < num_lotes * 5:
+        raise ValueError("La corrida es demasiado corta: aumentar las horas o reducir los lotes")
+
+    # Con lotes de igual duración, las razones se estiman lote a lote
+    tamano = len(llegadas) // num_lotes
+    usados = slice(len(llegadas) - tamano * num_lotes, None)
+    por_lote = lambda serie: serie[usados].reshape(num_lotes, tamano).sum(axis=1)
+    llegadas_lote, perdidos_lote, esperas_lote = por_lote(llegadas), por_lote(perdidos), por_lote(esperas)
+
+    perdidos_por_hora = medias_por_lotes(perdidos * 3600 / intervalo, num_lotes, nivel)
+    proporcion = medias_por_lotes(perdidos_lote / np.maximum(llegadas_lote, 1), num_lotes, nivel)
+    espera_media = medias_por_lotes(esperas_lote / np.maximum(llegadas_lote, 1), num_lotes, nivel)
+    horas_manana = parametros.duracion / 3600
+    costo = medias_por_lotes(boxes * parametros.costo_box +
+                             perdidos * 3600 / intervalo * horas_manana * parametros.perdida_cliente,
+                             num_lotes, nivel)
+
+    return ResultadoEstacionario(
+        boxes=boxes,
+        horas_simuladas=duracion / 3600,
+        horas_calentamiento=descarte * intervalo / 3600,
+        num_lotes=num_lotes,
+        clientes=len(clientes['llegadas']),
+        perdidos_por_hora=perdidos_por_hora,
+        proporcion_perdidos=proporcion,
+        espera_media_seg=espera_media,
+        costo_por_manana=costo,
+        calentamiento_confiable=confiable,
+    )
@@ -1,13 +1,27 @@
+import os
 import pygame
 import sys
 import math
-from typing import List, Tuple
-from simulador import SimuladorAtencion, ClienteEstado
+import time
+import queue
+import threading
+from typing import List, Optional, Tuple
+from simulador import SimuladorAtencion, ClienteEstado, ReproductorTraza
 import cv2
 import numpy as np
 
+def frames_de_render(tiempo_final: int, velocidad: float, fps: float) -> Tuple[int, int]:
+    """Segundos simulados por frame y total de frames del render de una traza a esa velocidad"""
+    segundos_por_frame = max(1, int(round(60 * velocidad / fps)))
+    return segundos_por_frame, -(-tiempo_final // segundos_por_frame) + 1
+
+
 class InterfazVisual:
-    def __init__(self, simulador: SimuladorAtencion, velocidad: int = 1):
+    def __init__(self, simulador: SimuladorAtencion, velocidad: int = 1, headless: bool = False):
+        # Sin ventana: SDL dibuja en memoria (servidores sin display)
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
         pygame.init()
         
         # Configuración de pantalla (aumentar altura para evitar superposiciones)
@@ -28,6 +42,11 @@ class InterfazVisual:
         self.NARANJA = (255, 165, 0)
         self.MORADO = (128, 0, 128)  # Color más contrastante para tiempo extra
         
+        # Animación: la pantalla se dibuja a FPS fijos y la velocidad define cuántos
+        # segundos simulados avanza cada segundo real (1x = 60 s simulados por segundo)
+        self.FPS_PANTALLA = 60
+        self.VELOCIDADES = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, math.inf]
+        
         # Fuentes
         self.fuente_grande = pygame.font.Font(None, 42)
         self.fuente_mediana = pygame.font.Font(None, 28)
@@ -46,18 +65,12 @@ class InterfazVisual:
         # Posiciones de elementos
         self.setup_posiciones()
         
-        self.simulador = simulador
-        self.velocidad = velocidad
-        self.tiempo_actual = 0
-        self.indice_evento = 0
-        
-        # Para grabar video
-        self.grabando = False
-        self.frames = []
-        self.frame_counter = 0  # Contador para limitar frames capturados
-        
-        # Posiciones de elementos
-        self.setup_posiciones()
+        # Caché de render: textos ya dibujados, capa estática (leyenda, controles,
+        # títulos y marcos) y firma de cada zona dinámica para redibujar solo lo que cambió
+        self.cache_textos = {}
+        self.fondo = None
+        self.firmas_zonas = {}
+        self.redibujar_todo = True
         
     def setup_posiciones(self):
         """Configura las posiciones de los elementos visuales"""
@@ -78,12 +91,13 @@ class InterfazVisual:
         # Área de estado (panel derecho inferior) - ajustado para no superponerse
         self.estado_area = pygame.Rect(770, 380, 400, 440)
         
-    def dibujar_boxes(self):
-        """Dibuja los boxes de atención"""
-        # Título
-        texto = self.fuente_mediana.render("BOXES DE ATENCIÓN", True, self.NEGRO)
-        self.pantalla.blit(texto, (self.boxes_area.x, self.boxes_area.y - 40))  # Más separación
+        # Zona dinámica de boxes y cola (se redibujan juntas porque se superponen
+        # cuando hay dos filas de boxes)
+        self.zona_atencion = pygame.Rect(self.boxes_area.x, self.boxes_area.y,
+                                         6 * (self.box_width + 10), self.cola_area.bottom + 10 - self.boxes_area.y)
         
+    def dibujar_boxes(self):
+        """Dibuja los boxes de atención (el título está en la capa estática)"""
         # Calcular posiciones de boxes (máximo 6 por fila para mejor visualización)
         boxes_por_fila = min(6, self.simulador.num_boxes)
         filas = (self.simulador.num_boxes + boxes_por_fila - 1) // boxes_por_fila
@@ -108,13 +122,13 @@ class InterfazVisual:
             pygame.draw.rect(self.pantalla, self.NEGRO, (x, y, self.box_width, self.box_height), 2)
             
             # Número del box
-            texto = self.fuente_pequena.render(f"Box {i+1}", True, color_texto)
+            texto = self.texto(self.fuente_pequena, f"Box {i+1}", color_texto)
             text_rect = texto.get_rect(center=(x + self.box_width//2, y + 20))
             self.pantalla.blit(texto, text_rect)
             
             # Cliente siendo atendido
             if box.ocupado and box.cliente_actual:
-                texto = self.fuente_pequena.render(f"Cliente {box.cliente_actual.id}", True, color_texto)
+                texto = self.texto(self.fuente_pequena, f"Cliente {box.cliente_actual.id}", color_texto)
                 text_rect = texto.get_rect(center=(x + self.box_width//2, y + 45))
                 self.pantalla.blit(texto, text_rect)
                 
@@ -122,14 +136,14 @@ class InterfazVisual:
                 if box.tiempo_fin_atencion:
                     tiempo_restante = max(0, box.tiempo_fin_atencion - self.tiempo_actual)
                     minutos_restantes = tiempo_restante // 60
-                    texto = self.fuente_pequena.render(f"{minutos_restantes}min", True, color_texto)
+                    texto = self.texto(self.fuente_pequena, f"{minutos_restantes}min", color_texto)
                     text_rect = texto.get_rect(center=(x + self.box_width//2, y + 70))
                     self.pantalla.blit(texto, text_rect)
     
     def dibujar_cola(self):
         """Dibuja la cola de espera"""
         # Título
-        texto = self.fuente_mediana.render(f"COLA DE ESPERA ({len(self.simulador.cola_espera)} clientes)", True, self.NEGRO)
+        texto = self.texto(self.fuente_mediana, f"COLA DE ESPERA ({len(self.simulador.cola_espera)} clientes)", self.NEGRO)
         self.pantalla.blit(texto, (self.cola_area.x, self.cola_area.y - 40))  # Más separación
         
         # Dibujar clientes en cola
@@ -144,13 +158,7 @@ class InterfazVisual:
             y = self.cola_area.y + fila * (cliente_size + 5)
             
             # Color según tiempo de espera
-            tiempo_espera = self.tiempo_actual - cliente.tiempo_llegada
-            if tiempo_espera > 25 * 60:  # Más de 25 minutos
-                color = self.ROJO
-            elif tiempo_espera > 15 * 60:  # Más de 15 minutos
-                color = self.AMARILLO
-            else:
-                color = self.AZUL
+            color = self.color_espera(self.tiempo_actual - cliente.tiempo_llegada)
             
             # Dibujar cliente
             pygame.draw.circle(self.pantalla, color, 
@@ -162,20 +170,26 @@ class InterfazVisual:
             
             # ID del cliente
             if cliente_size >= 25:
-                texto = self.fuente_pequena.render(str(cliente.id), True, self.BLANCO)
+                texto = self.texto(self.fuente_pequena, str(cliente.id), self.BLANCO)
                 text_rect = texto.get_rect(center=(x + cliente_size//2, y + cliente_size//2))
                 self.pantalla.blit(texto, text_rect)
         
-        # Indicar si hay más clientes
+        # Indicar si hay más clientes (a la derecha de la cola, dentro de su zona)
         if len(self.simulador.cola_espera) > 35:
-            texto = self.fuente_pequena.render(f"...y {len(self.simulador.cola_espera) - 35} más", True, self.NEGRO)
-            self.pantalla.blit(texto, (self.cola_area.x, self.cola_area.y + 180))
+            texto = self.texto(self.fuente_pequena, f"...y {len(self.simulador.cola_espera) - 35} más", self.NEGRO)
+            self.pantalla.blit(texto, (self.cola_area.x + clientes_por_fila * (cliente_size + 5) + 10,
+                                       self.cola_area.y))
+    
+    def color_espera(self, tiempo_espera: int) -> Tuple[int, int, int]:
+        """Color del cliente en cola según su tiempo de espera"""
+        if tiempo_espera > 25 * 60:  # Más de 25 minutos
+            return self.ROJO
+        elif tiempo_espera > 15 * 60:  # Más de 15 minutos
+            return self.AMARILLO
+        return self.AZUL
     
     def dibujar_estadisticas(self):
-        """Dibuja las estadísticas en tiempo real"""
-        pygame.draw.rect(self.pantalla, self.GRIS_CLARO, self.stats_area)
-        pygame.draw.rect(self.pantalla, self.NEGRO, self.stats_area, 2)
-        
+        """Dibuja las estadísticas en tiempo real (el marco está en la capa estática)"""
         # Título con estado
         if self.tiempo_actual < self.simulador.DURACION_SIMULACION:
             titulo = "ESTADÍSTICAS EN TIEMPO REAL"
@@ -184,7 +198,7 @@ class InterfazVisual:
             titulo = "ESTADÍSTICAS - PROCESANDO CLIENTES RESTANTES"
             color_titulo = self.MORADO  # Color más visible que naranja
             
-        texto = self.fuente_mediana.render(titulo, True, color_titulo)
+        texto = self.texto(self.fuente_mediana, titulo, color_titulo)
         self.pantalla.blit(texto, (self.stats_area.x + 10, self.stats_area.y + 10))
         
         # Tiempo actual
@@ -192,7 +206,7 @@ class InterfazVisual:
         minutos = (self.tiempo_actual % 3600) // 60
         segundos = self.tiempo_actual % 60
         tiempo_str = f"Hora actual: {horas:02d}:{minutos:02d}:{segundos:02d}"
-        texto = self.fuente_pequena.render(tiempo_str, True, self.NEGRO)
+        texto = self.texto(self.fuente_pequena, tiempo_str, self.NEGRO)
         self.pantalla.blit(texto, (self.stats_area.x + 10, self.stats_area.y + 40))
         
         # Estadísticas actuales
@@ -201,8 +215,8 @@ class InterfazVisual:
             f"Clientes atendidos: {len(self.simulador.clientes_atendidos)}",
             f"Clientes abandonaron: {len(self.simulador.clientes_abandonaron)}",
             f"Clientes en cola: {len(self.simulador.cola_espera)}",
-            f"Boxes ocupados: {sum(1 for box in self.simulador.boxes if box.ocupado)}",
-            f"Boxes libres: {sum(1 for box in self.simulador.boxes if not box.ocupado)}"
+            f"Boxes ocupados: {self.simulador.boxes_ocupados}",
+            f"Boxes libres: {self.simulador.num_boxes - self.simulador.boxes_ocupados}"
         ]
         
         x_col1 = self.stats_area.x + 10
@@ -218,13 +232,11 @@ class InterfazVisual:
             else:
                 x = x_col3
             
-            texto = self.fuente_pequena.render(stat, True, self.NEGRO)
+            texto = self.texto(self.fuente_pequena, stat, self.NEGRO)
             self.pantalla.blit(texto, (x, y))
         
         # Costos estimados
-        costo_boxes = self.simulador.num_boxes * self.simulador.COSTO_BOX
-        costo_perdidas = len(self.simulador.clientes_abandonaron) * self.simulador.PERDIDA_CLIENTE
-        costo_total = costo_boxes + costo_perdidas
+        costo_boxes, costo_perdidas, costo_total = self.simulador.calcular_costos()
         
         y_costos = self.stats_area.y + 180
         costos = [
@@ -234,12 +246,11 @@ class InterfazVisual:
         ]
         
         for i, costo in enumerate(costos):
-            texto = self.fuente_pequena.render(costo, True, self.NEGRO)
+            texto = self.texto(self.fuente_pequena, costo, self.NEGRO)
             self.pantalla.blit(texto, (self.stats_area.x + 10 + i * 200, y_costos))
     
-    def dibujar_leyenda(self):
+    def dibujar_leyenda(self, leyenda_y: int = 50):
         """Dibuja la leyenda de colores"""
-        leyenda_y = 50
         elementos = [
             ("Box libre", self.GRIS_CLARO),
             ("Box ocupado", self.VERDE),
@@ -253,25 +264,20 @@ class InterfazVisual:
             pygame.draw.circle(self.pantalla, color, (x, leyenda_y), 10)
             pygame.draw.circle(self.pantalla, self.NEGRO, (x, leyenda_y), 10, 2)
             
-            texto_render = self.fuente_pequena.render(texto, True, self.NEGRO)
+            texto_render = self.texto(self.fuente_pequena, texto, self.NEGRO)
             self.pantalla.blit(texto_render, (x + 20, leyenda_y - 8))
     
-    def capturar_frame(self, velocidad_animacion):
+    def capturar_frame(self):
         """Captura el frame actual para el video a 15 FPS"""
         if self.grabando:
-            # Calcular intervalo de captura basado en la velocidad de animación
-            # Para 15 FPS constante en el video final, independiente de la velocidad de simulación
-            frames_por_captura = max(1, velocidad_animacion // 15)
+            # La pantalla se dibuja a FPS_PANTALLA: capturar uno de cada N frames
+            # para 15 FPS constantes en el video final
+            frames_por_captura = max(1, self.FPS_PANTALLA // 15)
             
             self.frame_counter += 1
             if self.frame_counter % frames_por_captura == 0:
                 try:
-                    # Convertir superficie de pygame a array numpy
-                    frame = pygame.surfarray.array3d(self.pantalla)
-                    frame = np.rot90(frame)
-                    frame = np.flipud(frame)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                    self.frames.append(frame)
+                    self.frames.append(self.superficie_a_frame())
                     
                     # Limitar cantidad de frames en memoria (aprox 10 minutos a 15fps)
                     max_frames = 9000
@@ -283,6 +289,212 @@ class InterfazVisual:
                     print(f"Error capturando frame: {e}")
                     self.grabando = False
     
+    def superficie_a_frame(self) -> np.ndarray:
+        """Convierte la pantalla actual en un frame BGR para OpenCV"""
+        buffer = pygame.image.tostring(self.pantalla, 'RGB')
+        frame = np.frombuffer(buffer, dtype=np.uint8).reshape(self.ALTO, self.ANCHO, 3)
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    
+    def texto(self, fuente, contenido: str, color) -> pygame.Surface:
+        """Devuelve el texto renderizado, reutilizando la superficie si ya se dibujó antes"""
+        clave = (id(fuente), contenido, color)
+        superficie = self.cache_textos.get(clave)
+        if superficie is None:
+            # Los textos que cambian (horas, contadores) no deben crecer sin límite
+            if len(self.cache_textos) >= 4096:
+                self.cache_textos.clear()
+            superficie = fuente.render(contenido, True, color)
+            self.cache_textos[clave] = superficie
+        return superficie
+    
+    def crear_fondo(self):
+        """Pre-renderiza la capa estática: leyenda, controles, títulos y marcos de paneles"""
+        self.fondo = pygame.Surface((self.ANCHO, self.ALTO))
+        pantalla, self.pantalla = self.pantalla, self.fondo
+        
+        self.pantalla.fill(self.BLANCO)
+        self.dibujar_leyenda()
+        self.dibujar_controles()
+        
+        texto = self.texto(self.fuente_mediana, "BOXES DE ATENCIÓN", self.NEGRO)
+        self.pantalla.blit(texto, (self.boxes_area.x, self.boxes_area.y - 40))
+        
+        for area in (self.stats_area, self.estado_area):
+            pygame.draw.rect(self.pantalla, self.GRIS_CLARO, area)
+            pygame.draw.rect(self.pantalla, self.NEGRO, area, 2)
+        texto = self.texto(self.fuente_mediana, "ESTADO DE SIMULACIÓN", self.NEGRO)
+        self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 10))
+        
+        self.pantalla = pantalla
+    
+    def firma_atencion(self) -> tuple:
+        """Resume lo visible de boxes y cola; si no cambia, la zona no se redibuja"""
+        boxes = tuple((box.cliente_actual.id if box.cliente_actual else None,
+                       max(0, box.tiempo_fin_atencion - self.tiempo_actual) // 60 if box.tiempo_fin_atencion else None)
+                      for box in self.simulador.boxes)
+        cola = tuple((cliente.id, self.color_espera(self.tiempo_actual - cliente.tiempo_llegada))
+                     for cliente in self.simulador.cola_espera[:35])
+        return boxes, len(self.simulador.cola_espera), cola
+    
+    def dibujar_atencion(self):
+        """Dibuja la zona de boxes y cola"""
+        self.dibujar_boxes()
+        self.dibujar_cola()
+    
+    def dibujar_frame(self, pausado: bool, velocidad_animacion: int) -> list:
+        """Dibuja las zonas que cambiaron desde el frame anterior y devuelve sus rectángulos"""
+        if self.fondo is None:
+            self.crear_fondo()
+        
+        if self.redibujar_todo:
+            self.pantalla.blit(self.fondo, (0, 0))
+            self.firmas_zonas.clear()
+        
+        actualizadas = []
+        for nombre, rect, firma, dibujar in self.zonas_dinamicas(pausado, velocidad_animacion):
+            if self.firmas_zonas.get(nombre) == firma:
+                continue
+            self.firmas_zonas[nombre] = firma
+            self.pantalla.blit(self.fondo, rect, rect)
+            dibujar()
+            actualizadas.append(rect)
+        
+        if self.redibujar_todo:
+            self.redibujar_todo = False
+            return [self.pantalla.get_rect()]
+        return actualizadas
+    
+    def zonas_dinamicas(self, pausado: bool, velocidad_animacion: int) -> list:
+        """Zonas redibujables: (nombre, rectángulo, firma del contenido, función de dibujo)"""
+        return [
+            ('atencion', self.zona_atencion, self.firma_atencion(), self.dibujar_atencion),
+            ('estadisticas', self.stats_area,
+             (self.tiempo_actual, len(self.simulador.todos_los_clientes), len(self.simulador.clientes_atendidos),
+              len(self.simulador.clientes_abandonaron), len(self.simulador.cola_espera),
+              self.simulador.boxes_ocupados),
+             self.dibujar_estadisticas),
+            ('estado', self.estado_area,
+             (pausado, velocidad_animacion, self.tiempo_actual, self.grabando, len(self.frames),
+              len(self.simulador.clientes_atendidos), len(self.simulador.todos_los_clientes)),
+             lambda: self.dibujar_estado(pausado, velocidad_animacion)),
+        ]
+    
+    def renderizar_video(self, nombre_archivo: str, velocidad: float = 1.0, fps: float = 15.0):
+        """Renderiza una traza completa a un único AVI (ver renderizar_videos)"""
+        return self.renderizar_videos({velocidad: nombre_archivo}, fps)[nombre_archivo]
+    
+    def renderizar_videos(self, salidas: dict, fps: float = 15.0, mostrar_progreso: bool = True,
+                          frames_en_cola: int = 32, frames: Optional[Tuple[int, int]] = None) -> dict:
+        """Renderiza una traza completa a varios AVI (uno por velocidad) en una sola pasada
+        
+        El simulador debe ser un ReproductorTraza. Se renderizan los frames de la
+        velocidad más lenta (a 1x, 60 segundos simulados por segundo de video) y cada
+        velocidad toma uno de cada k frames compartidos. Cada archivo tiene su propio
+        hilo codificador, por lo que las codificaciones corren en paralelo; cada hilo
+        tiene a lo sumo frames_en_cola frames pendientes, lo que acota la memoria.
+        
+        frames = (desde, hasta) renderiza solo ese tramo del video completo (con la
+        traza ya avanzada hasta el frame desde): cada velocidad recibe los mismos frames
+        que tendría en ese tramo del render completo, así los tramos se pueden
+        renderizar por separado y concatenar.
+        """
+        velocidad_base = min(salidas)
+        segundos_por_frame, total_frames = frames_de_render(self.tiempo_final_traza(), velocidad_base, fps)
+        desde, hasta = frames if frames is not None else (0, total_frames)
+        pasos = {}
+        for velocidad in salidas:
+            paso = velocidad / velocidad_base
+            if abs(paso - round(paso)) > 1e-9:
+                raise ValueError(f"La velocidad {velocidad}x no es múltiplo de {velocidad_base}x")
+            pasos[velocidad] = int(round(paso))
+        
+        # La velocidad de cada video se estampa sobre el frame compartido
+        fuente_velocidad = self.fuente_pequena
+        posicion_velocidad, fondo_velocidad = self.posicion_velocidad()
+        etiquetas = {}
+        for velocidad in salidas:
+            superficie = fuente_velocidad.render(f"Velocidad: {velocidad:g}x", True, self.NEGRO, fondo_velocidad)
+            buffer = pygame.image.tostring(superficie, 'RGB')
+            etiqueta = np.frombuffer(buffer, dtype=np.uint8).reshape(superficie.get_height(), superficie.get_width(), 3)
+            etiquetas[velocidad] = cv2.cvtColor(etiqueta, cv2.COLOR_RGB2BGR)
+        
+        codificadores = []
+        for velocidad, nombre_archivo in salidas.items():
+            fourcc = cv2.VideoWriter.fourcc(*'MJPG')
+            video = cv2.VideoWriter(nombre_archivo, fourcc, fps, (self.ANCHO, self.ALTO))
+            if not video.isOpened():
+                print(f"Error: No se pudo abrir el escritor de video para {nombre_archivo}")
+                continue
+            cola = queue.Queue(maxsize=frames_en_cola)
+            hilo = threading.Thread(target=self._codificar_frames,
+                                    args=(video, cola, etiquetas[velocidad], posicion_velocidad),
+                                    daemon=True)
+            hilo.start()
+            codificadores.append((velocidad, nombre_archivo, cola, hilo, [0]))
+        
+        tiempo_final = self.tiempo_final_traza()
+        if mostrar_progreso:
+            print(f"Renderizando {total_frames} frames ({segundos_por_frame} s simulados por frame) "
+                  f"para {len(codificadores)} video(s)...")
+        
+        inicio = time.time()
+        for indice_frame in range(desde, hasta if codificadores else desde):
+            self.ir_a_tiempo(min(indice_frame * segundos_por_frame, tiempo_final))
+            self.dibujar_frame(False, None)
+            frame = self.superficie_a_frame()
+            ultimo = indice_frame == total_frames - 1
+            
+            for velocidad, _, cola, _, escritos in codificadores:
+                if indice_frame % pasos[velocidad] == 0 or ultimo:
+                    cola.put(frame)
+                    escritos[0] += 1
+            
+            if mostrar_progreso and (indice_frame + 1) % max(1, total_frames // 10) == 0:
+                print(f"  Frame {indice_frame + 1}/{total_frames}")
+        dibujados = max(0, hasta - desde) if codificadores else 0
+        
+        resultado = {}
+        for velocidad, nombre_archivo, cola, hilo, escritos in codificadores:
+            cola.put(None)
+            hilo.join()
+            resultado[nombre_archivo] = escritos[0]
+            if mostrar_progreso:
+                print(f"Video {velocidad:g}x guardado como {nombre_archivo}: {escritos[0]} frames")
+        
+        duracion = time.time() - inicio
+        if mostrar_progreso:
+            print(f"Render completado: {dibujados} frames en {duracion:.1f} s "
+                  f"({dibujados / max(duracion, 1e-9):.0f} frames/s)")
+        return resultado
+    
+    def posicion_velocidad(self):
+        """Posición y color de fondo del texto de velocidad (para estamparlo en cada video)"""
+        return (self.estado_area.x + 10, self.estado_area.y + 70), self.GRIS_CLARO
+    
+    def tiempo_final_traza(self) -> int:
+        """Último segundo de la traza que se está renderizando"""
+        return self.simulador.tiempo_final
+    
+    def ir_a_tiempo(self, tiempo: int):
+        """Lleva la traza reproducida al segundo indicado"""
+        self.simulador.avanzar_hasta(tiempo)
+        self.tiempo_actual = tiempo
+    
+    @staticmethod
+    def _codificar_frames(video, cola, etiqueta, posicion):
+        """Hilo codificador: escribe los frames recibidos hasta recibir None"""
+        x, y = posicion
+        alto, ancho = etiqueta.shape[:2]
+        while True:
+            frame = cola.get()
+            if frame is None:
+                break
+            # Copia propia: el frame compartido lo usan los demás codificadores
+            frame = frame.copy()
+            frame[y:y + alto, x:x + ancho] = etiqueta
+            video.write(frame)
+        video.release()
+    
     def guardar_video(self, nombre_archivo: str = "simulacion.avi"):
         """Guarda los frames capturados como video AVI"""
         if not self.frames:
@@ -340,41 +552,42 @@ class InterfazVisual:
                 print("La funcionalidad de video podría requerir codecs adicionales")
     
     def animar_simulacion(self, grabar_video: bool = False, velocidad_inicial: float = 1.0):
-        """Anima la simulación paso a paso"""
+        """Anima la simulación desacoplando el tiempo simulado de los frames
+        
+        La pantalla se dibuja a FPS_PANTALLA y en cada frame se avanza la cantidad de
+        segundos simulados que corresponde al tiempo real medido y a la velocidad
+        elegida (1x = 60 segundos simulados por segundo). Los segundos sin eventos se
+        saltan, así las velocidades altas entregan el ritmo prometido. El modo
+        "evento" avanza directamente al próximo evento en cada frame.
+        """
         self.grabando = grabar_video
         clock = pygame.time.Clock()
         
-        # NO ejecutar la simulación completa primero
-        # self.simulador.simular()  # REMOVIDO
-        
         print("Iniciando simulación en tiempo real...")
         print("Controles:")
         print("- ESPACIO: Pausar/Reanudar")
-        print("- +/-: Cambiar velocidad (1x, 2x, 4x, 8x, 16x, 32x)")
+        print("- +/-: Cambiar velocidad (0.25x ... 256x, salto a evento)")
         print("- ESC: Salir")
         print("- V: Activar/desactivar grabación de video")
         
         pausado = False
-        velocidades_disponibles = [15, 30, 60, 120, 240, 480, 960, 1920]  # 0.25x, 0.5x, 1x, 2x, 4x, 8x, 16x, 32x
-        velocidades_factor = [0.25, 0.5, 1, 2, 4, 8, 16, 32]
         
         # Encontrar el índice de velocidad inicial más cercano
-        indice_velocidad = 2  # Default 1x
-        if velocidad_inicial in velocidades_factor:
-            indice_velocidad = velocidades_factor.index(velocidad_inicial)
+        if velocidad_inicial in self.VELOCIDADES:
+            indice_velocidad = self.VELOCIDADES.index(velocidad_inicial)
         else:
-            # Encontrar el más cercano
-            diferencias = [abs(v - velocidad_inicial) for v in velocidades_factor]
+            diferencias = [abs(v - velocidad_inicial) for v in self.VELOCIDADES]
             indice_velocidad = diferencias.index(min(diferencias))
         
-        velocidad_animacion = velocidades_disponibles[indice_velocidad]
-        print(f"Velocidad inicial: {velocidades_factor[indice_velocidad]}x")
+        velocidad_animacion = 60 * self.VELOCIDADES[indice_velocidad]
+        print(f"Velocidad inicial: {self.describir_velocidad(velocidad_animacion)}")
         
-        # Inicializar simulador para animación
         print(f"Iniciando simulación con {self.simulador.num_boxes} boxes...")
         
-        # Continuar hasta que no haya más clientes por procesar
+        segundos_acumulados = 0.0
+        aviso_cierre = False
         simulacion_activa = True
+        clock.tick(self.FPS_PANTALLA)
         
         while simulacion_activa:
             for event in pygame.event.get():
@@ -391,17 +604,15 @@ class InterfazVisual:
                         pausado = not pausado
                         print("PAUSADO" if pausado else "REANUDADO")
                     elif event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
-                        if indice_velocidad < len(velocidades_disponibles) - 1:
+                        if indice_velocidad < len(self.VELOCIDADES) - 1:
                             indice_velocidad += 1
-                            velocidad_animacion = velocidades_disponibles[indice_velocidad]
-                            factor_velocidad = velocidades_factor[indice_velocidad]
-                            print(f"Velocidad: {factor_velocidad}x ({velocidad_animacion} FPS)")
+                            velocidad_animacion = 60 * self.VELOCIDADES[indice_velocidad]
+                            print(f"Velocidad: {self.describir_velocidad(velocidad_animacion)}")
                     elif event.key == pygame.K_MINUS:
                         if indice_velocidad > 0:
                             indice_velocidad -= 1
-                            velocidad_animacion = velocidades_disponibles[indice_velocidad]
-                            factor_velocidad = velocidades_factor[indice_velocidad]
-                            print(f"Velocidad: {factor_velocidad}x ({velocidad_animacion} FPS)")
+                            velocidad_animacion = 60 * self.VELOCIDADES[indice_velocidad]
+                            print(f"Velocidad: {self.describir_velocidad(velocidad_animacion)}")
                     elif event.key == pygame.K_v:
                         self.grabando = not self.grabando
                         if self.grabando:
@@ -413,26 +624,30 @@ class InterfazVisual:
                                 nombre_video = f"simulacion_manual_{self.simulador.num_boxes}_boxes.avi"
                                 self.guardar_video(nombre_video)
             
+            # Tiempo real transcurrido desde el frame anterior (acotado para no
+            # dar saltos enormes tras una pausa del sistema)
+            dt = min(clock.tick(self.FPS_PANTALLA) / 1000, 0.25)
+            
             if not pausado:
-                # Ejecutar un paso de la simulación
-                self.ejecutar_paso_simulacion()
-                self.tiempo_actual += 1
+                if math.isinf(velocidad_animacion):
+                    objetivo = self.proximo_evento()
+                    segundos = 1 if objetivo is None else max(1, objetivo - self.tiempo_actual + 1)
+                else:
+                    segundos_acumulados += dt * velocidad_animacion
+                    segundos = int(segundos_acumulados)
+                    segundos_acumulados -= segundos
                 
-                # Verificar si la simulación debe continuar
-                hay_clientes_en_cola = len(self.simulador.cola_espera) > 0
-                hay_boxes_ocupados = any(box.ocupado for box in self.simulador.boxes)
+                # No pasar del límite de 3 horas extra
+                limite = self.simulador.DURACION_SIMULACION + 10800 + 1
+                segundos = min(segundos, limite - self.tiempo_actual)
+                if segundos > 0:
+                    self.avanzar_simulacion(segundos)
                 
-                # Durante horario normal o si aún hay clientes siendo procesados
-                if (self.tiempo_actual < self.simulador.DURACION_SIMULACION or 
-                    hay_clientes_en_cola or hay_boxes_ocupados):
-                    simulacion_activa = True
-                    
+                if self.hay_actividad():
                     # Mostrar mensaje cuando termine el horario pero aún haya clientes
-                    if (self.tiempo_actual == self.simulador.DURACION_SIMULACION and 
-                        (hay_clientes_en_cola or hay_boxes_ocupados)):
-                        print("🕐 Horario de atención terminado, procesando clientes restantes...")
-                        print(f"   Clientes en cola: {len(self.simulador.cola_espera)}")
-                        print(f"   Boxes ocupados: {sum(1 for box in self.simulador.boxes if box.ocupado)}")
+                    if self.tiempo_actual >= self.simulador.DURACION_SIMULACION and not aviso_cierre:
+                        aviso_cierre = True
+                        self.avisar_cierre()
                 else:
                     simulacion_activa = False
                     print("✅ Todos los clientes han sido procesados")
@@ -442,18 +657,10 @@ class InterfazVisual:
                     print("⚠️  Tiempo límite alcanzado, finalizando simulación...")
                     simulacion_activa = False
             
-            # Dibujar todo
-            self.pantalla.fill(self.BLANCO)
-            self.dibujar_leyenda()
-            self.dibujar_boxes()
-            self.dibujar_cola()
-            self.dibujar_estadisticas()
-            self.dibujar_controles()
-            self.dibujar_estado(pausado, velocidad_animacion)
-            
-            pygame.display.flip()
-            self.capturar_frame(velocidad_animacion)
-            clock.tick(velocidad_animacion)
+            # Dibujar solo las zonas que cambiaron
+            zonas_actualizadas = self.dibujar_frame(pausado, velocidad_animacion)
+            pygame.display.update(zonas_actualizadas)
+            self.capturar_frame()
         
         # Mostrar estadísticas finales
         print("Simulación completada!")
@@ -469,25 +676,39 @@ class InterfazVisual:
         if self.grabando:
             self.guardar_video()
     
-    def ejecutar_paso_simulacion(self):
-        """Ejecuta un paso de la simulación (un segundo)"""
-        # Actualizar tiempo del simulador
-        self.simulador.tiempo_actual = self.tiempo_actual
-        
-        # Solo durante horario de atención (8-12h)
-        if self.tiempo_actual < self.simulador.DURACION_SIMULACION:
-            if self.simulador.llega_cliente():
-                self.simulador.agregar_cliente()
-        
-        # Procesar eventos
-        self.simulador.procesar_finalizacion_atencion()
-        self.simulador.procesar_abandonos(durante_horario_normal=(self.tiempo_actual < self.simulador.DURACION_SIMULACION))
+    def proximo_evento(self):
+        """Segundo del próximo evento de la simulación mostrada (modo salto a evento)"""
+        return self.simulador.proximo_evento()
+    
+    def hay_actividad(self) -> bool:
+        """Indica si la animación debe continuar (horario abierto o clientes pendientes)"""
+        return (self.tiempo_actual < self.simulador.DURACION_SIMULACION or
+                len(self.simulador.cola_espera) > 0 or self.simulador.boxes_ocupados > 0)
+    
+    def avisar_cierre(self):
+        """Informa por consola que terminó el horario con clientes pendientes"""
+        print("🕐 Horario de atención terminado, procesando clientes restantes...")
+        print(f"   Clientes en cola: {len(self.simulador.cola_espera)}")
+        print(f"   Boxes ocupados: {self.simulador.boxes_ocupados}")
+    
+    def avanzar_simulacion(self, segundos: int):
+        """Avanza la simulación la cantidad de segundos indicada, saltando los que no tienen eventos"""
+        anterior = self.tiempo_actual
+        self.simulador.avanzar_hasta(self.tiempo_actual + segundos - 1)
+        self.tiempo_actual += segundos
         
         # Progreso cada 10%
-        if self.tiempo_actual % (self.simulador.DURACION_SIMULACION // 10) == 0:
-            progreso = (self.tiempo_actual / self.simulador.DURACION_SIMULACION) * 100
+        paso = self.simulador.DURACION_SIMULACION // 10
+        if anterior // paso != self.tiempo_actual // paso and self.tiempo_actual <= self.simulador.DURACION_SIMULACION:
+            progreso = (self.tiempo_actual // paso) * 10
             print(f"Progreso: {progreso:.0f}%")
     
+    def describir_velocidad(self, velocidad_animacion) -> str:
+        """Texto de la velocidad actual (segundos simulados por segundo / 60)"""
+        if math.isinf(velocidad_animacion):
+            return "salto a evento"
+        return f"{velocidad_animacion / 60:g}x"
+    
     def mostrar_estadisticas_finales(self):
         """Muestra las estadísticas finales y espera input del usuario"""
         esperando = True
@@ -501,7 +722,7 @@ class InterfazVisual:
             self.pantalla.fill(self.BLANCO)
             
             # Título
-            texto = self.fuente_grande.render("SIMULACIÓN COMPLETADA", True, self.NEGRO)
+            texto = self.texto(self.fuente_grande, "SIMULACIÓN COMPLETADA", self.NEGRO)
             text_rect = texto.get_rect(center=(self.ANCHO//2, 100))
             self.pantalla.blit(texto, text_rect)
             
@@ -523,13 +744,13 @@ class InterfazVisual:
             ]
             
             for stat in estadisticas:
-                texto = self.fuente_mediana.render(stat, True, self.NEGRO)
+                texto = self.texto(self.fuente_mediana, stat, self.NEGRO)
                 text_rect = texto.get_rect(center=(self.ANCHO//2, y_pos))
                 self.pantalla.blit(texto, text_rect)
                 y_pos += 40
             
             # Instrucciones
-            texto = self.fuente_pequena.render("Presiona ESC para salir", True, self.GRIS)
+            texto = self.texto(self.fuente_pequena, "Presiona ESC para salir", self.GRIS)
             text_rect = texto.get_rect(center=(self.ANCHO//2, self.ALTO - 50))
             self.pantalla.blit(texto, text_rect)
             
@@ -545,7 +766,7 @@ class InterfazVisual:
         pygame.draw.rect(self.pantalla, self.NEGRO, self.controles_area, 2)
         
         # Título
-        texto = self.fuente_mediana.render("CONTROLES", True, self.NEGRO)
+        texto = self.texto(self.fuente_mediana, "CONTROLES", self.NEGRO)
         self.pantalla.blit(texto, (self.controles_area.x + 10, self.controles_area.y + 10))
         
         # Lista de controles (texto más corto para evitar desbordamiento)
@@ -557,8 +778,8 @@ class InterfazVisual:
             "ESC - Salir simulación",
             "",
             "VELOCIDADES DISPONIBLES:",
-            "0.25x, 0.5x, 1x, 2x,",
-            "4x, 8x, 16x, 32x",
+            "0.25x, 0.5x, 1x, 2x, 4x, 8x,",
+            "16x ... 256x, salto a evento",
             "",
             "INFORMACIÓN:",
             "• Simulación: 8:00 a 12:00",
@@ -571,48 +792,42 @@ class InterfazVisual:
                 y_pos += 10  # Reducido espaciado
                 continue
             elif control.startswith("VELOCIDADES DISPONIBLES:"):
-                texto = self.fuente_pequena.render(control, True, self.AZUL)
+                texto = self.texto(self.fuente_pequena, control, self.AZUL)
             elif control.startswith("INFORMACIÓN:"):
-                texto = self.fuente_pequena.render(control, True, self.AZUL)
-            elif control.startswith("•") or control in ["0.25x, 0.5x, 1x, 2x,", "4x, 8x, 16x, 32x"]:
-                texto = self.fuente_pequena.render(control, True, self.GRIS)
+                texto = self.texto(self.fuente_pequena, control, self.AZUL)
+            elif control.startswith("•") or control in ["0.25x, 0.5x, 1x, 2x, 4x, 8x,", "16x ... 256x, salto a evento"]:
+                texto = self.texto(self.fuente_pequena, control, self.GRIS)
             else:
-                texto = self.fuente_pequena.render(control, True, self.NEGRO)
+                texto = self.texto(self.fuente_pequena, control, self.NEGRO)
             
             self.pantalla.blit(texto, (self.controles_area.x + 10, y_pos))
             y_pos += 20  # Reducido espaciado entre líneas
     
     def dibujar_estado(self, pausado: bool, velocidad_animacion: int):
-        """Dibuja el estado actual de la simulación"""
-        pygame.draw.rect(self.pantalla, self.GRIS_CLARO, self.estado_area)
-        pygame.draw.rect(self.pantalla, self.NEGRO, self.estado_area, 2)
-        
-        # Título
-        texto = self.fuente_mediana.render("ESTADO DE SIMULACIÓN", True, self.NEGRO)
-        self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 10))
-        
+        """Dibuja el estado actual de la simulación (marco y título en la capa estática)"""
         # Estado de pausa
         estado_pausa = "PAUSADO" if pausado else "EJECUTÁNDOSE"
         color_estado = self.ROJO if pausado else self.VERDE
-        texto = self.fuente_pequena.render(f"Estado: {estado_pausa}", True, color_estado)
+        texto = self.texto(self.fuente_pequena, f"Estado: {estado_pausa}", color_estado)
         self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 45))
         
-        # Velocidad
-        velocidad_factor = velocidad_animacion / 60
-        texto = self.fuente_pequena.render(f"Velocidad: {velocidad_factor}x", True, self.NEGRO)
-        self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 70))
+        # Velocidad (None: la estampa cada video al renderizar varias velocidades)
+        if velocidad_animacion is not None:
+            texto = self.fuente_pequena.render(f"Velocidad: {self.describir_velocidad(velocidad_animacion)}",
+                                               True, self.NEGRO)
+            self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 70))
         
         # Progreso de la simulación
         if self.tiempo_actual <= self.simulador.DURACION_SIMULACION:
             progreso = (self.tiempo_actual / self.simulador.DURACION_SIMULACION) * 100
-            texto = self.fuente_pequena.render(f"Progreso: {progreso:.1f}%", True, self.NEGRO)
+            texto = self.texto(self.fuente_pequena, f"Progreso: {progreso:.1f}%", self.NEGRO)
             color_barra = self.VERDE
         else:
             # Tiempo extra
             tiempo_extra = self.tiempo_actual - self.simulador.DURACION_SIMULACION
             minutos_extra = tiempo_extra // 60
             progreso = 100  # Mostrar 100% en horario normal
-            texto = self.fuente_pequena.render(f"Tiempo extra: +{minutos_extra} min", True, self.MORADO)
+            texto = self.texto(self.fuente_pequena, f"Tiempo extra: +{minutos_extra} min", self.MORADO)
             color_barra = self.MORADO
         
         self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 95))
@@ -636,10 +851,10 @@ class InterfazVisual:
         if self.grabando:
             frames_capturados = len(self.frames)
             memoria_mb = (frames_capturados * 1200 * 800 * 3) / (1024 * 1024)  # Estimación aproximada
-            texto = self.fuente_pequena.render(f"🔴 GRABANDO VIDEO", True, self.ROJO)
+            texto = self.texto(self.fuente_pequena, f"🔴 GRABANDO VIDEO", self.ROJO)
             self.pantalla.blit(texto, (self.estado_area.x + 10, self.estado_area.y + 150))
             
-            texto_frames = self.fuente_pequena.render(f"Frames: {frames_capturados} (~{memoria_mb:.1f}MB)", True, self.ROJO)
+            texto_frames = self.texto(self.fuente_pequena, f"Frames: {frames_capturados} (~{memoria_mb:.1f}MB)", self.ROJO)
             self.pantalla.blit(texto_frames, (self.estado_area.x + 10, self.estado_area.y + 175))
         
         # Tiempo restante estimado
@@ -648,7 +863,7 @@ class InterfazVisual:
             minutos_restantes = tiempo_restante // 60
             segundos_restantes = tiempo_restante % 60
             y_tiempo = self.estado_area.y + 200 if self.grabando else self.estado_area.y + 180
-            texto = self.fuente_pequena.render(f"Tiempo restante: {minutos_restantes:02d}:{segundos_restantes:02d}", True, self.NEGRO)
+            texto = self.texto(self.fuente_pequena, f"Tiempo restante: {minutos_restantes:02d}:{segundos_restantes:02d}", self.NEGRO)
             self.pantalla.blit(texto, (self.estado_area.x + 10, y_tiempo))
         
         # Estadísticas rápidas
@@ -657,7 +872,7 @@ class InterfazVisual:
             eficiencia = (len(self.simulador.clientes_atendidos) / len(self.simulador.todos_los_clientes)) * 100
         
         y_eficiencia = self.estado_area.y + 230 if self.grabando else self.estado_area.y + 210
-        texto = self.fuente_pequena.render(f"Eficiencia actual: {eficiencia:.1f}%", True, self.AZUL)
+        texto = self.texto(self.fuente_pequena, f"Eficiencia actual: {eficiencia:.1f}%", self.AZUL)
         self.pantalla.blit(texto, (self.estado_area.x + 10, y_eficiencia))
     
     def cleanup(self):
@@ -670,3 +885,204 @@ class InterfazVisual:
         # Limpiar frames de memoria
         self.frames.clear()
         pygame.quit()
+
+
+class InterfazComparativa(InterfazVisual):
+    """Muestra varias simulaciones lado a lado, sincronizadas por el reloj simulado
+    
+    Cada panel reproduce la traza precalculada de un simulador ya ejecutado, así
+    dibujar N configuraciones no requiere N simulaciones vivas en el bucle de render.
+    Con la misma semilla todas las configuraciones reciben el mismo flujo de llegadas.
+    """
+    
+    def __init__(self, simuladores: List[SimuladorAtencion], headless: bool = False):
+        self.paneles = [ReproductorTraza(simulador) for simulador in simuladores]
+        super().__init__(self.paneles[0], headless=headless)
+        pygame.display.set_caption("Comparación de configuraciones")
+    
+    def setup_posiciones(self):
+        """Distribuye los paneles en una grilla (hasta 3 por fila)"""
+        super().setup_posiciones()
+        self.encabezado_area = pygame.Rect(10, 10, self.ANCHO - 20, 70)
+        
+        columnas = min(3, len(self.paneles))
+        filas = (len(self.paneles) + columnas - 1) // columnas
+        ancho = (self.ANCHO - 20 - (columnas - 1) * 10) // columnas
+        alto = (self.ALTO - 130 - (filas - 1) * 10) // filas
+        
+        self.rects_paneles = []
+        for i in range(len(self.paneles)):
+            fila, col = divmod(i, columnas)
+            self.rects_paneles.append(pygame.Rect(10 + col * (ancho + 10), 90 + fila * (alto + 10), ancho, alto))
+    
+    def crear_fondo(self):
+        """Capa estática: leyenda inferior, marcos y títulos de los paneles"""
+        self.fondo = pygame.Surface((self.ANCHO, self.ALTO))
+        pantalla, self.pantalla = self.pantalla, self.fondo
+        
+        self.pantalla.fill(self.BLANCO)
+        self.dibujar_leyenda(self.ALTO - 20)
+        
+        texto = self.texto(self.fuente_grande, "COMPARACIÓN DE CONFIGURACIONES", self.NEGRO)
+        self.pantalla.blit(texto, (self.encabezado_area.x + 10, self.encabezado_area.y + 5))
+        
+        for panel, rect in zip(self.paneles, self.rects_paneles):
+            pygame.draw.rect(self.pantalla, self.GRIS_CLARO, rect)
+            pygame.draw.rect(self.pantalla, self.NEGRO, rect, 2)
+            texto = self.texto(self.fuente_mediana, f"{panel.num_boxes} boxes", self.NEGRO)
+            self.pantalla.blit(texto, (rect.x + 10, rect.y + 8))
+        
+        self.pantalla = pantalla
+    
+    def zonas_dinamicas(self, pausado: bool, velocidad_animacion: int) -> list:
+        """El encabezado cambia con el reloj; cada panel solo cuando cambia su estado"""
+        zonas = [('encabezado', self.encabezado_area, (pausado, velocidad_animacion, self.tiempo_actual),
+                  lambda: self.dibujar_encabezado(pausado, velocidad_animacion))]
+        for i, (panel, rect) in enumerate(zip(self.paneles, self.rects_paneles)):
+            firma = (tuple(box.cliente_actual.id if box.cliente_actual else None for box in panel.boxes),
+                     tuple((cliente.id, self.color_espera(self.tiempo_actual - cliente.tiempo_llegada))
+                           for cliente in panel.cola_espera[:60]),
+                     len(panel.cola_espera), len(panel.todos_los_clientes), len(panel.clientes_atendidos),
+                     len(panel.clientes_abandonaron))
+            interior = rect.inflate(-4, -4)
+            interior.y += 26
+            interior.height -= 26
+            zonas.append((f'panel_{i}', interior, firma,
+                          lambda panel=panel, rect=interior: self.dibujar_panel(panel, rect)))
+        return zonas
+    
+    def dibujar_encabezado(self, pausado: bool, velocidad_animacion: int):
+        """Dibuja el reloj compartido, la velocidad y el estado de la reproducción"""
+        x, y = self.encabezado_area.x + 10, self.encabezado_area.y + 45
+        horas = (self.tiempo_actual // 3600) + 8
+        minutos = (self.tiempo_actual % 3600) // 60
+        segundos = self.tiempo_actual % 60
+        color_hora = self.NEGRO if self.tiempo_actual < self.simulador.DURACION_SIMULACION else self.MORADO
+        texto = self.texto(self.fuente_mediana, f"Hora: {horas:02d}:{minutos:02d}:{segundos:02d}", color_hora)
+        self.pantalla.blit(texto, (x, y))
+        
+        if velocidad_animacion is not None:
+            texto = self.texto(self.fuente_pequena, f"Velocidad: {self.describir_velocidad(velocidad_animacion)}",
+                               self.NEGRO)
+            self.pantalla.blit(texto, (x + 250, y + 4))
+        
+        estado = "PAUSADO" if pausado else "EJECUTÁNDOSE"
+        texto = self.texto(self.fuente_pequena, estado, self.ROJO if pausado else self.VERDE)
+        self.pantalla.blit(texto, (x + 450, y + 4))
+        if self.grabando:
+            texto = self.texto(self.fuente_pequena, f"🔴 GRABANDO ({len(self.frames)} frames)", self.ROJO)
+            self.pantalla.blit(texto, (x + 600, y + 4))
+    
+    def dibujar_panel(self, panel: ReproductorTraza, rect: pygame.Rect):
+        """Dibuja boxes, cola y contadores de una configuración dentro de su panel"""
+        lado = 44
+        boxes_por_fila = max(1, min(5, (rect.width - 10) // (lado + 8)))
+        for i, box in enumerate(panel.boxes):
+            fila, col = divmod(i, boxes_por_fila)
+            x = rect.x + 8 + col * (lado + 8)
+            y = rect.y + 6 + fila * (lado + 8)
+            color = self.VERDE if box.ocupado else self.GRIS_CLARO
+            color_texto = self.BLANCO if box.ocupado else self.NEGRO
+            pygame.draw.rect(self.pantalla, color, (x, y, lado, lado))
+            pygame.draw.rect(self.pantalla, self.NEGRO, (x, y, lado, lado), 2)
+            texto = self.texto(self.fuente_pequena, f"B{i + 1}", color_texto)
+            self.pantalla.blit(texto, texto.get_rect(center=(x + lado // 2, y + 14)))
+            if box.cliente_actual:
+                texto = self.texto(self.fuente_pequena, str(box.cliente_actual.id), color_texto)
+                self.pantalla.blit(texto, texto.get_rect(center=(x + lado // 2, y + 32)))
+        
+        filas_boxes = (len(panel.boxes) + boxes_por_fila - 1) // boxes_por_fila
+        y_cola = rect.y + 12 + filas_boxes * (lado + 8)
+        texto = self.texto(self.fuente_pequena, f"Cola: {len(panel.cola_espera)} clientes", self.NEGRO)
+        self.pantalla.blit(texto, (rect.x + 8, y_cola))
+        
+        # Cola: círculos chicos, tantos como entren en el espacio disponible
+        y_stats = rect.bottom - 70
+        diametro = 16
+        por_fila = max(1, (rect.width - 16) // (diametro + 4))
+        filas_cola = max(0, (y_stats - (y_cola + 22)) // (diametro + 4))
+        visibles = panel.cola_espera[:min(60, por_fila * filas_cola)]
+        for i, cliente in enumerate(visibles):
+            fila, col = divmod(i, por_fila)
+            centro = (rect.x + 8 + col * (diametro + 4) + diametro // 2,
+                      y_cola + 22 + fila * (diametro + 4) + diametro // 2)
+            pygame.draw.circle(self.pantalla, self.color_espera(self.tiempo_actual - cliente.tiempo_llegada),
+                               centro, diametro // 2)
+            pygame.draw.circle(self.pantalla, self.NEGRO, centro, diametro // 2, 1)
+        
+        _, _, costo_total = panel.calcular_costos()
+        lineas = [
+            f"Ingresaron: {len(panel.todos_los_clientes)}   Atendidos: {len(panel.clientes_atendidos)}",
+            f"Abandonaron: {len(panel.clientes_abandonaron)}   Ocupados: {panel.boxes_ocupados}/{panel.num_boxes}",
+            f"Costo total: ${costo_total:,}",
+        ]
+        for i, linea in enumerate(lineas):
+            texto = self.texto(self.fuente_pequena, linea, self.NEGRO)
+            self.pantalla.blit(texto, (rect.x + 8, y_stats + i * 22))
+    
+    def posicion_velocidad(self):
+        """El texto de velocidad va en el encabezado, sobre fondo blanco"""
+        return (self.encabezado_area.x + 260, self.encabezado_area.y + 49), self.BLANCO
+    
+    def tiempo_final_traza(self) -> int:
+        """Último segundo entre todas las trazas"""
+        return max(panel.tiempo_final for panel in self.paneles)
+    
+    def ir_a_tiempo(self, tiempo: int):
+        """Lleva todos los paneles al mismo segundo simulado"""
+        for panel in self.paneles:
+            panel.avanzar_hasta(tiempo)
+        self.tiempo_actual = tiempo
+    
+    def avanzar_simulacion(self, segundos: int):
+        """Avanza todos los paneles sobre el reloj compartido"""
+        self.ir_a_tiempo(self.tiempo_actual + segundos - 1)
+        self.tiempo_actual += 1
+    
+    def proximo_evento(self):
+        """Próximo evento entre todas las trazas"""
+        eventos = [t for t in (panel.proximo_evento() for panel in self.paneles) if t is not None]
+        return min(eventos) if eventos else None
+    
+    def hay_actividad(self) -> bool:
+        """La reproducción termina cuando se alcanza el final de todas las trazas"""
+        return self.tiempo_actual <= self.tiempo_final_traza()
+    
+    def avisar_cierre(self):
+        """Informa por consola el estado de cada configuración al cierre"""
+        print("🕐 Horario de atención terminado, procesando clientes restantes...")
+        for panel in self.paneles:
+            print(f"   {panel.num_boxes} boxes: {len(panel.cola_espera)} en cola, {panel.boxes_ocupados} ocupados")
+    
+    def mostrar_estadisticas_finales(self):
+        """Muestra la tabla final de todas las configuraciones y espera ESC"""
+        esperando = True
+        clock = pygame.time.Clock()
+        
+        while esperando:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    esperando = False
+            
+            self.pantalla.fill(self.BLANCO)
+            texto = self.texto(self.fuente_grande, "COMPARACIÓN COMPLETADA", self.NEGRO)
+            self.pantalla.blit(texto, texto.get_rect(center=(self.ANCHO // 2, 100)))
+            
+            encabezado = f"{'Boxes':>6} {'Ingresaron':>11} {'Atendidos':>10} {'Perdidos':>9} {'Costo total':>13}"
+            texto = self.texto(self.fuente_mediana, encabezado, self.NEGRO)
+            self.pantalla.blit(texto, texto.get_rect(center=(self.ANCHO // 2, 180)))
+            
+            for i, panel in enumerate(self.paneles):
+                stats = panel.obtener_estadisticas()
+                linea = (f"{panel.num_boxes:>6} {stats['clientes_ingresaron']:>11} {stats['clientes_atendidos']:>10} "
+                         f"{stats['clientes_no_atendidos']:>9} {'$' + format(stats['costo_total'], ','):>13}")
+                texto = self.texto(self.fuente_mediana, linea, self.NEGRO)
+                self.pantalla.blit(texto, texto.get_rect(center=(self.ANCHO // 2, 230 + i * 40)))
+            
+            texto = self.texto(self.fuente_pequena, "Presiona ESC para salir", self.GRIS)
+            self.pantalla.blit(texto, texto.get_rect(center=(self.ANCHO // 2, self.ALTO - 50)))
+            
+            pygame.display.flip()
+            clock.tick(60)
+        
+        self.cleanup()
@@ -0,0 +1,267 @@
+"""
+Ejecución de lotes de simulaciones como biblioteca
+
+ejecutar_lote() corre varias réplicas de una o más configuraciones con el motor
+rápido y devuelve los resultados como arrays de NumPy, sin imprimir nada ni usar
+matplotlib: el avance se informa solo a través de un callback opcional.
+
+Las réplicas se pueden sortear de tres formas (muestreo):
+- 'independiente': cada réplica con su propia semilla.
+- 'antitetico': la réplica 2k+1 es el espejo de la 2k (uniformes 1 - u para los
+  saltos entre llegadas y para las atenciones), así los errores de cada par tienden
+  a compensarse.
+- 'sobol': cada réplica es un punto de una sucesión de Sobol aleatorizada
+  (cuasi Monte Carlo), repartidas en varias aleatorizaciones independientes para
+  poder estimar el error.
+"""
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Union
+import numpy as np
+
+from motor_eventos import ParametrosSimulacion, camino_desde_uniformes, muestrear_camino, simular_camino_varios
+from nucleo_jit import JIT_DISPONIBLE, simular_camino_jit
+
+# Métricas por réplica (las mismas claves que obtener_estadisticas(), en segundos, más
+# el trabajo ofrecido: la suma de las atenciones sorteadas para todos los que llegaron);
+# los costos son float y el resto enteros
+METRICAS = (
+    'clientes_ingresaron', 'clientes_atendidos', 'clientes_no_atendidos',
+    'tiempo_min_atencion_seg', 'tiempo_max_atencion_seg',
+    'tiempo_min_espera_seg', 'tiempo_max_espera_seg',
+    'costo_boxes', 'costo_perdidas', 'costo_total',
+    'trabajo_ofrecido_seg',
+)
+
+Configuracion = Union[int, Sequence[int]]  # Cantidad fija de boxes o agenda por bloque
+
+MUESTREOS = ('independiente', 'antitetico', 'sobol')
+ALEATORIZACIONES_SOBOL = 8  # Sucesiones de Sobol independientes por lote (para estimar el error)
+
+
+@dataclass
+class ResultadoLote:
+    """Resultados de un lote: cada métrica es un array (configuraciones, réplicas)
+
+    Todas las configuraciones usan las mismas semillas por réplica (números aleatorios
+    comunes), así la columna r de cada métrica corresponde a la misma mañana.
+    """
+    configuraciones: List[Configuracion]
+    semilla: Optional[int]
+    metricas: Dict[str, np.ndarray] = field(default_factory=dict)
+    muestreo: str = 'independiente'
+
+    @property
+    def replicas(self) -> int:
+        return self.metricas['costo_total'].shape[1]
+
+    def __getitem__(self, metrica: str) -> np.ndarray:
+        return self.metricas[metrica]
+
+    def promedios(self) -> Dict[str, np.ndarray]:
+        """Promedio de cada métrica por configuración"""
+        return {nombre: valores.mean(axis=1) for nombre, valores in self.metricas.items()}
+
+    def varianza_estimador(self, metrica: str) -> np.ndarray:
+        """Varianza del promedio de la métrica por configuración, según el muestreo usado
+
+        Con réplicas independientes es s²/n; con pares antitéticos, la varianza de los
+        promedios de cada par sobre la cantidad de pares; con Sobol, la varianza de los
+        promedios de cada aleatorización sobre la cantidad de aleatorizaciones.
+        """
+        valores = self.metricas[metrica].astype(float)
+        if self.muestreo == 'antitetico':
+            pares = valores[:, :self.replicas // 2 * 2].reshape(len(valores), -1, 2).mean(axis=2)
+            return pares.var(axis=1, ddof=1) / pares.shape[1]
+        if self.muestreo == 'sobol':
+            grupos = _grupos_sobol(self.replicas)
+            medias = np.stack([valores[:, grupos == g].mean(axis=1) for g in np.unique(grupos)], axis=1)
+            return medias.var(axis=1, ddof=1) / medias.shape[1]
+        return valores.var(axis=1, ddof=1) / self.replicas
+
+    def reduccion_varianza(self, metrica: str) -> np.ndarray:
+        """Cuántas veces menos varianza que con réplicas independientes (s²/n) por configuración
+
+        Cada réplica tiene la misma distribución que una independiente, así que s²/n
+        estima lo que se hubiera obtenido con réplicas independientes.
+        """
+        valores = self.metricas[metrica].astype(float)
+        independiente = valores.var(axis=1, ddof=1) / self.replicas
+        varianza = self.varianza_estimador(metrica)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(varianza > 0, independiente / varianza, np.where(independiente > 0, np.inf, 1.0))
+
+    def registros(self) -> List[dict]:
+        """Tabla de registros: un diccionario por (configuración, réplica)"""
+        filas = []
+        for i, configuracion in enumerate(self.configuraciones):
+            for r in range(self.replicas):
+                fila = {'configuracion': configuracion, 'replica': r}
+                fila.update({nombre: valores[i, r].item() for nombre, valores in self.metricas.items()})
+                filas.append(fila)
+        return filas
+
+
+def _crear_metricas(num_configuraciones: int, replicas: int) -> Dict[str, np.ndarray]:
+    return {nombre: np.empty((num_configuraciones, replicas),
+                             dtype=np.float64 if nombre.startswith('costo') else np.int64)
+            for nombre in METRICAS}
+
+
+def _cantidad_grupos_sobol(replicas: int) -> int:
+    return min(ALEATORIZACIONES_SOBOL, max(1, replicas // 2))
+
+
+def _grupos_sobol(replicas: int) -> np.ndarray:
+    """Aleatorización de Sobol a la que pertenece cada réplica (bloques contiguos)"""
+    return np.arange(replicas) * _cantidad_grupos_sobol(replicas) // replicas
+
+
+def _hijas(raiz: np.random.SeedSequence, desde: int, hasta: int) -> List[np.random.SeedSequence]:
+    """Las semillas raiz.spawn(n)[desde:hasta], sin crear las anteriores"""
+    return [np.random.SeedSequence(raiz.entropy, spawn_key=raiz.spawn_key + (i,), pool_size=raiz.pool_size)
+            for i in range(desde, hasta)]
+
+
+def _dimension_uniformes(parametros: ParametrosSimulacion) -> int:
+    """Coordenadas por punto: K saltos entre llegadas y K normales, con K holgado para una mañana"""
+    if parametros.perfil_llegadas is None:
+        esperados = parametros.duracion * parametros.prob_llegada
+    else:
+        esperados = parametros.perfil_llegadas.clientes_esperados(parametros.duracion)
+    k = int(esperados + 4 * np.sqrt(esperados) + 10)
+    return 2 * k
+
+
+def _muestras(muestreo: str, semilla, replicas: int, parametros: ParametrosSimulacion,
+              desde: int = 0, hasta: Optional[int] = None) -> list:
+    """Lo que define cada réplica del lote según el muestreo (se envía a los procesos de trabajo)
+
+    Devuelve solo las réplicas desde..hasta-1, las mismas que en el lote completo.
+    """
+    if muestreo not in MUESTREOS:
+        raise ValueError(f"Muestreo desconocido: {muestreo} (opciones: {', '.join(MUESTREOS)})")
+    if hasta is None:
+        hasta = replicas
+    if desde >= hasta:
+        return []
+    raiz = np.random.SeedSequence(semilla)
+    if muestreo == 'antitetico':
+        # Cada par: una semilla para el punto y otra, independiente, para los clientes de más
+        pares = [s.spawn(2) for s in _hijas(raiz, desde // 2, (hasta + 1) // 2)]
+        return [('antitetico', *pares[r // 2 - desde // 2], r % 2 == 1) for r in range(desde, hasta)]
+    semillas = _hijas(raiz, desde, hasta)
+    if muestreo == 'independiente':
+        return semillas
+
+    from scipy.stats import qmc
+
+    # Una sucesión de Sobol aleatorizada (scrambling) por grupo de réplicas; de cada
+    # grupo se salta hasta la primera réplica pedida
+    grupos = _cantidad_grupos_sobol(replicas)
+    dimension = _dimension_uniformes(parametros)
+    raiz_sobol = np.random.SeedSequence([raiz.entropy, 1])
+    primer_grupo, ultimo_grupo = desde * grupos // replicas, (hasta - 1) * grupos // replicas
+    puntos = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)  # Avisa si la cantidad no es potencia de 2
+        for g, semilla_sobol in enumerate(_hijas(raiz_sobol, primer_grupo, ultimo_grupo + 1), primer_grupo):
+            inicio_grupo = -(-g * replicas // grupos)  # Primera réplica r con r * grupos // replicas == g
+            fin_grupo = -(-(g + 1) * replicas // grupos)
+            sobol = qmc.Sobol(dimension, scramble=True, seed=np.random.default_rng(semilla_sobol))
+            if desde > inicio_grupo:
+                sobol.fast_forward(desde - inicio_grupo)
+            puntos.extend(sobol.random(min(hasta, fin_grupo) - max(desde, inicio_grupo)))
+    return [('sobol', punto, semilla_replica) for punto, semilla_replica in zip(puntos, semillas)]
+
+
+def _camino(muestra, parametros: ParametrosSimulacion):
+    if isinstance(muestra, tuple) and muestra[0] == 'antitetico':
+        # Los saltos entre llegadas (y no el sorteo de cada segundo) se reflejan: así
+        # una mañana con muchas llegadas se empareja con una con pocas
+        _, semilla_punto, semilla_resto, espejo = muestra
+        uniformes = np.random.default_rng(semilla_punto).random(_dimension_uniformes(parametros))
+        return camino_desde_uniformes(parametros, 1.0 - uniformes if espejo else uniformes, semilla_resto, espejo)
+    if isinstance(muestra, tuple) and muestra[0] == 'sobol':
+        return camino_desde_uniformes(parametros, muestra[1], muestra[2])
+    return muestrear_camino(parametros, muestra)
+
+
+def _simular_bloque(configuraciones, muestras, parametros) -> Dict[str, np.ndarray]:
+    """Simula todas las configuraciones sobre un grupo de réplicas (se ejecuta en un proceso de trabajo)"""
+    resultados = _crear_metricas(len(configuraciones), len(muestras))
+    for r, muestra in enumerate(muestras):
+        camino = _camino(muestra, parametros)
+        trabajo = int(camino.atenciones.sum())
+        # Con Numba, el núcleo compilado; si no, las cantidades fijas de boxes avanzan
+        # juntas en una sola pasada por el camino (mismos resultados)
+        if JIT_DISPONIBLE:
+            estadisticas = [simular_camino_jit(camino, c, parametros) for c in configuraciones]
+        else:
+            estadisticas = simular_camino_varios(camino, configuraciones, parametros)
+        for i, stats in enumerate(estadisticas):
+            stats['trabajo_ofrecido_seg'] = trabajo
+            for nombre in METRICAS:
+                resultados[nombre][i, r] = stats[nombre]
+    return resultados
+
+
+def simular_replicas(configuraciones: List[Configuracion], semilla: int, desde: int, hasta: int,
+                     parametros: Optional[ParametrosSimulacion] = None, replicas: Optional[int] = None,
+                     muestreo: str = 'independiente') -> Dict[str, np.ndarray]:
+    """Simula las réplicas desde..hasta-1 de un lote (las mismas que calcularía ejecutar_lote)
+
+    Permite repartir un lote en unidades de trabajo independientes: cada réplica
+    depende solo de la semilla, de su índice y (con Sobol) del total de réplicas.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    muestras = _muestras(muestreo, semilla, replicas if replicas is not None else hasta, parametros, desde, hasta)
+    return _simular_bloque(configuraciones, muestras, parametros)
+
+
+def ejecutar_lote(configuraciones: Union[Configuracion, List[Configuracion]], replicas: int = 10,
+                  semilla: Optional[int] = None, parametros: Optional[ParametrosSimulacion] = None,
+                  workers: Optional[int] = 1,
+                  callback_progreso: Optional[Callable[[int, int], None]] = None,
+                  tamano_bloque: int = 50, muestreo: str = 'independiente') -> ResultadoLote:
+    """Simula 'replicas' mañanas de cada configuración y devuelve las métricas por réplica
+
+    configuraciones: una cantidad de boxes, una agenda (tupla) o una lista de ellas.
+    semilla: réplica r usa la semilla SeedSequence(semilla).spawn(replicas)[r].
+    muestreo: 'independiente', 'antitetico' o 'sobol' (ver el docstring del módulo).
+    workers: procesos en paralelo (1 = en el proceso actual, None = todos los núcleos).
+    callback_progreso(completadas, total) se llama cada vez que termina un grupo de réplicas.
+    """
+    if isinstance(configuraciones, (int, np.integer, tuple)):
+        configuraciones = [configuraciones]
+    configuraciones = list(configuraciones)
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+
+    muestras = _muestras(muestreo, semilla, replicas, parametros)
+    grupos = [(inicio, muestras[inicio:inicio + tamano_bloque]) for inicio in range(0, replicas, tamano_bloque)]
+    metricas = _crear_metricas(len(configuraciones), replicas)
+    completadas = 0
+
+    def guardar(inicio, parcial):
+        nonlocal completadas
+        for nombre in METRICAS:
+            metricas[nombre][:, inicio:inicio + parcial[nombre].shape[1]] = parcial[nombre]
+        completadas += parcial['costo_total'].shape[1]
+        if callback_progreso is not None:
+            callback_progreso(completadas, replicas)
+
+    if workers == 1 or len(grupos) == 1:
+        for inicio, grupo in grupos:
+            guardar(inicio, _simular_bloque(configuraciones, grupo, parametros))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(_simular_bloque, configuraciones, grupo, parametros): inicio
+                       for inicio, grupo in grupos}
+            for futuro in as_completed(futuros):
+                guardar(futuros[futuro], futuro.result())
+
+    return ResultadoLote(configuraciones, semilla, metricas, muestreo)
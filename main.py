@@ -12,16 +12,33 @@ y minimizar costos.
 """
 
 import argparse
+import os
 import sys
-from simulador import SimuladorAtencion
-from interfaz_visual import InterfazVisual
+import time
+from simulador import SimuladorAtencion, ReproductorTraza, simular_ramas, cargar_clases
+from perfil_llegadas import PerfilLlegadas
+from motor_eventos import ParametrosSimulacion
+from optimizador_agenda import optimizar_agenda
+from lote import ejecutar_lote
+from distribuido import ejecutar_lote_distribuido, ejecutar_trabajador
+from estado_estacionario import analizar_estado_estacionario
+from muestreo_importancia import analizar_perdidas_raras
+from variables_control import ajustar_lote
+from poda import ejecutar_lote_con_poda
+from validacion import validar_motores
+from red_sucursales import cargar_sucursales, simular_red
+from nucleo_jit import JIT_DISPONIBLE, medir_nucleos
+from render_paralelo import nombres_salida, renderizar_configuraciones, renderizar_por_tramos
+from recosteo import cargar_resultados, guardar_resultados, recostear, recostear_grilla
+from interfaz_visual import InterfazVisual, InterfazComparativa
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 import numpy as np
 
-def ejecutar_simulacion_simple(num_boxes: int, mostrar_stats: bool = True):
+def ejecutar_simulacion_simple(num_boxes: int, mostrar_stats: bool = True, semilla=None, perfil=None,
+                               clases=None):
     """Ejecuta una simulación simple sin interfaz visual"""
-    simulador = SimuladorAtencion(num_boxes)
+    simulador = SimuladorAtencion(num_boxes, semilla, perfil, clases=clases)
     simulador.simular()
     
     if mostrar_stats:
@@ -29,97 +46,334 @@ def ejecutar_simulacion_simple(num_boxes: int, mostrar_stats: bool = True):
     
     return simulador
 
-def ejecutar_simulacion_visual(num_boxes: int, grabar_video: bool = False, velocidad_inicial: float = 1.0):
+def ejecutar_simulacion_visual(num_boxes: int, grabar_video: bool = False, velocidad_inicial: float = 1.0,
+                               semilla=None, perfil=None, clases=None):
     """Ejecuta la simulación con interfaz visual"""
-    simulador = SimuladorAtencion(num_boxes)
+    simulador = SimuladorAtencion(num_boxes, semilla, perfil, clases=clases)
     interfaz = InterfazVisual(simulador)
     interfaz.animar_simulacion(grabar_video, velocidad_inicial)
 
-def comparar_configuraciones(max_boxes: int = 10, num_iteraciones: int = 10):
-    """Compara diferentes configuraciones de boxes con múltiples simulaciones"""
-    import time
+def ejecutar_render_video(num_boxes: int, velocidades=(1.0,), semilla=None, perfil=None, clases=None,
+                          tramos=None, workers=None):
+    """Simula la mañana completa y renderiza el video sin ventana, tan rápido como permita la CPU
     
-    total_simulaciones = max_boxes * num_iteraciones
-    print(f"Comparando configuraciones de boxes...")
-    print(f"Ejecutando {num_iteraciones} simulaciones por cada configuración (1-{max_boxes} boxes)")
-    print(f"Total de simulaciones: {total_simulaciones}")
+    Con varias velocidades se generan todos los AVI a partir de la misma traza y de
+    una única pasada de render. Con tramos, el video se divide en esa cantidad de
+    tramos que se renderizan en paralelo y se concatenan.
+    """
+    simulador = SimuladorAtencion(num_boxes, semilla, perfil, clases=clases)
+    simulador.simular()
+    salidas = nombres_salida(f"simulacion_{num_boxes}_boxes", velocidades)
+    
+    if tramos:
+        print(f"Renderizando en {tramos} tramos con {workers or os.cpu_count()} procesos...")
+        resultado = renderizar_por_tramos(simulador, salidas, workers=workers, tramos=tramos,
+                                          callback_progreso=lambda hechos, total: print(f"  Tramo {hechos}/{total}"))
+        for archivo, frames in resultado.archivos.items():
+            print(f"  🎬 {archivo}: {frames} frames")
+        print(f"✅ {resultado.frames} frames en {resultado.segundos:.1f} s "
+              f"({resultado.frames_por_segundo:.0f} frames/s), concatenación {resultado.segundos_concatenacion:.1f} s")
+        return simulador
+    
+    interfaz = InterfazVisual(ReproductorTraza(simulador), headless=True)
+    interfaz.renderizar_videos(salidas)
+    interfaz.cleanup()
+    return simulador
+
+def ejecutar_render_lote(lista_boxes, semilla=None, velocidades=(1.0,), workers=None, perfil=None, clases=None):
+    """Renderiza sin ventana el video de cada configuración, una configuración por proceso"""
+    if semilla is None:
+        semilla = int(np.random.SeedSequence().entropy % 2**32)
+    print(f"Renderizando {len(lista_boxes)} videos ({lista_boxes[0]}-{lista_boxes[-1]} boxes) "
+          f"con semilla {semilla} en {workers or os.cpu_count()} procesos...\n")
+    inicio = time.time()
+    
+    def mostrar_resultado(r):
+        for archivo, frames in r.archivos.items():
+            print(f"  🎬 {archivo}: {frames} frames")
+        print(f"     {r.boxes} boxes: {r.segundos:.1f} s ({r.frames_por_segundo:.0f} frames/s), "
+              f"memoria máxima del proceso {r.memoria_max_mb:.0f} MB")
     
-    # Estimación de tiempo
-    if total_simulaciones >= 100:
-        tiempo_estimado = total_simulaciones * 2  # Aproximadamente 2 segundos por simulación
-        minutos = tiempo_estimado // 60
-        segundos = tiempo_estimado % 60
-        print(f"Tiempo estimado: ~{minutos} min {segundos} seg")
+    resultados = renderizar_configuraciones(lista_boxes, semilla, velocidades, workers, perfil, clases,
+                                            callback_progreso=mostrar_resultado)
+    duracion = time.time() - inicio
+    frames = sum(r.frames for r in resultados)
+    escritos = sum(sum(r.archivos.values()) for r in resultados)
+    print()
+    print(f"✅ {len(resultados)} configuraciones en {duracion:.1f} s: {frames} frames dibujados "
+          f"({frames / max(duracion, 1e-9):.0f} frames/s en total), {escritos} frames escritos")
+    print(f"   Memoria máxima por proceso: {max(r.memoria_max_mb for r in resultados):.0f} MB")
+    return resultados
+
+def ejecutar_comparacion_visual(lista_boxes, semilla=None, velocidades=(1.0,), modo: str = 'visual',
+                                perfil=None, clases=None):
+    """Muestra varias configuraciones lado a lado con el mismo flujo de llegadas
     
-    print("Esto puede tomar varios minutos...\n")
+    Cada configuración se simula una vez con la misma semilla y luego se reproducen
+    sus trazas sincronizadas. modo: 'visual', 'video' (ventana con grabación) o
+    'render' (AVI sin ventana, una pasada para todas las velocidades).
+    """
+    if semilla is None:
+        semilla = int(np.random.SeedSequence().entropy % 2**32)
+    print(f"Simulando {len(lista_boxes)} configuraciones con semilla {semilla}...")
+    
+    simuladores = []
+    for num_boxes in lista_boxes:
+        simulador = SimuladorAtencion(num_boxes, semilla, perfil, clases=clases)
+        simulador.simular()
+        simuladores.append(simulador)
+    
+    nombre_base = f"comparacion_{'_'.join(str(b) for b in lista_boxes)}_boxes"
+    if modo == 'render':
+        interfaz = InterfazComparativa(simuladores, headless=True)
+        interfaz.renderizar_videos(nombres_salida(nombre_base, velocidades))
+        interfaz.cleanup()
+    else:
+        interfaz = InterfazComparativa(simuladores)
+        interfaz.animar_simulacion(modo == 'video', velocidades[0])
+    return simuladores
+
+def hora_a_segundos(hora: str) -> int:
+    """Convierte una hora 'HH:MM' del horario de atención en segundos desde la apertura"""
+    horas, minutos = (int(parte) for parte in hora.split(':'))
+    return (horas - 8) * 3600 + minutos * 60
+
+def ejecutar_que_pasaria_si(num_boxes: int, hora: str, lista_boxes, semilla=None, replicas: int = 1,
+                            workers=None, perfil=None, clases=None):
+    """Simula hasta la hora indicada y bifurca el resto de la mañana con otras cantidades de boxes
+    
+    Con una réplica cada rama continúa con los mismos números aleatorios (comparación
+    directa); con más réplicas cada una sortea un futuro distinto desde el mismo estado.
+    """
+    segundo = hora_a_segundos(hora)
+    simulador = SimuladorAtencion(num_boxes, semilla, perfil, clases=clases)
+    simulador.avanzar_hasta(segundo)
+    estado = simulador.snapshot()
+    
+    print(f"Estado a las {hora} con {num_boxes} boxes: {len(simulador.cola_espera)} en cola, "
+          f"{simulador.boxes_ocupados} ocupados, {len(simulador.clientes_abandonaron)} abandonos")
+    
+    # Validar las ramas antes de repartirlas (solo se pueden cerrar boxes libres)
+    for boxes in set(lista_boxes):
+        try:
+            simulador.bifurcar(num_boxes=boxes)
+        except ValueError as e:
+            print(f"Error en la rama de {boxes} boxes: {e}")
+            return None
+    
+    variantes = []
+    for boxes in lista_boxes:
+        if replicas == 1:
+            variantes.append({'num_boxes': boxes})
+        else:
+            semillas = np.random.SeedSequence([semilla if semilla is not None else 0, segundo]).spawn(replicas)
+            variantes.extend({'num_boxes': boxes, 'semilla': s} for s in semillas)
     
+    resultados = simular_ramas(estado, variantes, workers)
+    
+    print(f"\n{'Boxes':>6} {'Atendidos':>10} {'Perdidos':>9} {'Costo total':>13}")
+    for i, boxes in enumerate(lista_boxes):
+        ramas = resultados[i * replicas:(i + 1) * replicas]
+        atendidos = np.mean([r['clientes_atendidos'] for r in ramas])
+        perdidos = np.mean([r['clientes_no_atendidos'] for r in ramas])
+        costo = np.mean([r['costo_total'] for r in ramas])
+        print(f"{boxes:>6} {atendidos:>10.1f} {perdidos:>9.2f} {'$' + format(costo, ',.0f'):>13}")
+    return resultados
+
+def ejecutar_optimizacion_agenda(max_boxes: int = 10, replicas: int = 100, objetivo_perdidos: float = 1.0,
+                                 semilla=None, workers=None, perfil=None):
+    """Busca la agenda de boxes por bloque de 30 minutos más barata que cumple el objetivo de pérdidas"""
+    parametros = ParametrosSimulacion(perfil_llegadas=perfil)
+    semilla = 0 if semilla is None else semilla
+    print(f"Optimizando agenda: hasta {max_boxes} boxes en {parametros.num_bloques} bloques de 30 min "
+          f"({max_boxes ** parametros.num_bloques:,} agendas posibles)")
+    print(f"Objetivo: ≤ {objetivo_perdidos:g} clientes perdidos por mañana, {replicas} réplicas por agenda\n")
+    
+    def mostrar_progreso(iteracion, parcial):
+        print(f"  Iteración {iteracion}: {parcial.agenda} - costo ${parcial.costo_medio:,.0f}, "
+              f"perdidos {parcial.perdidos_medio:.2f} ({parcial.evaluaciones} agendas evaluadas)")
+    
+    inicio = time.time()
+    resultado = optimizar_agenda(max_boxes, objetivo_perdidos, replicas, semilla, workers, parametros,
+                                 callback_progreso=mostrar_progreso)
+    
+    print(f"\n{'Bloque':<14} {'Boxes':>5}")
+    for bloque, boxes in enumerate(resultado.agenda):
+        desde = 8 * 60 + bloque * 30
+        print(f"{desde // 60:02d}:{desde % 60:02d}-{(desde + 30) // 60:02d}:{(desde + 30) % 60:02d}   {boxes:>5}")
+    if not resultado.cumple_objetivo:
+        print(f"⚠️  Ninguna agenda con hasta {max_boxes} boxes cumple el objetivo; se muestra la de menos pérdidas")
+    print(f"Costo esperado: ${resultado.costo_medio:,.0f} (boxes ${resultado.costo_boxes:,.0f}), "
+          f"perdidos: {resultado.perdidos_medio:.2f} por mañana")
+    print(f"{resultado.evaluaciones} agendas evaluadas en {time.time() - inicio:.1f} s")
+    return resultado
+
+def ejecutar_estado_estacionario(lista_boxes, horas: float = 1000, num_lotes: int = 20, semilla=None):
+    """Medidas de largo plazo con el local siempre abierto: una corrida larga por configuración"""
+    print(f"Operación continua: {horas:g} horas por configuración, {num_lotes} lotes, "
+          f"calentamiento detectado con MSER-5\n")
+    inicio = time.time()
     resultados = []
-    tiempo_inicio = time.time()
+    for boxes in lista_boxes:
+        r = analizar_estado_estacionario(boxes, horas, semilla, num_lotes=num_lotes)
+        resultados.append(r)
+        print(f"{boxes} boxes ({r.clientes:,} clientes, calentamiento {r.horas_calentamiento * 60:.0f} min):")
+        print(f"  Perdidos por hora: {r.perdidos_por_hora.media:.3f} (IC 95%: "
+              f"{r.perdidos_por_hora.inferior:.3f} a {r.perdidos_por_hora.superior:.3f})")
+        print(f"  Proporción perdida: {r.proporcion_perdidos.media * 100:.2f}% (±{r.proporcion_perdidos.semiancho * 100:.2f}%)")
+        print(f"  Espera media: {r.espera_media_seg.media / 60:.1f} min (±{r.espera_media_seg.semiancho / 60:.1f} min)")
+        print(f"  Costo por mañana a ritmo estacionario: ${r.costo_por_manana.media:,.0f} "
+              f"(±${r.costo_por_manana.semiancho:,.0f})")
+        if not r.calentamiento_confiable:
+            print(f"  ⚠️  MSER-5 descartó la mitad de la corrida: conviene simular más horas")
+        print()
+    print(f"Tiempo total: {time.time() - inicio:.1f} s")
+    return resultados
+
+def ejecutar_perdidas_raras(lista_boxes, replicas: int = 2000, semilla=None):
+    """Probabilidad de perder al menos un cliente con muchos boxes, por muestreo de importancia"""
+    print(f"Muestreo de importancia: {replicas} réplicas por configuración "
+          f"(más corridas piloto para elegir la inclinación)\n")
+    inicio = time.time()
     
-    for num_boxes in range(1, max_boxes + 1):
-        print(f"Simulando con {num_boxes} boxes ({num_iteraciones} iteraciones)...")
-        
-        # Listas para almacenar resultados de cada iteración
-        costos_totales = []
-        clientes_atendidos_list = []
-        clientes_perdidos_list = []
-        eficiencias = []
-        clientes_ingresaron_list = []
-        
-        for iteracion in range(num_iteraciones):
-            if num_iteraciones > 1:
-                progreso = ((iteracion + 1) / num_iteraciones) * 100
-                print(f"  Iteración {iteracion + 1}/{num_iteraciones} ({progreso:.1f}%)...", end="")
-            
-            simulador = ejecutar_simulacion_simple(num_boxes, False)
-            stats = simulador.obtener_estadisticas()
-            
-            costos_totales.append(stats['costo_total'])
-            clientes_atendidos_list.append(stats['clientes_atendidos'])
-            clientes_perdidos_list.append(stats['clientes_no_atendidos'])
-            clientes_ingresaron_list.append(stats['clientes_ingresaron'])
-            eficiencia = stats['clientes_atendidos'] / max(1, stats['clientes_ingresaron']) * 100
-            eficiencias.append(eficiencia)
-            
-            if num_iteraciones > 1:
-                print(f" ${stats['costo_total']:,}")
-            
-            # Mostrar progreso parcial cada 25 iteraciones para simulaciones largas
-            if num_iteraciones >= 50 and (iteracion + 1) % 25 == 0:
-                costo_parcial = np.mean(costos_totales)
-                eficiencia_parcial = np.mean(eficiencias)
-                print(f"    Progreso parcial - Costo promedio: ${costo_parcial:,.0f}, Eficiencia: {eficiencia_parcial:.1f}%")
-        
-        # Calcular promedios y desviaciones estándar
-        costo_promedio = np.mean(costos_totales)
-        costo_std = np.std(costos_totales)
-        atendidos_promedio = np.mean(clientes_atendidos_list)
-        atendidos_std = np.std(clientes_atendidos_list)
-        perdidos_promedio = np.mean(clientes_perdidos_list)
-        perdidos_std = np.std(clientes_perdidos_list)
-        eficiencia_promedio = np.mean(eficiencias)
-        eficiencia_std = np.std(eficiencias)
-        ingresaron_promedio = np.mean(clientes_ingresaron_list)
-        
+    def mostrar_resultado(r):
+        print(f"{r.boxes} boxes (ráfaga de {r.ventana // 60} min: llegadas x{r.inclinacion_llegadas:g}, "
+              f"atención x{r.inclinacion_atencion:g}):")
+        print(f"  P(al menos un perdido): {r.probabilidad:.3e} (IC 95%: "
+              f"{max(0, r.probabilidad - 1.96 * r.error_estandar):.3e} a {r.probabilidad + 1.96 * r.error_estandar:.3e})")
+        print(f"  Error relativo: {r.error_relativo * 100:.1f}% - tamaño efectivo de muestra: {r.tamano_efectivo:.1f} "
+              f"({r.mananas_con_perdidas} mañanas con pérdidas)")
+        print(f"  Clientes perdidos esperados: {r.perdidos_medio:.3e}")
+        print(f"  Equivale a ~{r.reduccion_varianza * r.replicas:,.0f} réplicas de Monte Carlo directo")
+        if r.tamano_efectivo < 30 or r.error_relativo > 0.3:
+            print(f"  ⚠️  Pesos muy desparejos: la estimación es poco confiable, conviene más réplicas")
+        print()
+    
+    resultados = analizar_perdidas_raras(lista_boxes, replicas, semilla, callback_progreso=mostrar_resultado)
+    print(f"Tiempo total: {time.time() - inicio:.1f} s")
+    return resultados
+
+def ejecutar_validacion(replicas: int = 100, semilla=None) -> bool:
+    """Compara los motores rápidos y los muestreos alternativos con el simulador segundo a segundo"""
+    semilla = semilla if semilla is not None else 0
+    print(f"Validando motores contra SimuladorAtencion: {replicas} réplicas por configuración (semilla {semilla})\n")
+    inicio = time.time()
+    punto_actual = [None]
+    
+    def mostrar_comparacion(c):
+        if c.punto != punto_actual[0]:
+            punto_actual[0] = c.punto
+            print(f"🔬 Punto '{c.punto}':")
+        if c.exacta:
+            estado = (f"✅ idéntico en las {c.replicas} réplicas" if c.ok else
+                      f"❌ distinto en {c.replicas_distintas} de {c.replicas} réplicas")
+        else:
+            p_minimo = min(min(p['p_ks'], p['p_mw']) for p in c.pruebas.values())
+            estado = (f"✅ mismas distribuciones (p mínimo {p_minimo:.3f})" if c.ok else
+                      f"❌ campos divergentes: {', '.join(c.campos_divergentes)}")
+        print(f"   {str(c.configuracion):<26} {c.motor:<11} {estado}")
+        for campo in c.campos_divergentes:
+            prueba = c.pruebas[campo]
+            print(f"      {campo}: media {prueba['media_alternativa']:.2f} vs {prueba['media_referencia']:.2f} "
+                  f"(banda ±{prueba['banda']:.2f}), p KS {prueba['p_ks']:.2e}, p Mann-Whitney {prueba['p_mw']:.2e}")
+    
+    resultado = validar_motores(replicas, semilla, callback_progreso=mostrar_comparacion)
+    print()
+    if resultado.ok:
+        print(f"✅ Las {len(resultado.comparaciones)} comparaciones coinciden con la referencia "
+              f"(alfa global {resultado.alfa})")
+    else:
+        print(f"❌ {len(resultado.divergencias)} de {len(resultado.comparaciones)} comparaciones divergen de la referencia")
+    print(f"Tiempo total: {time.time() - inicio:.1f} s")
+    return resultado.ok
+
+def ejecutar_red(ruta: str, replicas: int = 1000, semilla=None, workers=None):
+    """Simula todas las sucursales de una red juntas e informa por sucursal y para toda la red"""
+    sucursales = cargar_sucursales(ruta)
+    print(f"Simulando {len(sucursales)} sucursales x {replicas} réplicas "
+          f"({len(sucursales) * replicas:,} mañanas) en {workers or os.cpu_count()} procesos...\n")
+    inicio = time.time()
+    red = simular_red(sucursales, replicas, semilla, workers=workers)
+    duracion = time.time() - inicio
+    
+    promedios = red.promedios()
+    desvios = {nombre: valores.std(axis=1) for nombre, valores in red.metricas.items()}
+    print(f"{'Sucursal':<18} {'Boxes':>5} {'Llegan':>8} {'Atendidos':>10} {'Perdidos':>9} {'Costo promedio':>22}")
+    for i, sucursal in enumerate(sucursales):
+        costo = f"${promedios['costo_total'][i]:,.0f} (±${desvios['costo_total'][i]:,.0f})"
+        print(f"{sucursal.nombre[:18]:<18} {sucursal.boxes:>5} {promedios['clientes_ingresaron'][i]:>8.1f} "
+              f"{promedios['clientes_atendidos'][i]:>10.1f} {promedios['clientes_no_atendidos'][i]:>9.2f} {costo:>22}")
+    
+    totales = red.totales_red()
+    costo = totales['costo_total']
+    margen = 1.96 * costo.std(ddof=1) / np.sqrt(replicas) if replicas > 1 else 0.0
+    print()
+    print("🏢 Toda la red (por mañana):")
+    print(f"   Clientes: {totales['clientes_ingresaron'].mean():,.1f} llegan, "
+          f"{totales['clientes_atendidos'].mean():,.1f} atendidos, {totales['clientes_no_atendidos'].mean():,.2f} perdidos")
+    print(f"   Costo total: ${costo.mean():,.0f} ± ${margen:,.0f} (IC 95%) = "
+          f"${totales['costo_boxes'].mean():,.0f} en boxes + ${totales['costo_perdidas'].mean():,.0f} en pérdidas")
+    print(f"   Espera máxima en la red: {totales['tiempo_max_espera_seg'].mean() / 60:.1f} min promedio, "
+          f"{totales['tiempo_max_espera_seg'].max() / 60:.1f} min en la peor mañana")
+    peor = int(np.argmax(promedios['costo_perdidas']))
+    print(f"   Mayor pérdida esperada: {sucursales[peor].nombre} (${promedios['costo_perdidas'][peor]:,.0f} por mañana)")
+    print(f"\n⚡ {len(sucursales) * replicas:,} mañanas en {duracion:.1f} s "
+          f"({len(sucursales) * replicas / max(duracion, 1e-9):,.0f} mañanas/s)")
+    return red
+
+def ejecutar_benchmark_nucleo(replicas: int = 300, semilla=None):
+    """Compara el tiempo por mañana de cada motor para 1 a 10 boxes sobre las mismas semillas"""
+    semilla = semilla if semilla is not None else 0
+    print(f"Midiendo motores con {replicas} mañanas de 1 a 10 boxes (semilla {semilla})...")
+    if not JIT_DISPONIBLE:
+        print("⚠️  Numba no está instalado: el núcleo compilado usa el motor rápido en Python puro")
+    tiempos = medir_nucleos(replicas, semilla=semilla)
+    print()
+    nombres = {
+        'simulador': 'SimuladorAtencion (segundo a segundo)',
+        'rapido': 'Motor rápido (una configuración a la vez)',
+        'una_pasada': 'Una pasada (todas las configuraciones)',
+        'jit': 'Núcleo compilado' if JIT_DISPONIBLE else 'Núcleo compilado (sin Numba)',
+    }
+    for motor, nombre in nombres.items():
+        print(f"   {nombre:<42} {tiempos[motor]:>10.3f} ms por mañana "
+              f"({tiempos['simulador'] / tiempos[motor]:>7.0f}x)")
+    print(f"\n⏱️  Primera llamada al núcleo (compilación o caché): {tiempos['compilacion']:.2f} s")
+    return tiempos
+
+def resumir_configuraciones(lote) -> list:
+    """Promedios y desvíos por configuración de un lote, en el formato de los gráficos comparativos"""
+    eficiencias = lote['clientes_atendidos'] / np.maximum(1, lote['clientes_ingresaron']) * 100
+    resultados = []
+    for i, num_boxes in enumerate(lote.configuraciones):
         resultados.append({
             'boxes': num_boxes,
-            'costo_total': costo_promedio,
-            'costo_std': costo_std,
-            'clientes_atendidos': atendidos_promedio,
-            'clientes_atendidos_std': atendidos_std,
-            'clientes_perdidos': perdidos_promedio,
-            'clientes_perdidos_std': perdidos_std,
-            'clientes_ingresaron': ingresaron_promedio,
-            'eficiencia': eficiencia_promedio,
-            'eficiencia_std': eficiencia_std,
-            'num_iteraciones': num_iteraciones
+            'costo_total': lote['costo_total'][i].mean(),
+            'costo_std': lote['costo_total'][i].std(),
+            'costo_boxes': lote['costo_boxes'][i].mean(),
+            'costo_perdidas': lote['costo_perdidas'][i].mean(),
+            'clientes_atendidos': lote['clientes_atendidos'][i].mean(),
+            'clientes_atendidos_std': lote['clientes_atendidos'][i].std(),
+            'clientes_perdidos': lote['clientes_no_atendidos'][i].mean(),
+            'clientes_perdidos_std': lote['clientes_no_atendidos'][i].std(),
+            'clientes_ingresaron': lote['clientes_ingresaron'][i].mean(),
+            'eficiencia': eficiencias[i].mean(),
+            'eficiencia_std': eficiencias[i].std(),
+            'num_iteraciones': lote.replicas
         })
-        
-        print(f"  Promedio - Costo: ${costo_promedio:,.0f} (±${costo_std:,.0f})")
-        print(f"  Promedio - Atendidos: {atendidos_promedio:.1f} (±{atendidos_std:.1f})")
-        print(f"  Promedio - Perdidos: {perdidos_promedio:.1f} (±{perdidos_std:.1f})")
-        print(f"  Promedio - Eficiencia: {eficiencia_promedio:.1f}% (±{eficiencia_std:.1f}%)\n")
     
+    # Error estándar del costo promedio y reducción de varianza del muestreo usado
+    for nombre, metrica in (('costo', 'costo_total'), ('perdidos', 'clientes_no_atendidos'),
+                            ('atendidos', 'clientes_atendidos')):
+        errores = np.sqrt(lote.varianza_estimador(metrica)) if lote.replicas > 1 else np.zeros(len(resultados))
+        reducciones = lote.reduccion_varianza(metrica) if lote.replicas > 1 else np.ones(len(resultados))
+        for r, error, reduccion in zip(resultados, errores, reducciones):
+            r[f'{nombre}_error'] = error
+            r[f'{nombre}_reduccion_varianza'] = reduccion
+    return resultados
+
+def informar_seleccion(resultados, num_iteraciones: int, tiempo_total: float):
+    """Elige e informa la configuración óptima y la que elimina pérdidas a partir de los resúmenes"""
     # Encontrar configuración óptima (más flexible - considera eficiencia y costo)
     # Criterio flexible: dentro del 5% del menor costo, priorizar eficiencia
     config_menor_costo = min(resultados, key=lambda x: x['costo_total'])
@@ -161,7 +415,6 @@ def comparar_configuraciones(max_boxes: int = 10, num_iteraciones: int = 10):
         print(f"   ❌ No hay configuración sin pérdidas, usando la de menor pérdida: {config_sin_perdidas['boxes']} boxes")
     print()
     
-    tiempo_total = time.time() - tiempo_inicio
     minutos_total = int(tiempo_total // 60)
     segundos_total = int(tiempo_total % 60)
     
@@ -221,12 +474,152 @@ def comparar_configuraciones(max_boxes: int = 10, num_iteraciones: int = 10):
     print(f"Iteraciones por configuración: {num_iteraciones}")
     print(f"Tiempo total de análisis: {minutos_total} min {segundos_total} seg")
     print("="*80)
+
+def comparar_configuraciones(max_boxes: int = 10, num_iteraciones: int = 10, perfil=None, semilla=None,
+                             workers=1, coordinador=None, muestreo: str = 'independiente',
+                             variables_control: bool = False, guardar=None, podar: bool = False):
+    """Compara diferentes configuraciones de boxes con múltiples simulaciones
+    
+    Todas las configuraciones se simulan sobre las mismas mañanas (mismas semillas por
+    iteración) con el motor rápido, que da los mismos resultados que el simulador.
+    Con coordinador ('host:puerto') las réplicas se reparten entre trabajadores TCP.
+    muestreo: 'independiente', 'antitetico' (pares espejo) o 'sobol' (cuasi Monte Carlo).
+    variables_control: informa además costo y perdidos ajustados por los clientes que
+    llegaron y el trabajo ofrecido (valores esperados conocidos).
+    guardar: archivo .npz donde dejar los resultados por réplica para recostearlos después.
+    podar: deja de simular las configuraciones dominadas (ver poda.py); las podadas se
+    informan con las réplicas que llegaron a simularse.
+    """
+    total_simulaciones = max_boxes * num_iteraciones
+    print(f"Comparando configuraciones de boxes...")
+    if perfil is not None:
+        print(f"Perfil de llegadas: {perfil.describir()}")
+    print(f"Ejecutando {num_iteraciones} simulaciones por cada configuración (1-{max_boxes} boxes)")
+    if muestreo != 'independiente':
+        print(f"Muestreo: {muestreo}")
+    print(f"Total de simulaciones: {total_simulaciones}\n")
+    
+    tiempo_inicio = time.time()
+    
+    def mostrar_progreso(completadas, total):
+        print(f"  Iteraciones completadas: {completadas}/{total} ({completadas / total * 100:.1f}%)")
+    
+    configuraciones = list(range(1, max_boxes + 1))
+    parametros = ParametrosSimulacion(perfil_llegadas=perfil)
+    if podar:
+        poda = ejecutar_lote_con_poda(configuraciones, num_iteraciones, semilla, parametros,
+                                      callback_progreso=mostrar_progreso)
+        lote = poda.lote
+    elif coordinador is not None:
+        lote = ejecutar_lote_distribuido(configuraciones, num_iteraciones, semilla, coordinador, parametros,
+                                         callback_progreso=mostrar_progreso, muestreo=muestreo)
+    else:
+        lote = ejecutar_lote(configuraciones, num_iteraciones, semilla, parametros, workers,
+                             callback_progreso=mostrar_progreso, tamano_bloque=25, muestreo=muestreo)
+    if podar:
+        resultados = [resumir_configuraciones(poda.sublote(i))[0] for i in range(len(configuraciones))]
+        for i, r in enumerate(resultados):
+            r['num_iteraciones'] = num_iteraciones
+            r['replicas_simuladas'] = int(poda.replicas_simuladas[i])
+            r['cota_inferior'] = bool(poda.truncadas[i].any())
+    else:
+        resultados = resumir_configuraciones(lote)
+    if variables_control:
+        for nombre, metrica in (('costo', 'costo_total'), ('perdidos', 'clientes_no_atendidos')):
+            for r, estimacion in zip(resultados, ajustar_lote(lote, metrica, parametros)):
+                r[f'{nombre}_vc'] = estimacion
+    print()
+    
+    for r in resultados:
+        print(f"{r['boxes']} boxes:")
+        print(f"  Promedio - Costo: ${r['costo_total']:,.0f} (±${r['costo_std']:,.0f})")
+        print(f"  Promedio - Atendidos: {r['clientes_atendidos']:.1f} (±{r['clientes_atendidos_std']:.1f})")
+        print(f"  Promedio - Perdidos: {r['clientes_perdidos']:.1f} (±{r['clientes_perdidos_std']:.1f})")
+        print(f"  Promedio - Eficiencia: {r['eficiencia']:.1f}% (±{r['eficiencia_std']:.1f}%)")
+        if podar and r['replicas_simuladas'] < num_iteraciones:
+            print(f"  ✂️  Podada tras {r['replicas_simuladas']} réplicas: dominada por otra configuración")
+            if r['cota_inferior']:
+                print(f"     Algunas mañanas se cortaron al superar la cota: costo y perdidos son cotas inferiores, el resto de las métricas es parcial")
+        if muestreo != 'independiente':
+            print(f"  Error estándar del costo: ${r['costo_error']:,.0f} - reducción de varianza: "
+                  f"costo x{r['costo_reduccion_varianza']:.2f}, perdidos x{r['perdidos_reduccion_varianza']:.2f}, "
+                  f"atendidos x{r['atendidos_reduccion_varianza']:.2f}")
+        if variables_control:
+            costo, perdidos = r['costo_vc'], r['perdidos_vc']
+            print(f"  Con variables de control - Costo: ${costo.media:,.0f} (IC 95% ±${costo.semiancho:,.0f}, "
+                  f"sin control ±${costo.semiancho_sin_control:,.0f}), "
+                  f"reducción de varianza x{costo.reduccion_varianza:.2f}")
+            print(f"  Con variables de control - Perdidos: {perdidos.media:.2f} (IC 95% ±{perdidos.semiancho:.2f}), "
+                  f"beta: {perdidos.beta[0]:.3f} por cliente, {perdidos.beta[1] * 60:.4f} por minuto de trabajo")
+        print()
+    
+    if podar:
+        simuladas = int(poda.replicas_simuladas.sum())
+        print(f"✂️  Poda: {len(poda.eliminadas)} configuraciones eliminadas antes de terminar, "
+              f"{simuladas} de {len(configuraciones) * num_iteraciones} réplicas-configuración simuladas")
+        print(f"   Pasos cliente-configuración: {poda.pasos:,} de {poda.pasos_sin_poda:,} "
+              f"({poda.trabajo_ahorrado * 100:.1f}% de trabajo ahorrado)")
+        if poda.recompletadas:
+            print(f"   Mañanas cortadas por la cota y vueltas a simular (configuraciones que siguieron): "
+                  f"{poda.recompletadas}")
+        print()
+    
+    tiempo_total = time.time() - tiempo_inicio
+    informar_seleccion(resultados, num_iteraciones, tiempo_total)
+    if guardar is not None:
+        guardar_resultados(lote, guardar, parametros)
+        print(f"💾 Resultados por réplica guardados en '{guardar}' (recostear con --recost {guardar})")
     
     # Generar gráficos
     generar_graficos_comparacion(resultados)
     
     return resultados
 
+def ejecutar_recosteo(ruta: str, costos_box=None, perdidas_cliente=None):
+    """Recalcula costos y configuración óptima de un estudio guardado con --save-outcomes
+
+    Con un solo costo de box y una sola pérdida por cliente repite el informe y los
+    gráficos de --compare; con varios valores arma la grilla de todas las combinaciones
+    y muestra la configuración más barata de cada una.
+    """
+    lote, parametros = cargar_resultados(ruta)
+    costos_box = costos_box or [parametros.costo_box]
+    perdidas_cliente = perdidas_cliente or [parametros.perdida_cliente]
+    print(f"Recosteando {lote.replicas} réplicas de {len(lote.configuraciones)} configuraciones de '{ruta}'")
+    
+    if len(costos_box) == 1 and len(perdidas_cliente) == 1:
+        print(f"Costo por box: ${costos_box[0]:,.0f} - pérdida por cliente: ${perdidas_cliente[0]:,.0f}\n")
+        inicio = time.perf_counter()
+        recosteado = recostear(lote, costos_box[0], perdidas_cliente[0], parametros)
+        resultados = resumir_configuraciones(recosteado)
+        tiempo_total = time.perf_counter() - inicio
+        for r in resultados:
+            print(f"{r['boxes']} boxes: costo ${r['costo_total']:,.0f} (±${r['costo_std']:,.0f}) - "
+                  f"perdidos {r['clientes_perdidos']:.2f}")
+        print()
+        informar_seleccion(resultados, lote.replicas, tiempo_total)
+        print(f"⚡ Recosteo en {tiempo_total * 1000:.1f} ms, sin volver a simular")
+        generar_graficos_comparacion(resultados)
+        return resultados
+    
+    inicio = time.perf_counter()
+    grilla = recostear_grilla(lote, costos_box, perdidas_cliente, parametros)
+    tiempo_total = time.perf_counter() - inicio
+    print(f"Configuración de menor costo promedio para cada combinación "
+          f"({len(perdidas_cliente)} pérdidas x {len(costos_box)} costos de box):\n")
+    ancho = 22
+    print(f"{'Pérdida / Box':>14} " + "".join(f"{'$' + format(c, ',.0f'):>{ancho}}" for c in costos_box))
+    for i, perdida in enumerate(perdidas_cliente):
+        celdas = []
+        for j in range(len(costos_box)):
+            k = grilla['optima'][i, j]
+            celda = f"{lote.configuraciones[k]} (${grilla['costo_medio'][i, j, k]:,.0f})"
+            celdas.append(f"{celda:>{ancho}}")
+        print(f"{'$' + format(perdida, ',.0f'):>14} " + "".join(celdas))
+    print()
+    print(f"⚡ {grilla['optima'].size} combinaciones recosteadas en {tiempo_total * 1000:.1f} ms, sin volver a simular")
+    return grilla
+
 def generar_graficos_comparacion(resultados):
     """Genera gráficos comparativos de las configuraciones con barras de error"""
     boxes = [r['boxes'] for r in resultados]
@@ -349,8 +742,8 @@ def generar_graficos_comparacion(resultados):
     if config_sin_perdidas is None:
         config_sin_perdidas = min(resultados, key=lambda x: x['clientes_perdidos'])
     
-    costo_boxes = mejor['boxes'] * 1000
-    costo_perdidas = mejor['clientes_perdidos'] * 10000
+    costo_boxes = mejor.get('costo_boxes', mejor['boxes'] * 1000)
+    costo_perdidas = mejor.get('costo_perdidas', mejor['clientes_perdidos'] * 10000)
     
     # Colores más distintivos
     colors = ['#66b3ff', '#ff9999']  # Azul claro y rojo claro
@@ -435,10 +828,10 @@ def menu_interactivo():
                     
             elif opcion == '3':
                 num_boxes = int(input("Número de boxes (1-10): "))
-                velocidad = input("Velocidad inicial (0.25, 0.5, 1, 2, 4, 8, 16, 32) [1]: ").strip()
+                velocidad = input("Velocidad inicial (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256) [1]: ").strip()
                 velocidad = float(velocidad) if velocidad else 1.0
                 
-                if 1 <= num_boxes <= 10 and velocidad in [0.25, 0.5, 1, 2, 4, 8, 16, 32]:
+                if 1 <= num_boxes <= 10 and velocidad in [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256]:
                     print("Iniciando simulación visual con grabación...")
                     print(f"Velocidad inicial: {velocidad}x")
                     print("Se generará un archivo 'simulacion.avi' al finalizar")
@@ -448,8 +841,8 @@ def menu_interactivo():
                 else:
                     if not (1 <= num_boxes <= 10):
                         print("Número de boxes debe estar entre 1 y 10")
-                    if velocidad not in [0.25, 0.5, 1, 2, 4, 8, 16, 32]:
-                        print("Velocidad debe ser una de: 0.25, 0.5, 1, 2, 4, 8, 16, 32")
+                    if velocidad not in [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256]:
+                        print("Velocidad debe ser una de: 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256")
                     
             elif opcion == '4':
                 max_boxes = input("Número máximo de boxes para comparar [10]: ").strip()
@@ -501,8 +894,23 @@ def main():
         python main.py -b 4 --video             # Simulación con video
         python main.py -b 4 --video --speed 16  # Video a velocidad 16x
         python main.py -b 4 --video --speed 32  # Video a velocidad 32x
+        python main.py -b 4 --render-video --seed 7  # Video AVI sin ventana (servidores)
+        python main.py -b 4 --render-video --speeds 1 4 16 32  # Varios AVI en una pasada
+        python main.py --compare-visual 3 5 7 --seed 1  # Paneles lado a lado, mismas llegadas
+        python main.py -b 3 --fork-at 10:15 --fork-boxes 3 5 --seed 2  # ¿Y si abrimos 2 boxes a las 10:15?
         python main.py --compare                 # Análisis comparativo (10 iter/config)
+        python main.py --serve --workers 8       # Servicio de trabajos en http://127.0.0.1:8765
+        python main.py --compare --iterations 200 --coordinator 0.0.0.0:9000  # Réplicas en varios nodos
+        python main.py --worker coordinador:9000  # Nodo de cálculo
+        python main.py --optimize-schedule --loss-target 0.5 --iterations 200  # Boxes por bloque de 30 min
+        python main.py --compare --arrival-profile perfil_llegadas_ejemplo.csv  # Llegadas con pico
+        python main.py -b 3 --classes clases_ejemplo.json  # Clientes prioritarios y generales
+        python main.py -b 4 --steady-state --hours 5000  # Pérdidas de largo plazo sin cierre
+        python main.py --rare-losses 8 9 10      # P(perder algún cliente) con muchos boxes
+        python main.py --network sucursales_ejemplo.json --network-replicas 2000  # Toda la red de sucursales
         python main.py --compare --iterations 50 # Análisis con 50 iter/config
+        python main.py --compare --iterations 64 --sampling sobol  # Menos varianza con las mismas iteraciones
+        python main.py --compare --iterations 50 --control-variates  # IC ajustados por llegadas y trabajo
         python main.py --compare --max-boxes 5 --iterations 100  # 5 boxes max, 100 iter/config
         python main.py --compare --iterations 200 # Máxima precisión: 200 iter/config
                 """
@@ -515,9 +923,86 @@ def main():
     parser.add_argument('--video', action='store_true',
                        help='Grabar video de la simulación')
     parser.add_argument('--speed', type=float, default=1.0, metavar='N',
-                       help='Velocidad inicial de simulación (0.25, 0.5, 1, 2, 4, 8, 16, 32)')
+                       help='Velocidad inicial de simulación (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256)')
+    parser.add_argument('--render-video', action='store_true',
+                       help='Renderizar el video AVI sin ventana y sin limitar FPS')
+    parser.add_argument('--speeds', type=float, nargs='+', metavar='N',
+                       help='Velocidades a exportar con --render-video (ej: 1 4 16 32)')
+    parser.add_argument('--chunks', type=int, default=None, metavar='N',
+                       help='Con -b y --render-video: dividir el video en N tramos renderizados en paralelo '
+                            '(usa --workers)')
+    parser.add_argument('--seed', type=int, default=None, metavar='N',
+                       help='Semilla aleatoria para reproducir la simulación')
+    parser.add_argument('--network', metavar='ARCHIVO.json',
+                       help='Simular una red de sucursales (JSON con nombre, boxes, prob_llegada, atención, '
+                            'paciencia y costos de cada una) e informar por sucursal y para toda la red')
+    parser.add_argument('--network-replicas', type=int, default=1000, metavar='N',
+                       help='Réplicas por sucursal con --network (default: 1000)')
+    parser.add_argument('--render-batch', type=int, nargs=2, metavar=('DESDE', 'HASTA'),
+                       help='Renderizar sin ventana simulacion_N_boxes.avi para N de DESDE a HASTA, '
+                            'una configuración por proceso (usa --seed, --speeds y --workers)')
+    parser.add_argument('--compare-visual', type=int, nargs='+', metavar='N',
+                       help='Comparar visualmente varias cantidades de boxes lado a lado (ej: 3 5 7)')
+    parser.add_argument('--fork-at', metavar='HH:MM',
+                       help='Hora de bifurcación para análisis "qué pasaría si" (requiere -b y --fork-boxes)')
+    parser.add_argument('--fork-boxes', type=int, nargs='+', metavar='N',
+                       help='Cantidades de boxes a evaluar desde --fork-at')
+    parser.add_argument('--fork-replicas', type=int, default=1, metavar='N',
+                       help='Futuros aleatorios por rama (default: 1, mismos números aleatorios)')
+    parser.add_argument('--workers', type=int, default=None, metavar='N',
+                       help='Procesos en paralelo (default: todos los núcleos)')
+    parser.add_argument('--arrival-profile', metavar='ARCHIVO.csv',
+                       help='CSV con clientes observados por hora (hora,clientes) para llegadas no homogéneas')
+    parser.add_argument('--smooth-profile', action='store_true',
+                       help='Suavizar el perfil de llegadas con un spline en lugar de tramos constantes')
+    parser.add_argument('--classes', metavar='ARCHIVO.json',
+                       help='Clases de cliente con prioridad, tasa, atención, paciencia y pérdida propias')
+    parser.add_argument('--optimize-schedule', action='store_true',
+                       help='Buscar la agenda de boxes por bloque de 30 minutos más barata (usa --max-boxes e --iterations)')
+    parser.add_argument('--loss-target', type=float, default=1.0, metavar='X',
+                       help='Máximo de clientes perdidos promedio por mañana para --optimize-schedule (default: 1)')
+    parser.add_argument('--steady-state', action='store_true',
+                       help='Operación continua: una corrida larga con intervalos por medias de lotes (con -b o hasta --max-boxes)')
+    parser.add_argument('--hours', type=float, default=1000, metavar='H',
+                       help='Horas simuladas por configuración en --steady-state (default: 1000)')
+    parser.add_argument('--batches', type=int, default=20, metavar='N',
+                       help='Cantidad de lotes no solapados en --steady-state (default: 20)')
+    parser.add_argument('--rare-losses', type=int, nargs='*', metavar='N',
+                       help='Probabilidad de perder clientes con muchos boxes por muestreo de importancia (default: 8 9 10)')
+    parser.add_argument('--rare-replicas', type=int, default=2000, metavar='N',
+                       help='Réplicas por configuración en --rare-losses (default: 2000)')
+    parser.add_argument('--validate', action='store_true',
+                       help='Comparar todos los motores con el simulador segundo a segundo (sale con error si divergen)')
+    parser.add_argument('--validate-replicas', type=int, default=100, metavar='N',
+                       help='Réplicas por configuración en --validate (default: 100)')
+    parser.add_argument('--benchmark-kernel', action='store_true',
+                       help='Medir el tiempo por mañana de cada motor, incluido el núcleo compilado con Numba')
+    parser.add_argument('--serve', action='store_true',
+                       help='Iniciar el servicio local de trabajos de simulación (HTTP/JSON en localhost)')
+    parser.add_argument('--port', type=int, default=8765, metavar='N',
+                       help='Puerto del servicio (default: 8765)')
+    parser.add_argument('--coordinator', metavar='[HOST:]PUERTO',
+                       help='Con --compare, repartir las réplicas entre trabajadores TCP (ej: 0.0.0.0:9000)')
+    parser.add_argument('--worker', metavar='HOST:PUERTO',
+                       help='Trabajar como nodo de cálculo para un coordinador')
     parser.add_argument('--compare', action='store_true',
                        help='Ejecutar análisis comparativo')
+    parser.add_argument('--sampling', choices=['independiente', 'antitetico', 'sobol'], default='independiente',
+                       help='Muestreo de las réplicas en --compare: independiente, antitetico (pares espejo) '
+                            'o sobol (cuasi Monte Carlo aleatorizado)')
+    parser.add_argument('--control-variates', action='store_true',
+                       help='En --compare, informar costo y perdidos ajustados por variables de control '
+                            '(clientes que llegaron y trabajo ofrecido)')
+    parser.add_argument('--prune', action='store_true',
+                       help='En --compare, dejar de simular las configuraciones dominadas (informa el trabajo ahorrado)')
+    parser.add_argument('--save-outcomes', metavar='ARCHIVO.npz',
+                       help='Con --compare, guardar los resultados por réplica para recostearlos después')
+    parser.add_argument('--recost', metavar='ARCHIVO.npz',
+                       help='Recalcular costos y configuración óptima de un estudio guardado, sin volver a simular')
+    parser.add_argument('--box-cost', type=float, nargs='+', metavar='X',
+                       help='Costo por box para --recost; con varios valores arma una grilla (default: el del estudio)')
+    parser.add_argument('--loss-cost', type=float, nargs='+', metavar='X',
+                       help='Pérdida por cliente no atendido para --recost; admite varios valores (default: el del estudio)')
     parser.add_argument('--max-boxes', type=int, default=10, metavar='N',
                        help='Número máximo de boxes para comparación (default: 10)')
     parser.add_argument('--iterations', type=int, default=10, metavar='N',
@@ -536,34 +1021,169 @@ def main():
         sys.exit(1)
     
     # Validar velocidad
-    velocidades_validas = [0.25, 0.5, 1, 2, 4, 8, 16, 32]
+    velocidades_validas = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256]
     if args.speed not in velocidades_validas:
         print(f"Error: La velocidad debe ser una de: {velocidades_validas}")
         print(f"Velocidad proporcionada: {args.speed}")
         sys.exit(1)
     
+    # Validar velocidades múltiples: cada una debe ser múltiplo de la más lenta
+    if args.speeds:
+        if any(v not in velocidades_validas for v in args.speeds):
+            print(f"Error: Las velocidades deben ser de: {velocidades_validas}")
+            sys.exit(1)
+        if any((v / min(args.speeds)) % 1 for v in args.speeds):
+            print("Error: Cada velocidad debe ser múltiplo entero de la más lenta")
+            sys.exit(1)
+    
+    if args.chunks is not None:
+        if args.chunks < 1:
+            print("Error: --chunks debe ser al menos 1")
+            sys.exit(1)
+        if not (args.boxes and args.render_video) or args.compare_visual or args.render_batch:
+            print("Error: --chunks solo se puede usar con -b y --render-video")
+            sys.exit(1)
+    
     # Validar número de iteraciones
     if args.iterations and not (1 <= args.iterations <= 200):
         print("Error: El número de iteraciones debe estar entre 1 y 200")
         sys.exit(1)
     
+    # Cargar el perfil de llegadas, si se indicó
+    perfil = None
+    if args.arrival_profile:
+        try:
+            perfil = PerfilLlegadas.desde_csv(args.arrival_profile, suavizar=args.smooth_profile)
+        except (OSError, ValueError) as e:
+            print(f"Error al leer el perfil de llegadas: {e}")
+            sys.exit(1)
+        print(f"Perfil de llegadas: {perfil.describir()}, "
+              f"~{perfil.clientes_esperados(4 * 3600):.0f} clientes esperados")
+    
+    # Cargar las clases de cliente, si se indicaron (solo las usa el simulador segundo a segundo)
+    clases = None
+    if args.classes:
+        if args.compare or args.optimize_schedule or args.serve or args.worker or args.steady_state or args.recost \
+                or args.validate or args.network or args.benchmark_kernel or args.rare_losses is not None:
+            print("Error: --classes solo se puede usar con -b, --compare-visual o --render-batch "
+                  "(el motor rápido de --compare y --optimize-schedule es de una sola clase)")
+            sys.exit(1)
+        try:
+            clases = cargar_clases(args.classes)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error al leer las clases de cliente: {e}")
+            sys.exit(1)
+        print("Clases de cliente: " + ", ".join(
+            f"{c.nombre} (prioridad {c.prioridad}, ~{c.prob_llegada * 4 * 3600:.0f} clientes)" for c in clases))
+    
     # Ejecutar según los argumentos
-    if args.compare:
-        comparar_configuraciones(args.max_boxes, args.iterations)
+    if args.worker:
+        ejecutar_trabajador(args.worker)
+    elif args.serve:
+        from servicio import iniciar_servicio
+        iniciar_servicio('127.0.0.1', args.port, args.workers)
+    elif args.network:
+        if args.arrival_profile or args.network_replicas < 1:
+            print("Error: --network usa tasas de llegada constantes (sin --arrival-profile) y al menos 1 réplica")
+            sys.exit(1)
+        try:
+            ejecutar_red(args.network, args.network_replicas, args.seed, args.workers)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error al leer las sucursales: {e}")
+            sys.exit(1)
+    elif args.render_batch:
+        desde, hasta = args.render_batch
+        if not 1 <= desde <= hasta <= 10:
+            print("Error: --render-batch necesita 1 <= DESDE <= HASTA <= 10")
+            sys.exit(1)
+        velocidades = sorted(set(args.speeds)) if args.speeds else [args.speed]
+        ejecutar_render_lote(list(range(desde, hasta + 1)), args.seed, velocidades, args.workers, perfil, clases)
+    elif args.compare_visual:
+        if not all(1 <= b <= 10 for b in args.compare_visual) or len(args.compare_visual) > 6:
+            print("Error: Indique hasta 6 configuraciones de 1 a 10 boxes")
+            sys.exit(1)
+        velocidades = sorted(set(args.speeds)) if args.speeds else [args.speed]
+        modo = 'render' if args.render_video else ('video' if args.video else 'visual')
+        ejecutar_comparacion_visual(args.compare_visual, args.seed, velocidades, modo, perfil, clases)
+    elif args.steady_state:
+        if args.arrival_profile:
+            print("Error: --steady-state necesita llegadas con tasa constante (sin --arrival-profile)")
+            sys.exit(1)
+        if args.batches < 2 or args.hours <= 0:
+            print("Error: --steady-state necesita al menos 2 lotes y una cantidad de horas positiva")
+            sys.exit(1)
+        lista_boxes = [args.boxes] if args.boxes else list(range(1, args.max_boxes + 1))
+        ejecutar_estado_estacionario(lista_boxes, args.hours, args.batches, args.seed)
+    elif args.benchmark_kernel:
+        ejecutar_benchmark_nucleo(semilla=args.seed)
+    elif args.validate:
+        if args.validate_replicas < 10:
+            print("Error: --validate necesita al menos 10 réplicas")
+            sys.exit(1)
+        if not ejecutar_validacion(args.validate_replicas, args.seed):
+            sys.exit(1)
+    elif args.rare_losses is not None:
+        lista_boxes = args.rare_losses or [8, 9, 10]
+        if args.arrival_profile:
+            print("Error: --rare-losses necesita llegadas con tasa constante (sin --arrival-profile)")
+            sys.exit(1)
+        if not all(1 <= b <= 20 for b in lista_boxes) or args.rare_replicas < 10:
+            print("Error: --rare-losses acepta de 1 a 20 boxes y al menos 10 réplicas")
+            sys.exit(1)
+        ejecutar_perdidas_raras(lista_boxes, args.rare_replicas, args.seed)
+    elif args.recost:
+        if any(c < 0 for c in (args.box_cost or []) + (args.loss_cost or [])):
+            print("Error: Los costos deben ser no negativos")
+            sys.exit(1)
+        try:
+            ejecutar_recosteo(args.recost, args.box_cost, args.loss_cost)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error al leer los resultados guardados: {e}")
+            sys.exit(1)
+    elif args.optimize_schedule:
+        ejecutar_optimizacion_agenda(args.max_boxes, args.iterations, args.loss_target, args.seed,
+                                     args.workers, perfil)
+    elif args.compare:
+        if args.control_variates and args.sampling != 'independiente':
+            print("Error: --control-variates requiere réplicas independientes (sin --sampling)")
+            sys.exit(1)
+        if args.prune and (args.coordinator or args.sampling != 'independiente' or args.control_variates
+                           or args.save_outcomes):
+            print("Error: --prune no se puede combinar con --coordinator, --sampling, --control-variates "
+                  "ni --save-outcomes (necesitan todas las réplicas de todas las configuraciones)")
+            sys.exit(1)
+        comparar_configuraciones(args.max_boxes, args.iterations, perfil, args.seed, args.workers,
+                                 args.coordinator, args.sampling, args.control_variates, args.save_outcomes,
+                                 args.prune)
     elif args.boxes:
-        if args.video:
+        if args.fork_at:
+            if not args.fork_boxes:
+                print("Error: --fork-at requiere --fork-boxes")
+                sys.exit(1)
+            segundo = hora_a_segundos(args.fork_at)
+            if not 0 <= segundo < 4 * 3600:
+                print("Error: La hora de bifurcación debe estar entre 08:00 y 11:59")
+                sys.exit(1)
+            ejecutar_que_pasaria_si(args.boxes, args.fork_at, args.fork_boxes, args.seed,
+                                    args.fork_replicas, args.workers, perfil, clases)
+        elif args.render_video:
+            velocidades = sorted(set(args.speeds)) if args.speeds else [args.speed]
+            print(f"Renderizando video sin ventana con {args.boxes} boxes a "
+                  f"{', '.join(f'{v:g}x' for v in velocidades)}...")
+            ejecutar_render_video(args.boxes, velocidades, args.seed, perfil, clases, args.chunks, args.workers)
+        elif args.video:
             print(f"Ejecutando simulación visual con {args.boxes} boxes y grabación de video...")
             if args.speed != 1.0:
                 print(f"Velocidad inicial: {args.speed}x")
-            ejecutar_simulacion_visual(args.boxes, True, args.speed)
+            ejecutar_simulacion_visual(args.boxes, True, args.speed, args.seed, perfil, clases)
         elif args.visual:
             print(f"Ejecutando simulación visual con {args.boxes} boxes...")
             if args.speed != 1.0:
                 print(f"Velocidad inicial: {args.speed}x")
-            ejecutar_simulacion_visual(args.boxes, False, args.speed)
+            ejecutar_simulacion_visual(args.boxes, False, args.speed, args.seed, perfil, clases)
         else:
             print(f"Ejecutando simulación simple con {args.boxes} boxes...")
-            ejecutar_simulacion_simple(args.boxes)
+            ejecutar_simulacion_simple(args.boxes, semilla=args.seed, perfil=perfil, clases=clases)
     else:
         parser.print_help()
 
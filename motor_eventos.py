@@ -0,0 +1,434 @@
+"""
+Motor rápido de simulación por clientes
+
+En lugar de recorrer la mañana segundo a segundo, procesa a los clientes en orden
+de llegada: como la cola es FIFO y todos tienen la misma paciencia, el inicio de
+atención de cada cliente queda determinado por el estado de los boxes que dejaron
+los anteriores (recursión de Lindley con varios servidores). Usa los mismos
+generadores que SimuladorAtencion, así que con la misma semilla los resultados son
+idénticos, incluido el cierre forzado a las 3 horas extra.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass, fields
+from typing import List, Optional, Sequence, Union
+import numpy as np
+
+from perfil_llegadas import PerfilLlegadas
+from simulador import SimuladorAtencion, crear_generadores
+
+
+@dataclass
+class ParametrosSimulacion:
+    """Parámetros del modelo (los mismos valores por defecto que SimuladorAtencion)"""
+    duracion: int = 4 * 3600
+    prob_llegada: float = 1/144
+    tiempo_max_espera: int = 30 * 60
+    media_atencion: float = 10 * 60
+    desvio_atencion: float = 5 * 60
+    costo_box: float = 1000
+    perdida_cliente: float = 10000
+    duracion_bloque: int = 30 * 60
+    tiempo_extra_max: int = 3 * 3600
+    perfil_llegadas: Optional[PerfilLlegadas] = None
+
+    @classmethod
+    def desde_simulador(cls, simulador: SimuladorAtencion) -> 'ParametrosSimulacion':
+        """Toma los parámetros de un simulador (incluidos los modificados a mano)"""
+        if simulador.clases is not None:
+            raise ValueError("El motor rápido no admite clases de cliente: usar SimuladorAtencion")
+        return cls(
+            duracion=simulador.DURACION_SIMULACION,
+            prob_llegada=simulador.PROB_LLEGADA_POR_SEGUNDO,
+            tiempo_max_espera=simulador.TIEMPO_MAX_ESPERA,
+            media_atencion=simulador.MEDIA_ATENCION,
+            desvio_atencion=simulador.DESVIO_ATENCION,
+            costo_box=simulador.COSTO_BOX,
+            perdida_cliente=simulador.PERDIDA_CLIENTE,
+            duracion_bloque=simulador.DURACION_BLOQUE_AGENDA,
+            perfil_llegadas=simulador.perfil_llegadas,
+        )
+
+    def crear_simulador(self, boxes: Union[int, Sequence[int]], semilla=None, clases=None) -> SimuladorAtencion:
+        """SimuladorAtencion (segundo a segundo) con estos parámetros: lo inverso de desde_simulador()"""
+        if self.tiempo_extra_max != 3 * 3600:
+            raise ValueError("SimuladorAtencion siempre fuerza el cierre a las 3 horas extra")
+        if isinstance(boxes, (int, np.integer)):
+            simulador = SimuladorAtencion(int(boxes), semilla, self.perfil_llegadas, clases=clases)
+        else:
+            simulador = SimuladorAtencion(max(boxes), semilla, self.perfil_llegadas, agenda=list(boxes),
+                                          clases=clases)
+        simulador.DURACION_SIMULACION = self.duracion
+        simulador.PROB_LLEGADA_POR_SEGUNDO = self.prob_llegada
+        simulador.TIEMPO_MAX_ESPERA = self.tiempo_max_espera
+        simulador.MEDIA_ATENCION = self.media_atencion
+        simulador.DESVIO_ATENCION = self.desvio_atencion
+        simulador.COSTO_BOX = self.costo_box
+        simulador.PERDIDA_CLIENTE = self.perdida_cliente
+        simulador.DURACION_BLOQUE_AGENDA = self.duracion_bloque
+        return simulador
+
+    def a_dict(self) -> dict:
+        """Parámetros como diccionario serializable a JSON"""
+        datos = {campo.name: getattr(self, campo.name) for campo in fields(self)}
+        perfil = datos.pop('perfil_llegadas')
+        if perfil is not None:
+            datos['perfil_llegadas'] = {'clientes_por_hora': perfil.clientes_por_hora,
+                                        'duracion_tramo': perfil.duracion_tramo,
+                                        'suavizar': perfil.suavizar}
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> 'ParametrosSimulacion':
+        """Crea los parámetros a partir de un diccionario (por ejemplo, leído de JSON)"""
+        datos = dict(datos)
+        desconocidos = set(datos) - {campo.name for campo in fields(cls)}
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+        perfil = datos.pop('perfil_llegadas', None)
+        if perfil is not None:
+            datos['perfil_llegadas'] = PerfilLlegadas(**perfil)
+        return cls(**datos)
+
+    def validar(self) -> 'ParametrosSimulacion':
+        """Verifica que los parámetros describan un modelo simulable (ValueError si no)"""
+        if not 0 < self.prob_llegada <= 1:
+            raise ValueError("'prob_llegada' debe estar en (0, 1]")
+        for nombre in ('duracion', 'duracion_bloque', 'media_atencion'):
+            if not getattr(self, nombre) > 0:
+                raise ValueError(f"'{nombre}' debe ser positivo")
+        for nombre in ('desvio_atencion', 'tiempo_max_espera', 'tiempo_extra_max'):
+            if not getattr(self, nombre) >= 0:
+                raise ValueError(f"'{nombre}' no puede ser negativo")
+        return self
+
+    @property
+    def num_bloques(self) -> int:
+        """Cantidad de bloques de agenda en el horario de atención"""
+        return -(-self.duracion // self.duracion_bloque)
+
+    @property
+    def limite_cierre(self) -> int:
+        """Segundo en el que se fuerza el cierre"""
+        return self.duracion + self.tiempo_extra_max + 1
+
+
+@dataclass
+class CaminoMuestral:
+    """Llegadas y tiempos de atención sorteados para una mañana
+
+    atenciones[k] es la duración que recibe el k-ésimo cliente que empieza a ser
+    atendido (el simulador las sortea en ese orden), no la del k-ésimo en llegar.
+    """
+    llegadas: np.ndarray
+    atenciones: np.ndarray
+
+
+def muestrear_camino(parametros: ParametrosSimulacion, semilla=None) -> CaminoMuestral:
+    """Sortea llegadas y atenciones con los mismos generadores que SimuladorAtencion(semilla)"""
+    rng_llegadas, rng_atencion = crear_generadores(semilla)
+    uniformes = rng_llegadas.random(parametros.duracion)
+    if parametros.perfil_llegadas is None:
+        llegadas = np.flatnonzero(uniformes < parametros.prob_llegada)
+    else:
+        llegadas = parametros.perfil_llegadas.muestrear_llegadas(rng_llegadas, parametros.duracion, uniformes)
+
+    # Como mucho se atiende a todos los que llegan: una normal por cliente alcanza
+    normales = rng_atencion.normal(parametros.media_atencion, parametros.desvio_atencion, len(llegadas))
+    atenciones = np.maximum(normales.astype(np.int64), 30)  # int() trunca hacia cero, mínimo 30 segundos
+    return CaminoMuestral(llegadas, atenciones)
+
+
+def camino_desde_uniformes(parametros: ParametrosSimulacion, uniformes: np.ndarray, semilla=None,
+                           espejo: bool = False) -> CaminoMuestral:
+    """Arma una mañana a partir de un punto de [0, 1)^2K (de una sucesión de Sobol o de un par antitético)
+
+    Las primeras K coordenadas dan los saltos entre llegadas por inversión (el segundo
+    de la próxima llegada dado el anterior, con la misma ley que los sorteos por
+    segundo) y las K siguientes las normales de atención. Si llegan más de K
+    clientes, el resto se completa con sorteos pseudoaleatorios de la semilla, que
+    debe ser independiente de la que dio el punto; con espejo se usa 1 - u.
+    """
+    from scipy.special import ndtri
+
+    duracion = parametros.duracion
+    if parametros.perfil_llegadas is None:
+        probabilidades = np.full(duracion, parametros.prob_llegada)
+    else:
+        probabilidades = parametros.perfil_llegadas.probabilidades(duracion)
+    # log P(ninguna llegada en los segundos 0..t-1): la próxima llegada desde t es el
+    # primer s con supervivencia[s + 1] - supervivencia[t] < log(1 - u)
+    with np.errstate(divide='ignore'):
+        supervivencia = np.concatenate([[0.0], np.cumsum(np.log1p(-probabilidades))])
+
+    uniformes = np.clip(uniformes, 1e-12, 1 - 1e-12)  # Evita saltos y normales infinitos
+    k = len(uniformes) // 2
+    # Saltos y atenciones de más con generadores separados: así los de un par
+    # antitético quedan alineados aunque lleguen distintas cantidades de clientes
+    rng_saltos, rng_atencion = crear_generadores(semilla)
+
+    def sortear(rng, n=None):
+        u = rng.random(n)
+        return 1.0 - u if espejo else u
+
+    saltos = uniformes[:k]
+    llegadas = []
+    desde = 0
+    while desde < duracion:
+        u = saltos[len(llegadas)] if len(llegadas) < k else sortear(rng_saltos)
+        objetivo = supervivencia[desde] + np.log1p(-u)
+        # supervivencia es decreciente: se busca sobre su opuesto, que es creciente
+        llegada = int(np.searchsorted(-supervivencia, -objetivo, side='right')) - 1
+        if llegada >= duracion:
+            break
+        llegadas.append(llegada)
+        desde = llegada + 1
+    llegadas = np.asarray(llegadas, dtype=np.int64)
+
+    u_atencion = uniformes[k:2 * k][:len(llegadas)]
+    if len(llegadas) > k:
+        u_atencion = np.concatenate([u_atencion, sortear(rng_atencion, len(llegadas) - k)])
+    normales = parametros.media_atencion + parametros.desvio_atencion * ndtri(u_atencion)
+    atenciones = np.maximum(normales.astype(np.int64), 30)
+    return CaminoMuestral(llegadas, atenciones)
+
+
+def normalizar_agenda(boxes: Union[int, Sequence[int]], parametros: ParametrosSimulacion) -> List[int]:
+    """Agenda con un valor por bloque del horario (un número fijo de boxes se repite en todos)"""
+    if isinstance(boxes, (int, np.integer)):
+        return [int(boxes)] * parametros.num_bloques
+    agenda = [int(b) for b in boxes]
+    if not agenda or min(agenda) < 1:
+        raise ValueError("La agenda debe tener al menos un box abierto en cada bloque")
+    return [agenda[min(b, len(agenda) - 1)] for b in range(parametros.num_bloques)]
+
+
+def _proximas_aperturas(agenda: List[int]) -> List[List[float]]:
+    """Para cada box y bloque, el primer bloque desde ese en el que el box está abierto (inf si ninguno)"""
+    aperturas = []
+    for box in range(max(agenda)):
+        siguiente = [math.inf] * (len(agenda) + 1)
+        for bloque in range(len(agenda) - 1, -1, -1):
+            siguiente[bloque] = bloque if box < agenda[bloque] else siguiente[bloque + 1]
+        aperturas.append(siguiente)
+    return aperturas
+
+
+def simular_camino(camino: CaminoMuestral, boxes: Union[int, Sequence[int]],
+                   parametros: Optional[ParametrosSimulacion] = None) -> dict:
+    """Simula una mañana sobre un camino muestral y devuelve las mismas estadísticas que el simulador
+
+    boxes es una cantidad fija o una agenda de boxes abiertos por bloque; en ese caso
+    abren los primeros N boxes, un box que cierra termina la atención en curso y
+    después del cierre sigue vigente el último bloque.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    agenda = normalizar_agenda(boxes, parametros)
+    aperturas = _proximas_aperturas(agenda)
+    duracion = parametros.duracion
+    bloque_seg = parametros.duracion_bloque
+    ultimo_bloque = len(agenda) - 1
+    paciencia = parametros.tiempo_max_espera
+    limite = parametros.limite_cierre
+
+    libres = [-1] * max(agenda)  # Segundo en que cada box terminó o termina su atención (-1: sin usar)
+    atenciones = camino.atenciones
+    servidos = 0
+    atendidos = perdidos = 0
+    min_atencion = min_espera = math.inf
+    max_atencion = max_espera = 0
+
+    for llegada in camino.llegadas.tolist():
+        # Primer segundo en que cada box puede tomar al cliente: libre y abierto
+        inicio = math.inf
+        elegido = -1
+        libre_antes = False
+        for box, libre in enumerate(libres):
+            desde = llegada if libre < llegada else libre
+            bloque = min(desde, duracion - 1) // bloque_seg
+            if box >= agenda[bloque]:
+                proximo = aperturas[box][bloque + 1] if bloque < ultimo_bloque else math.inf
+                desde = proximo * bloque_seg
+            # A igual segundo, los boxes que ya estaban libres (o abren) van antes que
+            # los que terminan en ese segundo; luego, por número de box
+            if desde < inicio or (desde == inicio and not libre_antes and libre < desde):
+                inicio, elegido, libre_antes = desde, box, libre < desde
+
+        limite_espera = llegada + paciencia
+        if inicio > limite_espera and limite_espera < duracion:
+            perdidos += 1
+            min_espera = min(min_espera, paciencia)
+            max_espera = max(max_espera, paciencia)
+            continue
+
+        atendidos += 1
+        if inicio > limite:
+            # Quedó en cola al cierre forzado: se lo da por atendido en 10 minutos
+            espera, atencion = limite - llegada, 600
+        else:
+            fin = inicio + int(atenciones[servidos])
+            servidos += 1
+            libres[elegido] = fin
+            espera = inicio - llegada
+            # Quien empieza a las 8:00 en punto no registra atención (como en el simulador)
+            atencion = min(fin, limite) - inicio if inicio > 0 else 0
+
+        if atencion > 0:
+            min_atencion = min(min_atencion, atencion)
+            max_atencion = max(max_atencion, atencion)
+        if espera > 0:
+            min_espera = min(min_espera, espera)
+            max_espera = max(max_espera, espera)
+
+    return _estadisticas(len(camino.llegadas), atendidos, perdidos, min_atencion, max_atencion,
+                         min_espera, max_espera, agenda, parametros)
+
+
+def _estadisticas(ingresaron: int, atendidos: int, perdidos: int, min_atencion, max_atencion,
+                  min_espera, max_espera, agenda: List[int], parametros: ParametrosSimulacion) -> dict:
+    """Arma el diccionario de estadísticas de una mañana, con las mismas claves que el simulador"""
+    min_atencion = 0 if min_atencion == math.inf else min_atencion
+    min_espera = 0 if min_espera == math.inf else min_espera
+    costo_boxes = round(parametros.costo_box * sum(agenda) / len(agenda))
+    costo_perdidas = perdidos * parametros.perdida_cliente
+
+    return {
+        'clientes_ingresaron': ingresaron,
+        'clientes_atendidos': atendidos,
+        'clientes_no_atendidos': perdidos,
+        'tiempo_min_atencion_seg': min_atencion,
+        'tiempo_max_atencion_seg': max_atencion,
+        'tiempo_min_espera_seg': min_espera,
+        'tiempo_max_espera_seg': max_espera,
+        'costo_boxes': costo_boxes,
+        'costo_perdidas': costo_perdidas,
+        'costo_total': costo_boxes + costo_perdidas,
+        'tiempo_min_atencion_min': min_atencion // 60,
+        'tiempo_max_atencion_min': max_atencion // 60,
+        'tiempo_min_espera_min': min_espera // 60,
+        'tiempo_max_espera_min': max_espera // 60,
+    }
+
+
+def simular_camino_varios(camino: CaminoMuestral, configuraciones: Sequence[Union[int, Sequence[int]]],
+                          parametros: Optional[ParametrosSimulacion] = None,
+                          cotas: Optional[Sequence[Optional[float]]] = None) -> List[dict]:
+    """Simula varias configuraciones sobre el mismo camino muestral; devuelve lo mismo que simular_camino() para cada una
+
+    Todas las cantidades fijas de boxes avanzan juntas en una sola pasada por los
+    clientes. Con boxes idénticos y siempre abiertos solo importa cuándo se libera cada
+    uno (no cuál es cuál): el cliente empieza en max(llegada, primer box libre), así
+    que cada configuración se reduce a un heap con los fines de atención. Las agendas
+    por bloque se simulan aparte con simular_camino().
+
+    cotas: costo a partir del cual se deja de simular cada cantidad fija (None: sin
+    cota). Como el costo solo crece con cada cliente perdido, al pasar la cota ya se
+    sabe que la mañana cuesta al menos eso; las estadísticas de esa configuración
+    quedan como iban hasta ahí (cotas inferiores del costo). Con cotas, cada resultado
+    trae además 'truncada' y 'clientes_procesados'.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    resultados: List[Optional[dict]] = [None] * len(configuraciones)
+    fijas = []
+    for i, configuracion in enumerate(configuraciones):
+        if isinstance(configuracion, (int, np.integer)):
+            fijas.append(i)
+        else:
+            resultados[i] = simular_camino(camino, configuracion, parametros)
+            if cotas is not None:
+                resultados[i].update(truncada=False, clientes_procesados=len(camino.llegadas))
+    if not fijas:
+        return resultados
+
+    cantidades = [int(configuraciones[i]) for i in fijas]
+    if min(cantidades) < 1:
+        raise ValueError("La agenda debe tener al menos un box abierto en cada bloque")
+    duracion = parametros.duracion
+    paciencia = parametros.tiempo_max_espera
+    limite = parametros.limite_cierre
+    atenciones = camino.atenciones.tolist()
+
+    # Estado de cada configuración: fines de atención (heap), atenciones ya usadas y contadores
+    libres = [[-1] * boxes for boxes in cantidades]
+    servidos = [0] * len(fijas)
+    atendidos = [0] * len(fijas)
+    perdidos = [0] * len(fijas)
+    min_atencion = [math.inf] * len(fijas)
+    max_atencion = [0] * len(fijas)
+    min_espera = [math.inf] * len(fijas)
+    max_espera = [0] * len(fijas)
+    procesados = [len(camino.llegadas)] * len(fijas)
+    # Cantidad de perdidos con la que cada configuración pasa su cota (inf: sin cota)
+    perdidos_cota = [math.inf] * len(fijas)
+    if cotas is not None:
+        for k, i in enumerate(fijas):
+            if cotas[i] is not None:
+                costo_boxes = round(parametros.costo_box * cantidades[k])
+                perdidos_cota[k] = (math.floor((cotas[i] - costo_boxes) / parametros.perdida_cliente) + 1
+                                    if parametros.perdida_cliente > 0 else math.inf)
+    # Las que ya pasan la cota con el costo de los boxes no se simulan
+    for k in range(len(fijas)):
+        if perdidos_cota[k] <= 0:
+            procesados[k] = 0
+    activas = [k for k in range(len(fijas)) if perdidos_cota[k] > 0]
+
+    for n, llegada in enumerate(camino.llegadas.tolist()):
+        limite_espera = llegada + paciencia
+        cortadas = False
+        for k in activas:
+            heap = libres[k]
+            inicio = heap[0] if heap[0] > llegada else llegada
+            if inicio > limite_espera and limite_espera < duracion:
+                perdidos[k] += 1
+                if paciencia < min_espera[k]:
+                    min_espera[k] = paciencia
+                if paciencia > max_espera[k]:
+                    max_espera[k] = paciencia
+                if perdidos[k] >= perdidos_cota[k]:
+                    procesados[k] = n + 1
+                    cortadas = True
+                continue
+
+            atendidos[k] += 1
+            if inicio > limite:
+                espera, atencion = limite - llegada, 600
+            else:
+                fin = inicio + atenciones[servidos[k]]
+                servidos[k] += 1
+                heapq.heapreplace(heap, fin)
+                espera = inicio - llegada
+                atencion = min(fin, limite) - inicio if inicio > 0 else 0
+
+            if atencion > 0:
+                if atencion < min_atencion[k]:
+                    min_atencion[k] = atencion
+                if atencion > max_atencion[k]:
+                    max_atencion[k] = atencion
+            if espera > 0:
+                if espera < min_espera[k]:
+                    min_espera[k] = espera
+                if espera > max_espera[k]:
+                    max_espera[k] = espera
+        if cortadas:
+            activas = [k for k in activas if perdidos[k] < perdidos_cota[k]]
+        if not activas:
+            break
+
+    for k, i in enumerate(fijas):
+        resultados[i] = _estadisticas(len(camino.llegadas), atendidos[k], perdidos[k], min_atencion[k],
+                                      max_atencion[k], min_espera[k], max_espera[k],
+                                      normalizar_agenda(cantidades[k], parametros), parametros)
+        if cotas is not None:
+            resultados[i].update(truncada=procesados[k] < len(camino.llegadas), clientes_procesados=procesados[k])
+    return resultados
+
+
+def simular_rapido(boxes: Union[int, Sequence[int]], semilla=None,
+                   parametros: Optional[ParametrosSimulacion] = None) -> dict:
+    """Atajo: sortea el camino de una semilla y lo simula"""
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    return simular_camino(muestrear_camino(parametros, semilla), boxes, parametros)
@@ -0,0 +1,189 @@
+"""
+Probabilidad de perder clientes con muchos boxes (muestreo de importancia)
+
+Con 8 a 10 boxes casi ninguna mañana pierde clientes, y Monte Carlo directo
+necesita cantidades enormes de réplicas para ver alguna. Acá las mañanas se sortean
+con una ráfaga: más llegadas y atenciones más largas (distribuciones "inclinadas")
+durante una ventana de la mañana, que es como se pierden clientes cuando sobran
+boxes. Cada mañana se pondera con el cociente de verosimilitud entre el modelo
+original y la propuesta, así el promedio ponderado es un estimador insesgado de la
+probabilidad en el modelo original. Inclinar solo una ventana (y no la mañana
+entera) mantiene los pesos con poca variabilidad.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+
+from motor_eventos import CaminoMuestral, ParametrosSimulacion, simular_camino
+from simulador import crear_generadores
+
+
+@dataclass
+class ResultadoImportancia:
+    """Estimación de P(al menos un cliente perdido) y diagnósticos del muestreo de importancia"""
+    boxes: int
+    replicas: int
+    inclinacion_llegadas: float
+    inclinacion_atencion: float
+    ventana: int
+    probabilidad: float
+    error_estandar: float
+    mananas_con_perdidas: int      # Réplicas inclinadas con al menos una pérdida
+    tamano_efectivo: float         # Tamaño efectivo de muestra según los pesos de esas réplicas
+    perdidos_medio: float          # E[clientes perdidos] en el modelo original
+    perdidos_error_estandar: float
+
+    @property
+    def error_relativo(self) -> float:
+        return self.error_estandar / self.probabilidad if self.probabilidad > 0 else float('inf')
+
+    @property
+    def reduccion_varianza(self) -> float:
+        """Cuántas veces menos varianza que Monte Carlo directo con las mismas réplicas"""
+        if self.error_estandar == 0:
+            return float('inf')
+        varianza_directa = self.probabilidad * (1 - self.probabilidad) / self.replicas
+        return varianza_directa / self.error_estandar ** 2
+
+
+def muestrear_camino_inclinado(parametros: ParametrosSimulacion, inclinacion_llegadas: float,
+                               inclinacion_atencion: float, ventana: int = 3600, paso: int = 300,
+                               defensivo: float = 0.1, semilla=None):
+    """Sortea una mañana con una ráfaga: más llegadas y atenciones más largas dentro de una ventana
+
+    La ventana empieza en un múltiplo de 'paso' elegido al azar; con probabilidad
+    'defensivo' la mañana se sortea sin inclinar, lo que acota el peso a 1/defensivo.
+    Devuelve el camino y el logaritmo del peso p(x)/q(x), donde q es la mezcla de
+    todas las ventanas posibles y del modelo original, evaluada sobre las llegadas de
+    cada segundo y las normales de atención.
+    """
+    duracion = parametros.duracion
+    p = parametros.prob_llegada
+    p_inclinada = min(p * inclinacion_llegadas, 0.5)
+    media = parametros.media_atencion
+    media_inclinada = media * inclinacion_atencion
+    desvio = parametros.desvio_atencion
+    inicios = np.arange(0, duracion - ventana + 1, paso)
+
+    rng_llegadas, rng_atencion = crear_generadores(semilla)
+    inclinar = rng_llegadas.random() >= defensivo
+    inicio = inicios[rng_llegadas.integers(len(inicios))]
+    probabilidades = np.full(duracion, p)
+    if inclinar:
+        probabilidades[inicio:inicio + ventana] = p_inclinada
+    llegadas = np.flatnonzero(rng_llegadas.random(duracion) < probabilidades)
+
+    # La normal j (la que recibe el j-ésimo atendido) se inclina si el j-ésimo en llegar
+    # cae en la ventana: es una propuesta válida aunque no coincidan exactamente
+    en_ventana = inclinar & (llegadas >= inicio) & (llegadas < inicio + ventana)
+    normales = np.where(en_ventana, media_inclinada, media) + desvio * rng_atencion.standard_normal(len(llegadas))
+    atenciones = np.maximum(normales.astype(np.int64), 30)
+
+    # log q_ventana(x)/p(x) para todas las ventanas a la vez, con sumas acumuladas
+    acumuladas = np.concatenate([[0], np.cumsum(np.bincount(llegadas, minlength=duracion))])
+    en_cada = acumuladas[inicios + ventana] - acumuladas[inicios]
+    log_llegadas = (en_cada * np.log(p_inclinada / p) +
+                    (ventana - en_cada) * np.log((1 - p_inclinada) / (1 - p)))
+    log_normales = ((normales - media) ** 2 - (normales - media_inclinada) ** 2) / (2 * desvio ** 2)
+    suma_normales = np.concatenate([[0], np.cumsum(log_normales)])
+    desde = np.searchsorted(llegadas, inicios)
+    hasta = np.searchsorted(llegadas, inicios + ventana)
+    log_cocientes = log_llegadas + suma_normales[hasta] - suma_normales[desde]
+
+    maximo = log_cocientes.max()
+    mezcla = np.log(np.mean(np.exp(log_cocientes - maximo))) + maximo  # log de la media de q_ventana/p
+    log_q_sobre_p = np.logaddexp(np.log(defensivo), np.log1p(-defensivo) + mezcla)
+    return CaminoMuestral(llegadas, atenciones), float(-log_q_sobre_p)
+
+
+def estimar_probabilidad_perdida(boxes: int, replicas: int = 2000, semilla=None,
+                                 inclinacion_llegadas: float = 2.5, inclinacion_atencion: float = 1.2,
+                                 ventana: int = 2400,
+                                 parametros: Optional[ParametrosSimulacion] = None) -> ResultadoImportancia:
+    """P(al menos un cliente perdido en la mañana) con 'boxes' boxes, por muestreo de importancia
+
+    Con inclinaciones 1.0 es Monte Carlo directo (con otra forma de sortear las
+    llegadas). Réplica r usa la semilla SeedSequence(semilla).spawn(replicas)[r].
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    if parametros.perfil_llegadas is not None:
+        raise ValueError("El muestreo de importancia necesita una tasa de llegada constante (sin perfil)")
+
+    pesos = np.empty(replicas)
+    perdidos = np.empty(replicas)
+    for r, semilla_replica in enumerate(np.random.SeedSequence(semilla).spawn(replicas)):
+        camino, log_cociente = muestrear_camino_inclinado(parametros, inclinacion_llegadas,
+                                                          inclinacion_atencion, ventana, semilla=semilla_replica)
+        pesos[r] = np.exp(log_cociente)
+        perdidos[r] = simular_camino(camino, boxes, parametros)['clientes_no_atendidos']
+
+    hubo_perdida = perdidos > 0
+    estimaciones = pesos * hubo_perdida
+    con_perdida = pesos[hubo_perdida]
+    tamano_efectivo = con_perdida.sum() ** 2 / (con_perdida ** 2).sum() if len(con_perdida) else 0.0
+    perdidos_ponderados = pesos * perdidos
+
+    return ResultadoImportancia(
+        boxes=boxes,
+        replicas=replicas,
+        inclinacion_llegadas=inclinacion_llegadas,
+        inclinacion_atencion=inclinacion_atencion,
+        ventana=ventana,
+        probabilidad=float(estimaciones.mean()),
+        error_estandar=float(estimaciones.std(ddof=1) / np.sqrt(replicas)),
+        mananas_con_perdidas=int(hubo_perdida.sum()),
+        tamano_efectivo=float(tamano_efectivo),
+        perdidos_medio=float(perdidos_ponderados.mean()),
+        perdidos_error_estandar=float(perdidos_ponderados.std(ddof=1) / np.sqrt(replicas)),
+    )
+
+
+def elegir_inclinacion(boxes: int, replicas_piloto: int = 200, semilla=None,
+                       candidatos_llegadas: Sequence[float] = (2.0, 2.5, 3.0),
+                       candidatos_atencion: Sequence[float] = (1.1, 1.2),
+                       candidatos_ventana: Sequence[int] = (1800, 2400, 3600),
+                       parametros: Optional[ParametrosSimulacion] = None) -> ResultadoImportancia:
+    """Corridas piloto sobre una grilla de inclinaciones; devuelve la de menor error relativo
+
+    Cada candidato se prueba con dos pilotos independientes y se compara por el peor
+    de los dos errores relativos: con pesos muy desparejos un solo piloto puede
+    subestimar el error. Los pilotos usan semillas distintas de la estimación final,
+    así la elección no sesga el resultado.
+    """
+    if semilla is None:
+        semilla = np.random.SeedSequence().entropy
+    mejor, mejor_error = None, float('inf')
+    for ventana in candidatos_ventana:
+        for llegadas in candidatos_llegadas:
+            for atencion in candidatos_atencion:
+                pilotos = [estimar_probabilidad_perdida(boxes, replicas_piloto, [semilla, i], llegadas, atencion,
+                                                        ventana, parametros) for i in range(2)]
+                if min(piloto.mananas_con_perdidas for piloto in pilotos) < 5:
+                    continue
+                error = max(piloto.error_relativo for piloto in pilotos)
+                if error < mejor_error:
+                    mejor, mejor_error = pilotos[0], error
+    if mejor is None:
+        raise ValueError(f"Ninguna inclinación produjo pérdidas con {boxes} boxes: probar inclinaciones mayores")
+    return mejor
+
+
+def analizar_perdidas_raras(lista_boxes: List[int], replicas: int = 2000, semilla=None,
+                            parametros: Optional[ParametrosSimulacion] = None, replicas_piloto: int = 200,
+                            callback_progreso: Optional[Callable[[ResultadoImportancia], None]] = None
+                            ) -> List[ResultadoImportancia]:
+    """Elige la inclinación de cada configuración con un piloto y estima con réplicas nuevas"""
+    # Semillas derivadas distintas para el piloto y para la estimación final
+    entropia = np.random.SeedSequence(semilla).entropy
+    semilla_piloto, semilla_final = [entropia, 0], [entropia, 1]
+    resultados = []
+    for boxes in lista_boxes:
+        piloto = elegir_inclinacion(boxes, replicas_piloto, semilla_piloto, parametros=parametros)
+        resultado = estimar_probabilidad_perdida(boxes, replicas, semilla_final, piloto.inclinacion_llegadas,
+                                                 piloto.inclinacion_atencion, piloto.ventana, parametros)
+        resultados.append(resultado)
+        if callback_progreso is not None:
+            callback_progreso(resultado)
+    return resultados
@@ -0,0 +1,157 @@
+"""
+Núcleo compilado (JIT) del motor rápido
+
+La misma lógica que simular_camino() (llegada, elección de box, fin de atención,
+abandono, agenda y cierre forzado) escrita sobre arrays de enteros preasignados para
+que Numba la compile a código de máquina. Numba es opcional: si no está instalado,
+simular_camino_jit() usa simular_camino() en Python puro. Con los mismos sorteos da
+exactamente los mismos resultados que el motor rápido y que SimuladorAtencion.
+"""
+
+import math
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Union
+import numpy as np
+
+from motor_eventos import (CaminoMuestral, ParametrosSimulacion, _estadisticas, _proximas_aperturas,
+                           muestrear_camino, normalizar_agenda, simular_camino, simular_camino_varios)
+
+try:
+    from numba import njit
+    JIT_DISPONIBLE = True
+except ImportError:
+    JIT_DISPONIBLE = False
+
+    def njit(*args, **kwargs):
+        """Sin Numba el núcleo queda como función de Python (solo se usa en las pruebas de rendimiento)"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda funcion: funcion
+
+_INFINITO = np.iinfo(np.int64).max // 4  # Box que no vuelve a abrir o mínimo sin registrar
+
+
+@njit(cache=True)
+def _nucleo(llegadas, atenciones, agenda, aperturas, duracion, bloque_seg, paciencia, limite):
+    """Recorre a los clientes en orden de llegada; devuelve atendidos, perdidos y los extremos de atención y espera"""
+    num_boxes = aperturas.shape[0]
+    ultimo_bloque = agenda.shape[0] - 1
+    libres = np.full(num_boxes, -1, dtype=np.int64)  # Segundo en que cada box termina su atención
+    servidos = 0
+    atendidos = 0
+    perdidos = 0
+    min_atencion = _INFINITO
+    min_espera = _INFINITO
+    max_atencion = 0
+    max_espera = 0
+
+    for c in range(llegadas.shape[0]):
+        llegada = llegadas[c]
+        inicio = _INFINITO
+        elegido = -1
+        libre_antes = False
+        for box in range(num_boxes):
+            libre = libres[box]
+            desde = llegada if libre < llegada else libre
+            bloque = min(desde, duracion - 1) // bloque_seg
+            if box >= agenda[bloque]:
+                proximo = aperturas[box, bloque + 1] if bloque < ultimo_bloque else _INFINITO
+                desde = proximo * bloque_seg if proximo < _INFINITO else _INFINITO
+            # A igual segundo, los boxes que ya estaban libres (o abren) van antes
+            if desde < inicio or (desde == inicio and not libre_antes and libre < desde):
+                inicio = desde
+                elegido = box
+                libre_antes = libre < desde
+
+        limite_espera = llegada + paciencia
+        if inicio > limite_espera and limite_espera < duracion:
+            perdidos += 1
+            min_espera = min(min_espera, paciencia)
+            max_espera = max(max_espera, paciencia)
+            continue
+
+        atendidos += 1
+        if inicio > limite:
+            espera = limite - llegada
+            atencion = 600
+        else:
+            fin = inicio + atenciones[servidos]
+            servidos += 1
+            libres[elegido] = fin
+            espera = inicio - llegada
+            atencion = min(fin, limite) - inicio if inicio > 0 else 0
+
+        if atencion > 0:
+            min_atencion = min(min_atencion, atencion)
+            max_atencion = max(max_atencion, atencion)
+        if espera > 0:
+            min_espera = min(min_espera, espera)
+            max_espera = max(max_espera, espera)
+
+    return atendidos, perdidos, min_atencion, max_atencion, min_espera, max_espera
+
+
+@lru_cache(maxsize=256)
+def _agenda_compilada(agenda: tuple):
+    """Agenda y próximas aperturas como arrays de enteros (inf como _INFINITO)"""
+    aperturas = np.array([[_INFINITO if a == math.inf else a for a in fila] for fila in _proximas_aperturas(agenda)],
+                         dtype=np.int64)
+    return np.array(agenda, dtype=np.int64), aperturas
+
+
+def simular_camino_jit(camino: CaminoMuestral, boxes: Union[int, Sequence[int]],
+                       parametros: Optional[ParametrosSimulacion] = None) -> dict:
+    """Lo mismo que simular_camino(), con el núcleo compilado si Numba está disponible"""
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    if not JIT_DISPONIBLE:
+        return simular_camino(camino, boxes, parametros)
+    agenda = normalizar_agenda(boxes, parametros)
+    agenda_array, aperturas = _agenda_compilada(tuple(agenda))
+    atendidos, perdidos, min_atencion, max_atencion, min_espera, max_espera = _nucleo(
+        np.asarray(camino.llegadas, dtype=np.int64), np.asarray(camino.atenciones, dtype=np.int64),
+        agenda_array, aperturas, parametros.duracion, parametros.duracion_bloque,
+        parametros.tiempo_max_espera, parametros.limite_cierre)
+    return _estadisticas(len(camino.llegadas), atendidos, perdidos,
+                         math.inf if min_atencion == _INFINITO else min_atencion, max_atencion,
+                         math.inf if min_espera == _INFINITO else min_espera, max_espera, agenda, parametros)
+
+
+def medir_nucleos(replicas: int = 200, configuraciones: Sequence[int] = tuple(range(1, 11)), semilla=0,
+                  parametros: Optional[ParametrosSimulacion] = None,
+                  replicas_simulador: int = 5) -> Dict[str, float]:
+    """Milisegundos por mañana (todas las configuraciones) de cada motor sobre las mismas semillas
+
+    Devuelve 'simulador' (bucle segundo a segundo, con menos réplicas porque es lento),
+    'rapido' (simular_camino por configuración), 'una_pasada' (simular_camino_varios),
+    'jit' (núcleo compilado, o su reemplazo en Python puro) y 'compilacion': segundos
+    de la primera llamada, que incluye compilar o leer la caché de Numba. Los sorteos
+    no se cuentan: son los mismos para todos los motores.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    semillas = np.random.SeedSequence(semilla).spawn(replicas)
+    caminos = [muestrear_camino(parametros, s) for s in semillas]
+
+    inicio = time.perf_counter()
+    simular_camino_jit(caminos[0], configuraciones[0], parametros)
+    tiempos = {'compilacion': time.perf_counter() - inicio}
+
+    inicio = time.perf_counter()
+    for s in semillas[:replicas_simulador]:
+        for boxes in configuraciones:
+            parametros.crear_simulador(boxes, s).simular(mostrar_progreso=False)
+    tiempos['simulador'] = (time.perf_counter() - inicio) / min(replicas_simulador, replicas) * 1000
+
+    motores = {
+        'rapido': lambda camino: [simular_camino(camino, b, parametros) for b in configuraciones],
+        'una_pasada': lambda camino: simular_camino_varios(camino, configuraciones, parametros),
+        'jit': lambda camino: [simular_camino_jit(camino, b, parametros) for b in configuraciones],
+    }
+    for nombre, motor in motores.items():
+        inicio = time.perf_counter()
+        for camino in caminos:
+            motor(camino)
+        tiempos[nombre] = (time.perf_counter() - inicio) / replicas * 1000
+    return tiempos
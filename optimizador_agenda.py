@@ -0,0 +1,134 @@
+"""
+Optimización de la agenda de boxes
+
+Busca cuántos boxes abrir en cada bloque de 30 minutos para minimizar el costo
+esperado (boxes + clientes perdidos) cumpliendo un objetivo de clientes perdidos
+por mañana. Todas las agendas se evalúan sobre los mismos caminos muestrales
+(números aleatorios comunes), así las diferencias entre agendas no se deben al azar,
+y cada vecindario se evalúa en paralelo con el motor rápido.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from motor_eventos import ParametrosSimulacion, muestrear_camino, simular_camino
+
+
+@dataclass
+class ResultadoAgenda:
+    """Mejor agenda encontrada y su desempeño promedio sobre las réplicas"""
+    agenda: List[int]
+    costo_medio: float
+    costo_boxes: float
+    perdidos_medio: float
+    cumple_objetivo: bool
+    evaluaciones: int
+    iteraciones: int
+    tamano_espacio: int
+
+
+# Caminos muestrales de cada proceso de trabajo (se envían una sola vez al crearlo)
+_caminos = None
+_parametros = None
+
+def _inicializar_trabajador(caminos, parametros):
+    global _caminos, _parametros
+    _caminos, _parametros = caminos, parametros
+
+def _evaluar_en_trabajador(agenda: Tuple[int, ...]) -> Tuple[float, float, float]:
+    return evaluar_agenda(agenda, _caminos, _parametros)
+
+
+def evaluar_agenda(agenda, caminos, parametros: ParametrosSimulacion) -> Tuple[float, float, float]:
+    """Costo total medio, costo de boxes y clientes perdidos medios de una agenda sobre los caminos dados"""
+    costos = np.empty(len(caminos))
+    perdidos = np.empty(len(caminos))
+    for i, camino in enumerate(caminos):
+        stats = simular_camino(camino, agenda, parametros)
+        costos[i] = stats['costo_total']
+        perdidos[i] = stats['clientes_no_atendidos']
+    costo_boxes = parametros.costo_box * sum(agenda) / len(agenda)
+    return float(costos.mean()), costo_boxes, float(perdidos.mean())
+
+
+def vecinos(agenda: Tuple[int, ...], max_boxes: int) -> List[Tuple[int, ...]]:
+    """Agendas a un paso: un box más o menos en un bloque, o un box que pasa de un bloque a otro"""
+    resultado = []
+    for i, boxes in enumerate(agenda):
+        for cambio in (-1, 1):
+            if 1 <= boxes + cambio <= max_boxes:
+                resultado.append(agenda[:i] + (boxes + cambio,) + agenda[i + 1:])
+    for i in range(len(agenda)):
+        for j in range(len(agenda)):
+            if i != j and agenda[i] > 1 and agenda[j] < max_boxes:
+                nueva = list(agenda)
+                nueva[i] -= 1
+                nueva[j] += 1
+                resultado.append(tuple(nueva))
+    return resultado
+
+
+def optimizar_agenda(max_boxes: int = 10, objetivo_perdidos: float = 1.0, replicas: int = 100,
+                     semilla: int = 0, workers: Optional[int] = None,
+                     parametros: Optional[ParametrosSimulacion] = None, max_iteraciones: int = 100,
+                     callback_progreso: Optional[Callable[[int, 'ResultadoAgenda'], None]] = None
+                     ) -> ResultadoAgenda:
+    """Búsqueda local de la agenda más barata que cumple el objetivo de clientes perdidos
+
+    Parte de la mejor cantidad fija de boxes que cumple el objetivo y en cada
+    iteración se mueve al mejor vecino factible mientras baje el costo esperado.
+    objetivo_perdidos es el promedio máximo de clientes perdidos por mañana.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    num_bloques = parametros.num_bloques
+    semillas = np.random.SeedSequence(semilla).spawn(replicas)
+    caminos = [muestrear_camino(parametros, s) for s in semillas]
+    evaluadas: Dict[Tuple[int, ...], Tuple[float, float, float]] = {}
+
+    executor = None
+    if workers != 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_trabajador,
+                                       initargs=(caminos, parametros))
+
+    def evaluar(agendas: List[Tuple[int, ...]]):
+        nuevas = [a for a in dict.fromkeys(agendas) if a not in evaluadas]
+        if executor is None:
+            resultados = [evaluar_agenda(a, caminos, parametros) for a in nuevas]
+        else:
+            resultados = executor.map(_evaluar_en_trabajador, nuevas, chunksize=max(1, len(nuevas) // 32))
+        evaluadas.update(zip(nuevas, resultados))
+
+    def clave(agenda):
+        # Primero las factibles, luego por costo medio (desempate: menos perdidos)
+        costo, _, perdidos = evaluadas[agenda]
+        return (perdidos > objetivo_perdidos, costo if perdidos <= objetivo_perdidos else perdidos, perdidos)
+
+    def resultado(agenda, iteraciones):
+        costo, costo_boxes, perdidos = evaluadas[agenda]
+        return ResultadoAgenda(list(agenda), costo, costo_boxes, perdidos, perdidos <= objetivo_perdidos,
+                               len(evaluadas), iteraciones, max_boxes ** num_bloques)
+
+    try:
+        constantes = [(boxes,) * num_bloques for boxes in range(1, max_boxes + 1)]
+        evaluar(constantes)
+        actual = min(constantes, key=clave)
+
+        iteracion = 0
+        while iteracion < max_iteraciones:
+            iteracion += 1
+            candidatos = vecinos(actual, max_boxes)
+            evaluar(candidatos)
+            mejor = min(candidatos, key=clave)
+            if clave(mejor) >= clave(actual):
+                break
+            actual = mejor
+            if callback_progreso is not None:
+                callback_progreso(iteracion, resultado(actual, iteracion))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return resultado(actual, iteracion)
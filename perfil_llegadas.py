@@ -0,0 +1,109 @@
+"""
+Perfiles de llegada no homogéneos
+
+Permite que la probabilidad de llegada por segundo varíe a lo largo de la mañana
+(por ejemplo, con un pico entre las 10 y las 11) en lugar de ser la constante
+p = 1/144 de la consigna.
+"""
+
+import csv
+from typing import List, Optional
+import numpy as np
+
+
+class PerfilLlegadas:
+    """Intensidad de llegadas a lo largo del horario de atención
+
+    La intensidad se define por tramos (clientes por hora en cada tramo) y se puede
+    usar constante por tramo o suavizada con un spline monótono por partes que
+    conserva la cantidad esperada de clientes de cada tramo.
+
+    Cada segundo t llega un cliente si u_t < p(t), con u_t uniforme: es el mismo
+    sorteo que con p constante (un "thinning" en tiempo discreto), así que un
+    perfil variable no cuesta más que la tasa constante.
+    """
+
+    def __init__(self, clientes_por_hora: List[float], duracion_tramo: int = 3600, suavizar: bool = False):
+        if not clientes_por_hora:
+            raise ValueError("El perfil necesita al menos un tramo")
+        if any(tasa < 0 for tasa in clientes_por_hora):
+            raise ValueError("Las tasas de llegada no pueden ser negativas")
+        self.clientes_por_hora = [float(tasa) for tasa in clientes_por_hora]
+        self.duracion_tramo = duracion_tramo
+        self.suavizar = suavizar
+        self._cache = {}
+
+    @classmethod
+    def constante(cls, prob_por_segundo: float = 1/144, duracion: int = 4 * 3600) -> 'PerfilLlegadas':
+        """Perfil equivalente a la probabilidad constante por segundo"""
+        return cls([prob_por_segundo * 3600], duracion_tramo=duracion)
+
+    @classmethod
+    def desde_csv(cls, ruta: str, suavizar: bool = False, hora_apertura: int = 8) -> 'PerfilLlegadas':
+        """Carga un perfil desde un CSV de conteos observados por hora
+
+        Cada fila tiene la hora ('10' o '10:00') y la cantidad de clientes que llegaron
+        en esa hora. Si una hora aparece varias veces (varios días) se promedia. Se
+        ignoran encabezados y filas vacías.
+        """
+        conteos = {}
+        with open(ruta, newline='', encoding='utf-8') as archivo:
+            for fila in csv.reader(archivo):
+                if len(fila) < 2 or not fila[0].strip():
+                    continue
+                try:
+                    hora = int(fila[0].strip().split(':')[0])
+                    cantidad = float(fila[1])
+                except ValueError:
+                    continue  # Encabezado u otra fila no numérica
+                conteos.setdefault(hora, []).append(cantidad)
+
+        if not conteos:
+            raise ValueError(f"No se encontraron conteos por hora en {ruta}")
+
+        horas = range(hora_apertura, max(conteos) + 1)
+        return cls([float(np.mean(conteos.get(hora, [0.0]))) for hora in horas], suavizar=suavizar)
+
+    def probabilidades(self, duracion: int) -> np.ndarray:
+        """Probabilidad de llegada para cada segundo de 0 a duracion-1"""
+        if duracion not in self._cache:
+            self._cache[duracion] = self._calcular_probabilidades(duracion)
+        return self._cache[duracion]
+
+    def _calcular_probabilidades(self, duracion: int) -> np.ndarray:
+        tramos = np.minimum(np.arange(duracion) // self.duracion_tramo, len(self.clientes_por_hora) - 1)
+        tasas = np.asarray(self.clientes_por_hora)
+        por_segundo = tasas[tramos] / 3600
+
+        if self.suavizar and len(tasas) > 1:
+            from scipy.interpolate import PchipInterpolator
+
+            # Spline monótono por partes entre los centros de los tramos; luego se
+            # reescala cada tramo para conservar su cantidad esperada de clientes
+            centros = (np.arange(len(tasas)) + 0.5) * self.duracion_tramo
+            curva = np.clip(PchipInterpolator(centros, tasas / 3600, extrapolate=True)(np.arange(duracion)), 0, None)
+            for tramo in np.unique(tramos):
+                mascara = tramos == tramo
+                total = curva[mascara].sum()
+                if total > 0:
+                    curva[mascara] *= por_segundo[mascara].sum() / total
+            por_segundo = curva
+
+        return np.clip(por_segundo, 0.0, 1.0)
+
+    def clientes_esperados(self, duracion: int) -> float:
+        """Cantidad esperada de llegadas en el horario"""
+        return float(self.probabilidades(duracion).sum())
+
+    def muestrear_llegadas(self, rng: np.random.Generator, duracion: int,
+                           uniformes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Segundos con llegada, sorteados de forma vectorizada (mismo resultado que segundo a segundo)"""
+        if uniformes is None:
+            uniformes = rng.random(duracion)
+        return np.flatnonzero(uniformes < self.probabilidades(duracion))
+
+    def describir(self) -> str:
+        """Resumen legible del perfil"""
+        tramos = ", ".join(f"{tasa:g}" for tasa in self.clientes_por_hora)
+        modo = "suavizado" if self.suavizar else "constante por tramo"
+        return f"[{tramos}] clientes/hora ({modo})"
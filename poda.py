@@ -0,0 +1,169 @@
+"""
+Poda de configuraciones dominadas durante la comparación
+
+En lugar de simular todas las réplicas de todas las configuraciones, el lote avanza
+por etapas y deja de simular lo que ya no puede cambiar el informe:
+
+- Entre etapas, cada configuración se compara con la de menor costo medio sobre las
+  mismas mañanas (diferencias pareadas, números aleatorios comunes). Si la cota
+  inferior del intervalo de su diferencia de costo supera la tolerancia del criterio
+  de selección (5%) y tampoco puede ser la primera configuración sin pérdidas, se
+  elimina y no recibe más réplicas.
+- Dentro de una mañana, una configuración con menos boxes que la mejor deja de
+  simularse cuando sus pérdidas ya la llevan por encima del peor costo que tuvo la
+  mejor configuración en las etapas anteriores: el costo de esa mañana queda como
+  cota inferior, que solo hace más difícil eliminarla. Si termina entre las
+  sobrevivientes, esas mañanas se vuelven a simular completas, así su informe es
+  exacto.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+import numpy as np
+from scipy import stats
+
+from lote import METRICAS, Configuracion, ResultadoLote, _camino, _crear_metricas, _muestras
+from motor_eventos import ParametrosSimulacion, simular_camino_varios
+
+
+@dataclass
+class ResultadoPoda:
+    """Lote con poda: la configuración i tiene simuladas solo sus primeras replicas_simuladas[i] réplicas"""
+    lote: ResultadoLote
+    replicas_simuladas: np.ndarray
+    truncadas: np.ndarray          # (configuraciones, réplicas): mañanas cortadas por la cota (costo = cota inferior)
+    pasos: int                     # Clientes procesados por alguna configuración, sumados
+    pasos_sin_poda: int            # Los mismos pasos sin podar (todos los clientes en todas las configuraciones)
+    recompletadas: int             # Mañanas cortadas que se volvieron a simular completas
+
+    @property
+    def eliminadas(self) -> List[int]:
+        return [i for i, n in enumerate(self.replicas_simuladas) if n < self.lote.replicas]
+
+    @property
+    def trabajo_ahorrado(self) -> float:
+        """Fracción de los pasos cliente-configuración que no hizo falta simular"""
+        return 1 - self.pasos / self.pasos_sin_poda if self.pasos_sin_poda else 0.0
+
+    def sublote(self, i: int) -> ResultadoLote:
+        """Las réplicas simuladas de la configuración i, como un lote de una sola configuración"""
+        n = int(self.replicas_simuladas[i])
+        return ResultadoLote([self.lote.configuraciones[i]], self.lote.semilla,
+                             {nombre: valores[i:i + 1, :n] for nombre, valores in self.lote.metricas.items()})
+
+
+def _guardar(metricas, truncadas, i: int, r: int, estadisticas: dict, trabajo: int):
+    estadisticas['trabajo_ofrecido_seg'] = trabajo
+    for nombre in METRICAS:
+        metricas[nombre][i, r] = estadisticas[nombre]
+    truncadas[i, r] = estadisticas.get('truncada', False)
+
+
+def ejecutar_lote_con_poda(configuraciones: List[Configuracion], replicas: int, semilla=None,
+                           parametros: Optional[ParametrosSimulacion] = None, tamano_etapa: int = 10,
+                           nivel: float = 0.95, tolerancia: float = 0.05, umbral_perdidas: float = 0.1,
+                           callback_progreso: Optional[Callable[[int, int], None]] = None) -> ResultadoPoda:
+    """Como ejecutar_lote (muestreo independiente), pero dejando de simular las configuraciones dominadas
+
+    Las configuraciones van de menos a más boxes: la "primera sin pérdidas" es la
+    primera de la lista con menos de umbral_perdidas clientes perdidos promedio.
+    El nivel se reparte (Bonferroni) entre todas las comparaciones de todas las
+    etapas, así la probabilidad de eliminar por error alguna configuración que no
+    está dominada es a lo sumo 1 - nivel.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    configuraciones = list(configuraciones)
+    num_config = len(configuraciones)
+    muestras = _muestras('independiente', semilla, replicas, parametros)
+    metricas = _crear_metricas(num_config, replicas)
+    truncadas = np.zeros((num_config, replicas), dtype=bool)
+    replicas_simuladas = np.zeros(num_config, dtype=np.int64)
+    activas = list(range(num_config))
+    num_etapas = math.ceil(replicas / tamano_etapa)
+    alfa = (1 - nivel) / (max(num_config - 1, 1) * num_etapas)
+    contador = {'pasos': 0, 'sin_poda': 0, 'recompletadas': 0}
+
+    def completar(indices: List[int], hasta: int):
+        """Vuelve a simular sin cota las mañanas cortadas de esas configuraciones"""
+        for r in range(hasta):
+            cortadas = [i for i in indices if truncadas[i, r]]
+            if not cortadas:
+                continue
+            camino = _camino(muestras[r], parametros)
+            trabajo = int(camino.atenciones.sum())
+            for i, estadisticas in zip(cortadas, simular_camino_varios(
+                    camino, [configuraciones[i] for i in cortadas], parametros)):
+                _guardar(metricas, truncadas, i, r, estadisticas, trabajo)
+            contador['pasos'] += len(camino.llegadas) * len(cortadas)
+            contador['recompletadas'] += len(cortadas)
+
+    def mejor(hasta: int) -> int:
+        """La activa de menor costo medio, con sus mañanas completas (si no, su media estaría subestimada)"""
+        while True:
+            medias = {i: metricas['costo_total'][i, :hasta].mean() for i in activas}
+            elegida = min(medias, key=medias.get)
+            if not truncadas[elegida, :hasta].any():
+                return elegida
+            completar([elegida], hasta)
+
+    for inicio in range(0, replicas, tamano_etapa):
+        fin = min(inicio + tamano_etapa, replicas)
+        cota = None
+        if inicio > 0 and len(activas) > 1:
+            referencia = mejor(inicio)
+            cota = float(metricas['costo_total'][referencia, :inicio].max())
+        cotas = [cota if cota is not None and i < referencia else None for i in activas]
+        for r in range(inicio, fin):
+            camino = _camino(muestras[r], parametros)
+            trabajo = int(camino.atenciones.sum())
+            resultados = simular_camino_varios(camino, [configuraciones[i] for i in activas], parametros, cotas)
+            for i, estadisticas in zip(activas, resultados):
+                _guardar(metricas, truncadas, i, r, estadisticas, trabajo)
+                contador['pasos'] += estadisticas['clientes_procesados']
+            contador['sin_poda'] += len(camino.llegadas) * num_config
+        replicas_simuladas[activas] = fin
+        if callback_progreso is not None:
+            callback_progreso(fin, replicas)
+
+        if fin < replicas and len(activas) > 1 and fin >= 2:
+            activas = _podar(activas, mejor(fin), fin, metricas, truncadas, replicas_simuladas,
+                             alfa, tolerancia, umbral_perdidas)
+
+    completar(activas, replicas)
+    return ResultadoPoda(ResultadoLote(configuraciones, semilla, metricas), replicas_simuladas, truncadas,
+                         contador['pasos'], contador['sin_poda'], contador['recompletadas'])
+
+
+def _podar(activas: List[int], referencia: int, hasta: int, metricas, truncadas, replicas_simuladas,
+           alfa: float, tolerancia: float, umbral_perdidas: float) -> List[int]:
+    """Las activas que todavía pueden ser la óptima (dentro de la tolerancia) o la primera sin pérdidas"""
+    t = stats.t.ppf(1 - alfa, hasta - 1)
+    costos = metricas['costo_total'][:, :hasta]
+    perdidos = metricas['clientes_no_atendidos']
+
+    def cota_superior_perdidos(j: int) -> float:
+        # Con mañanas cortadas los perdidos son cotas inferiores: no sirven para acotar por arriba
+        n = int(replicas_simuladas[j])
+        if truncadas[j, :n].any():
+            return math.inf
+        valores = perdidos[j, :n]
+        t_j = stats.t.ppf(1 - alfa, n - 1)
+        # Si todas las réplicas dieron cero, el desvío no informa: regla del tres
+        return max(valores.mean() + t_j * valores.std(ddof=1) / math.sqrt(n), 3 / n)
+
+    def cota_inferior_perdidos(k: int) -> float:
+        valores = perdidos[k, :hasta]
+        return valores.mean() - t * valores.std(ddof=1) / math.sqrt(hasta)
+
+    quedan = []
+    for k in activas:
+        diferencias = costos[k] - (1 + tolerancia) * costos[referencia]
+        dominada = (k != referencia and
+                    diferencias.mean() - t * diferencias.std(ddof=1) / math.sqrt(hasta) > 0)
+        puede_ser_sin_perdidas = (cota_inferior_perdidos(k) < umbral_perdidas and
+                                  not any(cota_superior_perdidos(j) < umbral_perdidas for j in range(k)))
+        if not dominada or puede_ser_sin_perdidas:
+            quedan.append(k)
+    return quedan
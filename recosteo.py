@@ -0,0 +1,82 @@
+"""
+Recosteo de réplicas guardadas
+
+COSTO_BOX y PERDIDA_CLIENTE no cambian la dinámica de la cola: solo entran en el
+costo final como boxes · COSTO_BOX + perdidos · PERDIDA_CLIENTE. Por eso alcanza con
+guardar una vez los resultados por réplica de un estudio (en un .npz) y recalcular
+costos, configuración óptima y gráficos para cualquier par de costos, o para una
+grilla entera, con operaciones vectorizadas sobre los arrays guardados.
+"""
+
+import json
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+from lote import METRICAS, ResultadoLote
+from motor_eventos import ParametrosSimulacion, normalizar_agenda
+
+
+def _agendas(lote: ResultadoLote, parametros: ParametrosSimulacion):
+    """Boxes abiertos sumados sobre los bloques, y cantidad de bloques, por configuración"""
+    agendas = [normalizar_agenda(configuracion, parametros) for configuracion in lote.configuraciones]
+    return np.array([sum(agenda) for agenda in agendas]), parametros.num_bloques
+
+
+def costo_boxes(lote: ResultadoLote, costos_box, parametros: ParametrosSimulacion) -> np.ndarray:
+    """Costo de boxes por configuración (último eje) para uno o varios COSTO_BOX
+
+    Misma cuenta que simular_camino(): COSTO_BOX por el promedio de boxes abiertos
+    por bloque, redondeado.
+    """
+    sumas, bloques = _agendas(lote, parametros)
+    return np.round(np.asarray(costos_box, dtype=float)[..., None] * sumas / bloques)
+
+
+def guardar_resultados(lote: ResultadoLote, ruta: str, parametros: Optional[ParametrosSimulacion] = None):
+    """Guarda las métricas por réplica y los parámetros del estudio en un .npz comprimido"""
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    meta = {
+        'configuraciones': [c if isinstance(c, (int, np.integer)) else list(c) for c in lote.configuraciones],
+        'semilla': lote.semilla,
+        'muestreo': lote.muestreo,
+        'parametros': parametros.a_dict(),
+    }
+    np.savez_compressed(ruta, meta=np.array(json.dumps(meta, default=int)), **lote.metricas)
+
+
+def cargar_resultados(ruta: str) -> Tuple[ResultadoLote, ParametrosSimulacion]:
+    """Lee un .npz de guardar_resultados(): devuelve el lote y los parámetros con que se simuló"""
+    with np.load(ruta) as datos:
+        meta = json.loads(str(datos['meta']))
+        metricas = {nombre: datos[nombre] for nombre in METRICAS if nombre in datos}
+    configuraciones = [c if isinstance(c, int) else tuple(c) for c in meta['configuraciones']]
+    lote = ResultadoLote(configuraciones, meta['semilla'], metricas, meta.get('muestreo', 'independiente'))
+    return lote, ParametrosSimulacion.desde_dict(meta['parametros'])
+
+
+def recostear(lote: ResultadoLote, costo_box: float, perdida_cliente: float,
+              parametros: ParametrosSimulacion) -> ResultadoLote:
+    """El mismo lote con los costos recalculados para otros COSTO_BOX y PERDIDA_CLIENTE"""
+    metricas = dict(lote.metricas)
+    metricas['costo_boxes'] = np.repeat(costo_boxes(lote, costo_box, parametros)[:, None], lote.replicas, axis=1)
+    metricas['costo_perdidas'] = lote['clientes_no_atendidos'] * float(perdida_cliente)
+    metricas['costo_total'] = metricas['costo_boxes'] + metricas['costo_perdidas']
+    return ResultadoLote(lote.configuraciones, lote.semilla, metricas, lote.muestreo)
+
+
+def recostear_grilla(lote: ResultadoLote, costos_box: Sequence[float], perdidas_cliente: Sequence[float],
+                     parametros: ParametrosSimulacion) -> Dict[str, np.ndarray]:
+    """Costo medio de cada configuración para todas las combinaciones de costos a la vez
+
+    Devuelve 'costo_medio' y 'costo_std' con forma (pérdidas, costos de box,
+    configuraciones) y 'optima' con forma (pérdidas, costos de box): el índice de la
+    configuración más barata. Como el costo es lineal en los dos parámetros, alcanza
+    con la media y el desvío de los perdidos de cada configuración.
+    """
+    perdidas = np.asarray(perdidas_cliente, dtype=float)[:, None, None]
+    perdidos = lote['clientes_no_atendidos'].astype(float)
+    boxes = costo_boxes(lote, costos_box, parametros)[None, :, :]
+    medias = boxes + perdidas * perdidos.mean(axis=1)
+    desvios = np.abs(perdidas) * perdidos.std(axis=1) + np.zeros_like(boxes)
+    return {'costo_medio': medias, 'costo_std': desvios, 'optima': medias.argmin(axis=2)}
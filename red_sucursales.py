@@ -0,0 +1,243 @@
+"""
+Simulación de una red de sucursales
+
+Cada sucursal tiene su propia tasa de llegada, atención, paciencia, costos y cantidad
+fija de boxes; todas comparten el horario (ParametrosSimulacion: duración y cierre
+forzado). En lugar de simular cada sucursal y cada réplica por separado, todas las
+mañanas de un grupo de sucursales avanzan juntas: el estado es un array con el
+segundo en que se libera cada box de cada (sucursal, réplica) y cada paso procesa al
+k-ésimo cliente de todas las mañanas a la vez con operaciones de NumPy.
+
+La dinámica es la de simular_camino() con una cantidad fija de boxes (con boxes
+idénticos solo importa cuándo se libera cada uno, así que el cliente toma el box que
+se libera primero). Las llegadas se sortean como saltos geométricos entre segundos
+con llegada, que tienen la misma ley que el sorteo de cada segundo del simulador:
+los resultados tienen las mismas distribuciones, no las mismas réplicas.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+from lote import METRICAS
+from motor_eventos import ParametrosSimulacion
+
+# Métricas de la red por réplica: las cantidades y costos se suman entre sucursales,
+# los máximos de espera y atención se toman sobre todas
+METRICAS_SUMADAS = ('clientes_ingresaron', 'clientes_atendidos', 'clientes_no_atendidos',
+                    'costo_boxes', 'costo_perdidas', 'costo_total', 'trabajo_ofrecido_seg')
+METRICAS_MAXIMAS = ('tiempo_max_atencion_seg', 'tiempo_max_espera_seg')
+
+_INFINITO = np.iinfo(np.int64).max // 4  # Box inexistente o mínimo sin registrar
+
+
+@dataclass
+class Sucursal:
+    """Parámetros propios de una sucursal (los mismos valores por defecto que SimuladorAtencion)"""
+    nombre: str
+    boxes: int
+    prob_llegada: float = 1/144
+    media_atencion: float = 10 * 60
+    desvio_atencion: float = 5 * 60
+    tiempo_max_espera: int = 30 * 60
+    costo_box: float = 1000
+    perdida_cliente: float = 10000
+
+    @classmethod
+    def desde_parametros(cls, nombre: str, boxes: int, parametros: ParametrosSimulacion) -> 'Sucursal':
+        """Sucursal con las tasas, atenciones, paciencia y costos de un ParametrosSimulacion"""
+        return cls(nombre, boxes, parametros.prob_llegada, parametros.media_atencion, parametros.desvio_atencion,
+                   parametros.tiempo_max_espera, parametros.costo_box, parametros.perdida_cliente)
+
+
+def cargar_sucursales(ruta: str) -> List[Sucursal]:
+    """Lee las sucursales de un archivo JSON (una lista de objetos con los campos de Sucursal)"""
+    with open(ruta, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    if not isinstance(datos, list) or not datos:
+        raise ValueError("El archivo de sucursales debe contener una lista no vacía")
+    sucursales = [Sucursal(**sucursal) for sucursal in datos]
+    for sucursal in sucursales:
+        if sucursal.boxes < 1 or not 0 < sucursal.prob_llegada <= 1:
+            raise ValueError(f"Sucursal '{sucursal.nombre}': hace falta al menos un box y 0 < prob_llegada <= 1")
+    return sucursales
+
+
+@dataclass
+class ResultadoRed:
+    """Resultados de la red: cada métrica es un array (sucursales, réplicas)
+
+    Las réplicas de distintas sucursales son independientes; la columna r de todas
+    las sucursales forma la mañana r de la red.
+    """
+    sucursales: List[Sucursal]
+    semilla: Optional[int]
+    metricas: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def replicas(self) -> int:
+        return self.metricas['costo_total'].shape[1]
+
+    def __getitem__(self, metrica: str) -> np.ndarray:
+        return self.metricas[metrica]
+
+    def promedios(self) -> Dict[str, np.ndarray]:
+        """Promedio de cada métrica por sucursal"""
+        return {nombre: valores.mean(axis=1) for nombre, valores in self.metricas.items()}
+
+    def totales_red(self) -> Dict[str, np.ndarray]:
+        """Métricas de toda la red por réplica: sumas de cantidades y costos, máximos de tiempos"""
+        totales = {nombre: self.metricas[nombre].sum(axis=0) for nombre in METRICAS_SUMADAS}
+        totales.update({nombre: self.metricas[nombre].max(axis=0) for nombre in METRICAS_MAXIMAS})
+        return totales
+
+
+def _sortear_sucursal(sucursal: Sucursal, semilla, replicas: int, duracion: int):
+    """Llegadas (réplicas, K) y atenciones sorteadas en orden de inicio, con K que alcanza para todas"""
+    rng = np.random.default_rng(semilla)
+    p = sucursal.prob_llegada
+    esperados = duracion * p
+    k = int(esperados + 6 * np.sqrt(esperados) + 10)
+    # Segundo de cada llegada: saltos geométricos desde el segundo 0 (-1 para empezar en 0)
+    llegadas = np.cumsum(rng.geometric(p, (replicas, k)), axis=1) - 1
+    while (llegadas[:, -1] < duracion).any():
+        extra = llegadas[:, -1:] + np.cumsum(rng.geometric(p, (replicas, k)), axis=1)
+        llegadas = np.concatenate([llegadas, extra], axis=1)
+    normales = rng.normal(sucursal.media_atencion, sucursal.desvio_atencion, llegadas.shape)
+    atenciones = np.maximum(normales.astype(np.int64), 30)  # int() trunca hacia cero, mínimo 30 segundos
+    return llegadas, atenciones
+
+
+def _simular_grupo(sucursales: List[Sucursal], semillas: list, replicas: int,
+                   parametros: ParametrosSimulacion) -> Dict[str, np.ndarray]:
+    """Simula todas las réplicas de un grupo de sucursales juntas (se ejecuta en un proceso de trabajo)"""
+    duracion = parametros.duracion
+    limite = parametros.limite_cierre
+    sorteos = [_sortear_sucursal(s, semilla, replicas, duracion) for s, semilla in zip(sucursales, semillas)]
+    k = max(llegadas.shape[1] for llegadas, _ in sorteos)
+    # Una fila por mañana (sucursal, réplica); columnas de relleno sin llegada
+    llegadas = np.concatenate([np.pad(ll, ((0, 0), (0, k - ll.shape[1])), constant_values=duracion)
+                               for ll, _ in sorteos])
+    atenciones = np.concatenate([np.pad(at, ((0, 0), (0, k - at.shape[1]))) for _, at in sorteos])
+    del sorteos
+
+    por_fila = lambda valores: np.repeat(np.asarray(valores), replicas)
+    ingresaron = (llegadas < duracion).sum(axis=1)
+    trabajo = np.where(llegadas < duracion, atenciones, 0).sum(axis=1)
+    # Filas de más a menos clientes: en la columna k solo avanzan las primeras, las que
+    # tienen más de k clientes, y se trabaja sobre vistas sin copiar
+    orden = np.argsort(-ingresaron, kind='stable')
+    # Traspuestas: la columna de cada paso queda contigua en memoria
+    llegadas, atenciones = np.ascontiguousarray(llegadas[orden].T), np.ascontiguousarray(atenciones[orden].T)
+    boxes = por_fila([s.boxes for s in sucursales])[orden]
+    paciencia = por_fila([s.tiempo_max_espera for s in sucursales]).astype(np.int64)[orden]
+    activas_por_columna = np.searchsorted(-ingresaron[orden], -np.arange(int(ingresaron.max(initial=0))))
+    libres = np.where(np.arange(boxes.max()) < boxes[:, None], -1, _INFINITO)
+    filas = np.arange(len(boxes))
+
+    servidos = np.zeros(len(filas), dtype=np.int64)
+    atendidos = np.zeros(len(filas), dtype=np.int64)
+    perdidos = np.zeros(len(filas), dtype=np.int64)
+    min_atencion = np.full(len(filas), _INFINITO)
+    min_espera = np.full(len(filas), _INFINITO)
+    max_atencion = np.zeros(len(filas), dtype=np.int64)
+    max_espera = np.zeros(len(filas), dtype=np.int64)
+
+    for columna, n in enumerate(activas_por_columna.tolist()):
+        llegada = llegadas[columna, :n]
+        elegido = libres[:n].argmin(axis=1)
+        inicio = np.maximum(llegada, libres[filas[:n], elegido])
+        limite_espera = llegada + paciencia[:n]
+        perdido = (inicio > limite_espera) & (limite_espera < duracion)
+        atendido = ~perdido
+        forzado = atendido & (inicio > limite)  # Quedó en cola al cierre forzado: atendido en 10 minutos
+        servido = atendido & ~forzado
+
+        fin = inicio + atenciones[servidos[:n], filas[:n]]
+        libres[filas[:n][servido], elegido[servido]] = fin[servido]
+        servidos[:n] += servido
+        atendidos[:n] += atendido
+        perdidos[:n] += perdido
+
+        espera = np.where(forzado, limite - llegada, np.where(perdido, paciencia[:n], inicio - llegada))
+        # Quien empieza a las 8:00 en punto no registra atención (como en el simulador)
+        atencion = np.where(forzado, 600, np.where(inicio > 0, np.minimum(fin, limite) - inicio, 0))
+        con_atencion = atendido & (atencion > 0)
+        np.minimum(min_espera[:n], espera, out=min_espera[:n], where=espera > 0)
+        np.maximum(max_espera[:n], espera, out=max_espera[:n], where=espera > 0)
+        np.minimum(min_atencion[:n], atencion, out=min_atencion[:n], where=con_atencion)
+        np.maximum(max_atencion[:n], atencion, out=max_atencion[:n], where=con_atencion)
+
+    # De vuelta al orden (sucursal, réplica)
+    original = np.empty_like(orden)
+    original[orden] = filas
+    atendidos, perdidos = atendidos[original], perdidos[original]
+    min_atencion, max_atencion = min_atencion[original], max_atencion[original]
+    min_espera, max_espera = min_espera[original], max_espera[original]
+
+    costo_boxes = por_fila([round(s.costo_box * s.boxes) for s in sucursales]).astype(np.float64)
+    costo_perdidas = perdidos * por_fila([s.perdida_cliente for s in sucursales]).astype(np.float64)
+    valores = {
+        'clientes_ingresaron': ingresaron,
+        'clientes_atendidos': atendidos,
+        'clientes_no_atendidos': perdidos,
+        'tiempo_min_atencion_seg': np.where(min_atencion == _INFINITO, 0, min_atencion),
+        'tiempo_max_atencion_seg': max_atencion,
+        'tiempo_min_espera_seg': np.where(min_espera == _INFINITO, 0, min_espera),
+        'tiempo_max_espera_seg': max_espera,
+        'costo_boxes': costo_boxes,
+        'costo_perdidas': costo_perdidas,
+        'costo_total': costo_boxes + costo_perdidas,
+        'trabajo_ofrecido_seg': trabajo,
+    }
+    return {nombre: valores[nombre].reshape(len(sucursales), replicas) for nombre in METRICAS}
+
+
+def simular_red(sucursales: List[Sucursal], replicas: int = 1000, semilla: Optional[int] = None,
+                parametros: Optional[ParametrosSimulacion] = None, workers: Optional[int] = 1,
+                mananas_por_grupo: int = 5000,
+                callback_progreso: Optional[Callable[[int, int], None]] = None) -> ResultadoRed:
+    """Simula 'replicas' mañanas de cada sucursal y devuelve las métricas por sucursal y réplica
+
+    parametros: horario común (duración y cierre forzado); las tasas, atenciones,
+    paciencias y costos son los de cada sucursal.
+    semilla: la sucursal i sortea con SeedSequence(semilla).spawn(len(sucursales))[i],
+    así los resultados no dependen de workers ni de mananas_por_grupo.
+    mananas_por_grupo: cuántas mañanas (sucursales × réplicas) avanzan juntas; acota la memoria.
+    callback_progreso(completadas, total) se llama cada vez que termina un grupo de sucursales.
+    """
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    if parametros.perfil_llegadas is not None:
+        raise ValueError("La red de sucursales usa tasas de llegada constantes: sin perfil de llegadas")
+    sucursales = list(sucursales)
+    semillas = np.random.SeedSequence(semilla).spawn(len(sucursales))
+    por_grupo = max(1, mananas_por_grupo // replicas)
+    grupos = [(inicio, sucursales[inicio:inicio + por_grupo], semillas[inicio:inicio + por_grupo])
+              for inicio in range(0, len(sucursales), por_grupo)]
+    metricas = {nombre: np.empty((len(sucursales), replicas),
+                                 dtype=np.float64 if nombre.startswith('costo') else np.int64)
+                for nombre in METRICAS}
+    completadas = 0
+
+    def guardar(inicio, parcial):
+        nonlocal completadas
+        for nombre in METRICAS:
+            metricas[nombre][inicio:inicio + len(parcial[nombre])] = parcial[nombre]
+        completadas += len(parcial['costo_total'])
+        if callback_progreso is not None:
+            callback_progreso(completadas, len(sucursales))
+
+    if workers == 1 or len(grupos) == 1:
+        for inicio, grupo, semillas_grupo in grupos:
+            guardar(inicio, _simular_grupo(grupo, semillas_grupo, replicas, parametros))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(_simular_grupo, grupo, semillas_grupo, replicas, parametros): inicio
+                       for inicio, grupo, semillas_grupo in grupos}
+            for futuro in as_completed(futuros):
+                guardar(futuros[futuro], futuro.result())
+
+    return ResultadoRed(sucursales, semilla, metricas)
@@ -0,0 +1,205 @@
+"""
+Render de videos en paralelo
+
+Genera sin ventana los AVI de varias configuraciones a la vez, una configuración por
+proceso de trabajo. Cada proceso simula su mañana, la reproduce como traza y codifica
+los frames a medida que los dibuja (con una cola acotada de frames pendientes), así
+la memoria de cada proceso no crece con la duración del video. Cada configuración
+corre en un proceso nuevo, que devuelve toda su memoria al terminar.
+
+Un video largo de una sola configuración también se puede renderizar por tramos: la
+traza se reproduce una vez (sin dibujar) para tomar un snapshot del estado al inicio
+de cada tramo, cada proceso dibuja y codifica su tramo desde ese snapshot y al final
+los segmentos se concatenan en orden en un único AVI.
+"""
+
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+FRAMES_EN_COLA = 8  # Frames pendientes por video en cada proceso (~3 MB cada uno)
+
+
+def nombres_salida(prefijo: str, velocidades: Sequence[float]) -> Dict[float, str]:
+    """Archivo AVI de cada velocidad: 'prefijo.avi' con una sola, 'prefijo_{v}x.avi' con varias"""
+    if len(velocidades) == 1:
+        return {velocidades[0]: f"{prefijo}.avi"}
+    return {v: f"{prefijo}_{v:g}x.avi" for v in velocidades}
+
+
+@dataclass
+class RenderConfiguracion:
+    """Lo que hizo un proceso de trabajo con una configuración"""
+    boxes: int
+    archivos: Dict[str, int]     # Archivo -> frames escritos
+    frames: int                  # Frames dibujados (los de la velocidad más lenta)
+    segundos: float
+    memoria_max_mb: float        # Memoria residente máxima del proceso
+
+    @property
+    def frames_por_segundo(self) -> float:
+        return self.frames / max(self.segundos, 1e-9)
+
+
+def _renderizar_configuracion(num_boxes: int, semilla, velocidades: Sequence[float], perfil, clases,
+                              fps: float) -> RenderConfiguracion:
+    """Se ejecuta en un proceso de trabajo: simula y renderiza una configuración"""
+    import cv2
+    from interfaz_visual import InterfazVisual
+    from simulador import ReproductorTraza, SimuladorAtencion
+
+    cv2.setNumThreads(1)  # Un núcleo por proceso: los demás son de los otros trabajadores
+    inicio = time.time()
+    simulador = SimuladorAtencion(num_boxes, semilla, perfil, clases=clases)
+    simulador.simular(mostrar_progreso=False)
+    interfaz = InterfazVisual(ReproductorTraza(simulador), headless=True)
+    archivos = interfaz.renderizar_videos(nombres_salida(f"simulacion_{num_boxes}_boxes", velocidades), fps,
+                                          mostrar_progreso=False, frames_en_cola=FRAMES_EN_COLA)
+    interfaz.cleanup()
+    memoria = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # En Linux viene en KB
+    return RenderConfiguracion(num_boxes, archivos, max(archivos.values(), default=0),
+                               time.time() - inicio, memoria)
+
+
+def renderizar_configuraciones(lista_boxes: List[int], semilla, velocidades: Sequence[float] = (1.0,),
+                               workers: Optional[int] = None, perfil=None, clases=None, fps: float = 15.0,
+                               callback_progreso: Optional[Callable[[RenderConfiguracion], None]] = None
+                               ) -> List[RenderConfiguracion]:
+    """Renderiza simulacion_{n}_boxes.avi para cada n de lista_boxes, un proceso por configuración
+
+    Todas las configuraciones usan la misma semilla (las mismas llegadas). Devuelve
+    los resultados en el orden de lista_boxes.
+    """
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as executor:
+        futuros = {executor.submit(_renderizar_configuracion, num_boxes, semilla, list(velocidades),
+                                   perfil, clases, fps): num_boxes
+                   for num_boxes in lista_boxes}
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados[futuros[futuro]] = resultado
+            if callback_progreso is not None:
+                callback_progreso(resultado)
+    return [resultados[num_boxes] for num_boxes in lista_boxes]
+
+
+@dataclass
+class RenderPorTramos:
+    """Video de una configuración renderizado por tramos en paralelo"""
+    archivos: Dict[str, int]     # Archivo -> frames escritos
+    frames: int                  # Frames dibujados entre todos los tramos
+    tramos: int
+    segundos: float
+    segundos_concatenacion: float
+
+    @property
+    def frames_por_segundo(self) -> float:
+        return self.frames / max(self.segundos, 1e-9)
+
+
+def _renderizar_tramo(estado: dict, salidas: Dict[float, str], fps: float,
+                      frames: Tuple[int, int]) -> Dict[str, int]:
+    """Se ejecuta en un proceso de trabajo: dibuja y codifica los frames [desde, hasta) desde un snapshot"""
+    import cv2
+    from interfaz_visual import InterfazVisual
+    from simulador import ReproductorTraza
+
+    cv2.setNumThreads(1)
+    interfaz = InterfazVisual(ReproductorTraza.desde_snapshot(estado), headless=True)
+    archivos = interfaz.renderizar_videos(salidas, fps, mostrar_progreso=False,
+                                          frames_en_cola=FRAMES_EN_COLA, frames=frames)
+    interfaz.cleanup()
+    return archivos
+
+
+def concatenar_videos(partes: List[str], destino: str, fps: float):
+    """Une los AVI en orden en destino: con ffmpeg sin recodificar si está instalado, si no con OpenCV"""
+    if shutil.which('ffmpeg'):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as lista:
+            for parte in partes:
+                lista.write(f"file '{os.path.abspath(parte)}'\n")
+        try:
+            subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                            '-i', lista.name, '-c', 'copy', destino], check=True)
+            return
+        except subprocess.CalledProcessError:
+            pass  # Se une con OpenCV
+        finally:
+            os.unlink(lista.name)
+
+    import cv2
+    video = None
+    for parte in partes:
+        captura = cv2.VideoCapture(parte)
+        while True:
+            leido, frame = captura.read()
+            if not leido:
+                break
+            if video is None:
+                alto, ancho = frame.shape[:2]
+                video = cv2.VideoWriter(destino, cv2.VideoWriter.fourcc(*'MJPG'), fps, (ancho, alto))
+            video.write(frame)
+        captura.release()
+    if video is not None:
+        video.release()
+
+
+def renderizar_por_tramos(simulador, salidas: Dict[float, str], fps: float = 15.0,
+                          workers: Optional[int] = None, tramos: Optional[int] = None,
+                          callback_progreso: Optional[Callable[[int, int], None]] = None) -> RenderPorTramos:
+    """Renderiza la traza de un simulador ya ejecutado a los mismos AVI que renderizar_videos(), en paralelo
+
+    El video se divide en tramos consecutivos de frames (por defecto dos por proceso,
+    para repartir mejor los tramos con más clientes en pantalla). Cada tramo recibe los
+    frames que tendría en el render secuencial, así el video concatenado tiene el mismo
+    orden y la misma duración.
+    """
+    from interfaz_visual import frames_de_render
+    from simulador import ReproductorTraza
+
+    inicio = time.time()
+    workers = workers or os.cpu_count() or 1
+    reproductor = ReproductorTraza(simulador)
+    segundos_por_frame, total_frames = frames_de_render(reproductor.tiempo_final, min(salidas), fps)
+    tramos = max(1, min(tramos or 2 * workers, total_frames))
+    limites = [total_frames * j // tramos for j in range(tramos + 1)]
+    partes = {velocidad: [f"{archivo}.tramo{j}.avi" for j in range(tramos)] for velocidad, archivo in salidas.items()}
+
+    archivos = {}
+    terminados = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futuros = []
+            for j in range(tramos):
+                # Snapshot del estado al primer frame del tramo (la traza avanza sin dibujar)
+                reproductor.avanzar_hasta(min(limites[j] * segundos_por_frame, reproductor.tiempo_final))
+                salidas_tramo = {velocidad: partes[velocidad][j] for velocidad in salidas}
+                futuros.append(executor.submit(_renderizar_tramo, reproductor.snapshot(), salidas_tramo, fps,
+                                               (limites[j], limites[j + 1])))
+            for futuro in as_completed(futuros):
+                futuro.result()
+                terminados += 1
+                if callback_progreso is not None:
+                    callback_progreso(terminados, tramos)
+            escritos = [futuro.result() for futuro in futuros]
+        duracion_render = time.time() - inicio
+
+        for velocidad, archivo in salidas.items():
+            # Los tramos más cortos que el paso de una velocidad rápida pueden no tener frames
+            con_frames = [parte for parte, tramo in zip(partes[velocidad], escritos) if tramo.get(parte)]
+            archivos[archivo] = sum(tramo.get(parte, 0) for parte, tramo in zip(partes[velocidad], escritos))
+            concatenar_videos(con_frames, archivo, fps)
+    finally:
+        for lista in partes.values():
+            for parte in lista:
+                if os.path.exists(parte):
+                    os.unlink(parte)
+
+    return RenderPorTramos(archivos, total_frames, tramos, time.time() - inicio,
+                           time.time() - inicio - duracion_render)
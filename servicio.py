@@ -0,0 +1,366 @@
+"""
+Servicio local de trabajos de simulación (HTTP/JSON sobre asyncio)
+
+Varios usuarios pueden enviar simulaciones y barridos al mismo tiempo: los trabajos
+se parten en unidades de réplicas que se ejecutan en un único pool de procesos
+compartido, repartiendo las unidades por turnos entre usuarios (un usuario con un
+barrido enorme no bloquea a los demás). Dos pedidos idénticos se calculan una sola
+vez y el avance se puede seguir como NDJSON (una línea JSON por evento).
+
+Endpoints:
+    POST /trabajos                 {"configuraciones": [3, 4, 5], "replicas": 200, "semilla": 1,
+                                    "usuario": "ana", "parametros": {...}}
+    GET  /trabajos                 lista de trabajos
+    GET  /trabajos/<id>            estado (y resultado, si terminó)
+    GET  /trabajos/<id>/eventos    avance y resultados parciales en NDJSON hasta terminar
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set
+import numpy as np
+
+from lote import METRICAS, simular_replicas
+from motor_eventos import ParametrosSimulacion, normalizar_agenda
+
+MAX_REPLICAS = 100000
+
+
+def normalizar_solicitud(datos: dict) -> dict:
+    """Valida un pedido y lo lleva a una forma canónica (la que se usa como clave de caché)"""
+    if not isinstance(datos, dict):
+        raise ValueError("El pedido debe ser un objeto JSON")
+    desconocidos = set(datos) - {'configuraciones', 'boxes', 'replicas', 'semilla', 'parametros', 'usuario'}
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    # Una simulación es un barrido de una sola configuración
+    if 'configuraciones' in datos:
+        configuraciones = datos['configuraciones']
+    elif 'boxes' in datos:
+        configuraciones = [datos['boxes']]
+    else:
+        raise ValueError("Falta 'configuraciones' (lista) o 'boxes'")
+    if not isinstance(configuraciones, list) or not configuraciones:
+        raise ValueError("'configuraciones' debe ser una lista no vacía")
+
+    parametros = ParametrosSimulacion.desde_dict(datos.get('parametros', {})).validar()
+    normalizadas = []
+    for configuracion in configuraciones:
+        if isinstance(configuracion, bool) or not isinstance(configuracion, (int, list)):
+            raise ValueError("Cada configuración es una cantidad de boxes o una agenda (lista por bloque)")
+        if isinstance(configuracion, int):
+            if configuracion < 1:
+                raise ValueError("La cantidad de boxes debe ser al menos 1")
+            normalizadas.append(configuracion)
+        else:
+            normalizadas.append(normalizar_agenda(configuracion, parametros))
+
+    replicas = datos.get('replicas', 10)
+    if not isinstance(replicas, int) or not 1 <= replicas <= MAX_REPLICAS:
+        raise ValueError(f"'replicas' debe ser un entero entre 1 y {MAX_REPLICAS}")
+    # Sin semilla explícita se usa 0: el mismo pedido siempre da el mismo resultado
+    semilla = datos.get('semilla', 0)
+    if not isinstance(semilla, int) or semilla < 0:
+        raise ValueError("'semilla' debe ser un entero no negativo")
+
+    return {'configuraciones': normalizadas, 'replicas': replicas, 'semilla': semilla,
+            'parametros': parametros.a_dict()}
+
+
+def clave_solicitud(solicitud: dict) -> str:
+    """Hash del JSON canónico del pedido normalizado"""
+    texto = json.dumps(solicitud, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _ejecutar_unidad(solicitud: dict, desde: int, hasta: int) -> Dict[str, np.ndarray]:
+    """Unidad de trabajo: un rango de réplicas de todas las configuraciones (en un proceso del pool)"""
+    configuraciones = [c if isinstance(c, int) else tuple(c) for c in solicitud['configuraciones']]
+    parametros = ParametrosSimulacion.desde_dict(solicitud['parametros'])
+    return simular_replicas(configuraciones, solicitud['semilla'], desde, hasta, parametros)
+
+
+def resumir(solicitud: dict, metricas: Dict[str, np.ndarray], completadas: int, detalle: bool) -> dict:
+    """Promedios (y opcionalmente valores por réplica) de las réplicas completadas"""
+    resumen = {
+        'configuraciones': solicitud['configuraciones'],
+        'replicas': completadas,
+        'promedios': {nombre: metricas[nombre][:, :completadas].mean(axis=1).tolist() for nombre in METRICAS},
+        'desvios': {nombre: metricas[nombre][:, :completadas].std(axis=1).tolist() for nombre in METRICAS},
+    }
+    if detalle:
+        resumen['por_replica'] = {nombre: metricas[nombre].tolist() for nombre in METRICAS}
+    return resumen
+
+
+class Trabajo:
+    """Un pedido en curso: sus unidades pendientes, resultados acumulados y suscriptores"""
+
+    def __init__(self, id: int, usuario: str, solicitud: dict, clave: str, tamano_unidad: int):
+        self.id = id
+        self.usuario = usuario
+        self.solicitud = solicitud
+        self.clave = clave
+        self.estado = 'en_cola'
+        self.error: Optional[str] = None
+        self.resultado: Optional[dict] = None
+        self.desde_cache = False
+
+        replicas = solicitud['replicas']
+        self.pendientes = deque((desde, min(desde + tamano_unidad, replicas))
+                                for desde in range(0, replicas, tamano_unidad))
+        self.en_curso = 0
+        self.completadas = 0
+        self.metricas = None
+        self.recibidas = np.zeros(replicas, dtype=bool)
+        self.suscriptores: List[asyncio.Queue] = []
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in ('terminado', 'error')
+
+    def descripcion(self) -> dict:
+        datos = {'id': self.id, 'usuario': self.usuario, 'estado': self.estado,
+                 'completadas': self.completadas, 'total': self.solicitud['replicas'],
+                 'desde_cache': self.desde_cache}
+        if self.error is not None:
+            datos['error'] = self.error
+        if self.resultado is not None:
+            datos['resultado'] = self.resultado
+        return datos
+
+    def publicar(self, evento: dict):
+        for cola in self.suscriptores:
+            cola.put_nowait(evento)
+
+
+class ServicioSimulacion:
+    """Cola de trabajos con un pool de procesos compartido, turnos por usuario y caché de resultados"""
+
+    def __init__(self, workers: Optional[int] = None, tamano_unidad: int = 25, tamano_cache: int = 256):
+        self.workers = workers or os.cpu_count() or 1
+        self.tamano_unidad = tamano_unidad
+        self.tamano_cache = tamano_cache
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.trabajos: Dict[int, Trabajo] = {}
+        self.en_proceso: Dict[str, Trabajo] = {}  # Pedidos idénticos en curso comparten el trabajo
+        self.cache: 'OrderedDict[str, dict]' = OrderedDict()
+        self.colas_usuario: 'OrderedDict[str, deque]' = OrderedDict()
+        self.unidades_en_curso = 0
+        self.ids = itertools.count(1)
+        self.hay_novedades = asyncio.Event()
+        self.tareas: Set[asyncio.Future] = set()  # Referencias a las unidades en curso hasta que terminan
+        self.puerto: Optional[int] = None  # Puerto en que escucha (el real, si se pidió el 0)
+
+    def enviar(self, datos: dict) -> Trabajo:
+        """Registra un pedido y devuelve su trabajo (uno existente si es idéntico a otro)"""
+        solicitud = normalizar_solicitud(datos)
+        usuario = str(datos.get('usuario', 'anonimo'))
+        clave = clave_solicitud(solicitud)
+
+        if clave in self.en_proceso:
+            return self.en_proceso[clave]
+
+        trabajo = Trabajo(next(self.ids), usuario, solicitud, clave, self.tamano_unidad)
+        self.trabajos[trabajo.id] = trabajo
+        if clave in self.cache:
+            self.cache.move_to_end(clave)
+            trabajo.estado = 'terminado'
+            trabajo.desde_cache = True
+            trabajo.completadas = solicitud['replicas']
+            trabajo.pendientes.clear()
+            trabajo.resultado = self.cache[clave]
+            return trabajo
+
+        self.en_proceso[clave] = trabajo
+        self.colas_usuario.setdefault(usuario, deque()).append(trabajo)
+        self.hay_novedades.set()
+        return trabajo
+
+    def siguiente_unidad(self):
+        """Próxima unidad por turnos entre usuarios (dentro de cada usuario, en orden de llegada)"""
+        for _ in range(len(self.colas_usuario)):
+            usuario, cola = next(iter(self.colas_usuario.items()))
+            self.colas_usuario.move_to_end(usuario)
+            while cola and not cola[0].pendientes:
+                cola.popleft()
+            if not cola:
+                del self.colas_usuario[usuario]
+                continue
+            trabajo = cola[0]
+            return trabajo, trabajo.pendientes.popleft()
+        return None
+
+    async def planificar(self):
+        """Mantiene el pool ocupado con unidades de los trabajos en cola"""
+        while True:
+            await self.hay_novedades.wait()
+            self.hay_novedades.clear()
+            while self.unidades_en_curso < self.workers:
+                siguiente = self.siguiente_unidad()
+                if siguiente is None:
+                    break
+                trabajo, (desde, hasta) = siguiente
+                self.unidades_en_curso += 1
+                trabajo.en_curso += 1
+                trabajo.estado = 'ejecutando'
+                tarea = asyncio.ensure_future(self.ejecutar_unidad(trabajo, desde, hasta))
+                self.tareas.add(tarea)
+                tarea.add_done_callback(self.tareas.discard)
+
+    async def ejecutar_unidad(self, trabajo: Trabajo, desde: int, hasta: int):
+        loop = asyncio.get_running_loop()
+        try:
+            parcial = await loop.run_in_executor(self.pool, _ejecutar_unidad, trabajo.solicitud, desde, hasta)
+        except Exception as e:
+            parcial = None
+            if not trabajo.terminado:
+                trabajo.estado = 'error'
+                trabajo.error = f"{type(e).__name__}: {e}"
+                trabajo.pendientes.clear()
+                self.en_proceso.pop(trabajo.clave, None)
+                trabajo.publicar({'evento': 'error', 'error': trabajo.error})
+        finally:
+            self.unidades_en_curso -= 1
+            trabajo.en_curso -= 1
+            self.hay_novedades.set()
+
+        if parcial is None or trabajo.terminado:
+            return
+        if trabajo.metricas is None:
+            trabajo.metricas = {nombre: np.empty((valores.shape[0], trabajo.solicitud['replicas']), valores.dtype)
+                                for nombre, valores in parcial.items()}
+        for nombre, valores in parcial.items():
+            trabajo.metricas[nombre][:, desde:hasta] = valores
+        trabajo.recibidas[desde:hasta] = True
+        trabajo.completadas += hasta - desde
+
+        if trabajo.completadas < trabajo.solicitud['replicas']:
+            # Resultados parciales: las unidades pueden terminar desordenadas, así que el
+            # parcial se calcula sobre las réplicas ya recibidas
+            trabajo.publicar({'evento': 'progreso', 'completadas': trabajo.completadas,
+                              'total': trabajo.solicitud['replicas'],
+                              'costo_total_parcial': self.promedio_parcial(trabajo)})
+            return
+
+        trabajo.resultado = resumir(trabajo.solicitud, trabajo.metricas, trabajo.completadas, detalle=True)
+        trabajo.metricas = None
+        trabajo.estado = 'terminado'
+        self.en_proceso.pop(trabajo.clave, None)
+        self.cache[trabajo.clave] = trabajo.resultado
+        while len(self.cache) > self.tamano_cache:
+            self.cache.popitem(last=False)
+        trabajo.publicar({'evento': 'terminado', 'resultado': trabajo.resultado})
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atiende una conexión HTTP (una petición por conexión)"""
+        try:
+            linea = (await reader.readline()).decode('latin-1').split()
+            if len(linea) < 2:
+                return
+            metodo, ruta = linea[0], linea[1].split('?')[0].rstrip('/')
+            largo = 0
+            while True:
+                encabezado = (await reader.readline()).decode('latin-1').strip()
+                if not encabezado:
+                    break
+                nombre, _, valor = encabezado.partition(':')
+                if nombre.lower() == 'content-length':
+                    largo = int(valor) if valor.strip().isdigit() else -1
+            if largo < 0:
+                return await enviar_json(writer, 400, {'error': 'Content-Length inválido'})
+            cuerpo = await reader.readexactly(largo) if largo else b''
+            await self.responder(metodo, ruta.split('/')[1:], cuerpo, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def responder(self, metodo: str, partes: List[str], cuerpo: bytes, writer: asyncio.StreamWriter):
+        if partes[:1] != ['trabajos']:
+            return await enviar_json(writer, 404, {'error': 'Ruta desconocida'})
+
+        if len(partes) == 1 and metodo == 'POST':
+            try:
+                trabajo = self.enviar(json.loads(cuerpo or b'{}'))
+            except (ValueError, TypeError) as e:
+                return await enviar_json(writer, 400, {'error': str(e)})
+            return await enviar_json(writer, 202, trabajo.descripcion())
+        if len(partes) == 1 and metodo == 'GET':
+            lista = [{k: v for k, v in t.descripcion().items() if k != 'resultado'} for t in self.trabajos.values()]
+            return await enviar_json(writer, 200, lista)
+
+        trabajo = self.trabajos.get(int(partes[1])) if partes[1].isdigit() else None
+        if trabajo is None or metodo != 'GET':
+            return await enviar_json(writer, 404, {'error': 'Trabajo inexistente'})
+        if len(partes) == 2:
+            return await enviar_json(writer, 200, trabajo.descripcion())
+        if partes[2:] == ['eventos']:
+            return await self.transmitir(trabajo, writer)
+        return await enviar_json(writer, 404, {'error': 'Ruta desconocida'})
+
+    async def transmitir(self, trabajo: Trabajo, writer: asyncio.StreamWriter):
+        """Envía el avance del trabajo como NDJSON hasta que termina"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+        cola: asyncio.Queue = asyncio.Queue()
+        trabajo.suscriptores.append(cola)
+        
+        async def escribir(evento: dict):
+            writer.write(json.dumps(evento).encode('utf-8') + b"\n")
+            await writer.drain()
+        
+        try:
+            await escribir({'evento': 'estado',
+                            **{k: v for k, v in trabajo.descripcion().items() if k != 'resultado'}})
+            if trabajo.estado == 'terminado':
+                await escribir({'evento': 'terminado', 'resultado': trabajo.resultado})
+            elif trabajo.estado == 'error':
+                await escribir({'evento': 'error', 'error': trabajo.error})
+            else:
+                while True:
+                    evento = await cola.get()
+                    await escribir(evento)
+                    if evento['evento'] in ('terminado', 'error'):
+                        break
+        finally:
+            trabajo.suscriptores.remove(cola)
+
+    @staticmethod
+    def promedio_parcial(trabajo: Trabajo) -> List[float]:
+        """Costo total medio por configuración con las réplicas recibidas hasta ahora"""
+        return trabajo.metricas['costo_total'][:, trabajo.recibidas].mean(axis=1).tolist()
+
+    async def servir(self, host: str = '127.0.0.1', puerto: int = 8765):
+        """Inicia el servidor y atiende pedidos hasta que se interrumpa"""
+        with ProcessPoolExecutor(max_workers=self.workers) as self.pool:
+            servidor = await asyncio.start_server(self.atender, host, puerto)
+            self.puerto = servidor.sockets[0].getsockname()[1]
+            planificador = asyncio.ensure_future(self.planificar())
+            print(f"🌐 Servicio de simulación en http://{host}:{self.puerto}/trabajos ({self.workers} procesos)")
+            try:
+                async with servidor:
+                    await servidor.serve_forever()
+            finally:
+                planificador.cancel()
+
+
+async def enviar_json(writer: asyncio.StreamWriter, codigo: int, datos):
+    textos = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found'}
+    cuerpo = json.dumps(datos).encode('utf-8')
+    writer.write(f"HTTP/1.1 {codigo} {textos[codigo]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode('latin-1') + cuerpo)
+    await writer.drain()
+
+
+def iniciar_servicio(host: str = '127.0.0.1', puerto: int = 8765, workers: Optional[int] = None):
+    """Punto de entrada bloqueante del servicio"""
+    try:
+        asyncio.run(ServicioSimulacion(workers).servir(host, puerto))
+    except KeyboardInterrupt:
+        print("\nServicio detenido")
@@ -1,9 +1,14 @@
-import random
 import numpy as np
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 from enum import Enum
+from collections import deque
+import heapq
+import copy
+import json
 import time
+from concurrent.futures import ProcessPoolExecutor
+from perfil_llegadas import PerfilLlegadas
 
 class ClienteEstado(Enum):
     ESPERANDO = "esperando"
@@ -20,6 +25,7 @@ class Cliente:
     tiempo_abandono: Optional[int] = None
     estado: ClienteEstado = ClienteEstado.ESPERANDO
     box_asignado: Optional[int] = None
+    clase: int = 0  # Índice de la clase de cliente (0 si hay una sola)
     
     @property
     def tiempo_espera(self) -> int:
@@ -45,11 +51,143 @@ class Box:
     cliente_actual: Optional[Cliente] = None
     tiempo_fin_atencion: Optional[int] = None
 
+@dataclass
+class ClaseCliente:
+    """Tipo de cliente con su propia tasa de llegada, atención, paciencia y costo de pérdida"""
+    nombre: str
+    prioridad: int = 1              # Menor número = se atiende antes
+    prob_llegada: float = 1/144     # Probabilidad de llegada por segundo
+    media_atencion: float = 10 * 60
+    desvio_atencion: float = 5 * 60
+    tiempo_max_espera: int = 30 * 60
+    perdida_cliente: float = 10000
+
+def cargar_clases(ruta: str) -> List[ClaseCliente]:
+    """Lee las clases de cliente de un archivo JSON (una lista de objetos con los campos de ClaseCliente)"""
+    with open(ruta, encoding='utf-8') as archivo:
+        datos = json.load(archivo)
+    if not isinstance(datos, list) or not datos:
+        raise ValueError("El archivo de clases debe contener una lista no vacía")
+    return [ClaseCliente(**clase) for clase in datos]
+
+class ColaEspera:
+    """Cola de espera con prioridad entre clases y orden de llegada dentro de cada clase
+    
+    Cada clase tiene su propia cola. Como todos los clientes de una clase tienen la
+    misma paciencia, cada cola ya está ordenada por vencimiento: atender o detectar un
+    abandono siempre toma el frente de una cola, en tiempo constante por clase aunque
+    esperen miles de clientes.
+    """
+    
+    def __init__(self, prioridades: Optional[List[int]] = None):
+        self.prioridades = prioridades or [0]
+        self.colas = [deque() for _ in self.prioridades]
+        self.largo = 0
+    
+    def __len__(self) -> int:
+        return self.largo
+    
+    def __bool__(self) -> bool:
+        return self.largo > 0
+    
+    def __iter__(self) -> Iterator[Cliente]:
+        return iter(self.en_orden())
+    
+    def __getitem__(self, indice):
+        return self.en_orden()[indice]
+    
+    def __contains__(self, cliente: Cliente) -> bool:
+        return cliente in self.colas[cliente.clase]
+    
+    def agregar(self, cliente: Cliente):
+        self.colas[cliente.clase].append(cliente)
+        self.largo += 1
+    
+    def clase_siguiente(self) -> Optional[int]:
+        """Clase del próximo cliente a atender: mayor prioridad y, a igual prioridad, el que llegó antes"""
+        mejor = None
+        for clase, cola in enumerate(self.colas):
+            if cola:
+                clave = (self.prioridades[clase], cola[0].tiempo_llegada, cola[0].id)
+                if mejor is None or clave < mejor[0]:
+                    mejor = (clave, clase)
+        return None if mejor is None else mejor[1]
+    
+    def extraer(self) -> Cliente:
+        """Quita y devuelve al próximo cliente a atender"""
+        cliente = self.colas[self.clase_siguiente()].popleft()
+        self.largo -= 1
+        return cliente
+    
+    def quitar(self, cliente: Cliente):
+        """Quita un cliente cualquiera (casi siempre es el primero de su clase)"""
+        cola = self.colas[cliente.clase]
+        if cola[0] is cliente:
+            cola.popleft()
+        else:
+            cola.remove(cliente)
+        self.largo -= 1
+    
+    def vencidos(self, tiempo: int, paciencias: List[int]) -> List[Cliente]:
+        """Quita y devuelve a los clientes que llevan esperando su paciencia o más"""
+        resultado = []
+        for cola, paciencia in zip(self.colas, paciencias):
+            while cola and tiempo - cola[0].tiempo_llegada >= paciencia:
+                resultado.append(cola.popleft())
+        self.largo -= len(resultado)
+        return resultado
+    
+    def proximo_vencimiento(self, paciencias: List[int]) -> Optional[int]:
+        """Segundo en que abandonaría el próximo cliente si nadie lo atiende antes"""
+        limites = [cola[0].tiempo_llegada + paciencia for cola, paciencia in zip(self.colas, paciencias) if cola]
+        return min(limites) if limites else None
+    
+    def en_orden(self) -> List[Cliente]:
+        """Clientes en el orden en que serían atendidos"""
+        resultado = []
+        for prioridad in sorted(set(self.prioridades)):
+            colas = [cola for cola, p in zip(self.colas, self.prioridades) if p == prioridad]
+            if len(colas) == 1:
+                resultado.extend(colas[0])
+            else:
+                resultado.extend(heapq.merge(*colas, key=lambda c: (c.tiempo_llegada, c.id)))
+        return resultado
+    
+    def clear(self):
+        for cola in self.colas:
+            cola.clear()
+        self.largo = 0
+
+def crear_generadores(semilla=None):
+    """Crea los generadores independientes de llegadas y de atenciones a partir de una semilla"""
+    if isinstance(semilla, np.random.SeedSequence):
+        # Copia: spawn() avanza el contador de la secuencia y la semilla debe poder reutilizarse
+        secuencia = np.random.SeedSequence(semilla.entropy, spawn_key=semilla.spawn_key,
+                                           pool_size=semilla.pool_size)
+    else:
+        secuencia = np.random.SeedSequence(semilla)
+    semilla_llegadas, semilla_atencion = secuencia.spawn(2)
+    return np.random.default_rng(semilla_llegadas), np.random.default_rng(semilla_atencion)
+
 class SimuladorAtencion:
-    def __init__(self, num_boxes: int):
+    def __init__(self, num_boxes: int, semilla: Optional[int] = None,
+                 perfil_llegadas: Optional[PerfilLlegadas] = None, agenda: Optional[List[int]] = None,
+                 clases: Optional[List[ClaseCliente]] = None):
+        # Con agenda (boxes abiertos en cada bloque de 30 minutos) se crean tantos
+        # boxes como el máximo de la agenda
+        if agenda is not None:
+            if not agenda or min(agenda) < 1:
+                raise ValueError("La agenda debe tener al menos un box abierto en cada bloque")
+            agenda = list(agenda)
+            num_boxes = max(agenda)
         self.num_boxes = num_boxes
         self.boxes = [Box(i) for i in range(num_boxes)]
-        self.cola_espera: List[Cliente] = []
+        
+        # Clases de cliente (None = una sola clase con las constantes de abajo)
+        if clases is not None and not clases:
+            raise ValueError("Debe haber al menos una clase de cliente")
+        self.clases = list(clases) if clases is not None else None
+        self.cola_espera = ColaEspera([c.prioridad for c in self.clases] if self.clases else None)
         self.clientes_atendidos: List[Cliente] = []
         self.clientes_abandonaron: List[Cliente] = []
         self.todos_los_clientes: List[Cliente] = []
@@ -64,54 +202,164 @@ class SimuladorAtencion:
         self.DESVIO_ATENCION = 5 * 60     # 5 minutos en segundos
         self.COSTO_BOX = 1000
         self.PERDIDA_CLIENTE = 10000
+        self.DURACION_BLOQUE_AGENDA = 30 * 60  # Bloques de la agenda de boxes
         
         # Estadísticas
         self.tiempo_actual = 0
         self.contador_clientes = 0
+        self.boxes_ocupados = 0  # Se actualiza en cada asignación y liberación
+        
+        # Generadores aleatorios propios: uno para llegadas y otro para atenciones,
+        # así una misma semilla reproduce exactamente la misma mañana
+        self.semilla = semilla
+        self.rng_llegadas, self.rng_atencion = crear_generadores(semilla)
+        
+        # Uniformes de llegada sorteadas por bloques: se consumen una por segundo,
+        # pero se pueden mirar por adelantado para saltar segundos sin eventos
+        self.uniformes_llegada: List[float] = []
+        self.indice_uniforme = 0
+        self.proximo_segundo = 0  # Próximo segundo a ejecutar por avanzar_hasta()
+        
+        # Perfil de llegadas no homogéneo (None = PROB_LLEGADA_POR_SEGUNDO constante)
+        self.perfil_llegadas = perfil_llegadas
+        
+        # Agenda de boxes abiertos por bloque (None = todos los boxes toda la mañana);
+        # después del cierre sigue vigente el último bloque
+        self.agenda = agenda
         
         # Para la animación
         self.eventos_animacion = []
+        self.mostrar_progreso = True  # simular(mostrar_progreso=False) no imprime nada
         
-    def generar_tiempo_atencion(self) -> int:
-        """Genera tiempo de atención siguiendo distribución normal"""
-        tiempo = np.random.normal(self.MEDIA_ATENCION, self.DESVIO_ATENCION)
+    def generar_tiempo_atencion(self, clase: int = 0) -> int:
+        """Genera tiempo de atención siguiendo distribución normal (la de la clase del cliente)"""
+        if self.clases is None:
+            tiempo = self.rng_atencion.normal(self.MEDIA_ATENCION, self.DESVIO_ATENCION)
+        else:
+            tiempo = self.rng_atencion.normal(self.clases[clase].media_atencion, self.clases[clase].desvio_atencion)
         return max(int(tiempo), 30)  # mínimo 30 segundos
     
-    def llega_cliente(self) -> bool:
-        """Determina si llega un cliente en este segundo"""
-        return random.random() < self.PROB_LLEGADA_POR_SEGUNDO
+    def paciencias(self) -> List[int]:
+        """Tiempo máximo de espera de cada clase"""
+        if self.clases is None:
+            return [self.TIEMPO_MAX_ESPERA]
+        return [clase.tiempo_max_espera for clase in self.clases]
     
-    def agregar_cliente(self):
+    def prob_llegada(self, segundo: int) -> float:
+        """Probabilidad de que llegue un cliente (de cualquier clase) en el segundo indicado"""
+        probabilidades = self.probabilidades_llegada()
+        if probabilidades is not None:
+            return probabilidades[segundo]
+        if self.clases is not None:
+            return sum(clase.prob_llegada for clase in self.clases)
+        return self.PROB_LLEGADA_POR_SEGUNDO
+    
+    def probabilidades_llegada(self) -> Optional[np.ndarray]:
+        """Probabilidad de llegada de cada segundo del horario, o None si es constante"""
+        if self.perfil_llegadas is None:
+            return None
+        return self.perfil_llegadas.probabilidades(self.DURACION_SIMULACION)
+    
+    def llega_cliente(self) -> Optional[int]:
+        """Determina si llega un cliente en este segundo y devuelve su clase (None si no llega)
+        
+        Con varias clases se usa el mismo sorteo: llega alguien si u < p y la clase
+        sale de en qué tramo de [0, p) cae u, proporcional a la tasa de cada clase.
+        """
+        if self.indice_uniforme >= len(self.uniformes_llegada):
+            self.sortear_uniformes_llegada()
+        u = self.uniformes_llegada[self.indice_uniforme]
+        self.indice_uniforme += 1
+        p = self.prob_llegada(self.tiempo_actual)
+        if u >= p:
+            return None
+        if self.clases is None:
+            return 0
+        tasas = [clase.prob_llegada for clase in self.clases]
+        acumulado = 0.0
+        for indice, tasa in enumerate(tasas[:-1]):
+            acumulado += tasa
+            if u < p * acumulado / sum(tasas):
+                return indice
+        return len(tasas) - 1
+    
+    def sortear_uniformes_llegada(self, bloque: int = 4096):
+        """Agrega un bloque de uniformes de llegada, descartando las ya consumidas"""
+        pendientes = self.uniformes_llegada[self.indice_uniforme:]
+        self.uniformes_llegada = pendientes + self.rng_llegadas.random(bloque).tolist()
+        self.indice_uniforme = 0
+    
+    def segundos_hasta_llegada(self, maximo: int, desde: Optional[int] = None) -> int:
+        """Cuenta los segundos sin llegada que siguen a 'desde' (sin consumir sorteos), hasta un máximo"""
+        if desde is None:
+            desde = self.proximo_segundo
+        probabilidades = self.probabilidades_llegada()
+        p = self.prob_llegada(desde) if probabilidades is None else None
+        desplazamiento = 0
+        while desplazamiento < maximo:
+            if self.indice_uniforme + desplazamiento >= len(self.uniformes_llegada):
+                self.sortear_uniformes_llegada()
+            if probabilidades is not None:
+                p = probabilidades[desde + desplazamiento]
+            if self.uniformes_llegada[self.indice_uniforme + desplazamiento] < p:
+                break
+            desplazamiento += 1
+        return desplazamiento
+    
+    def agregar_cliente(self, clase: int = 0):
         """Agrega un nuevo cliente al sistema"""
         cliente = Cliente(
             id=self.contador_clientes,
-            tiempo_llegada=self.tiempo_actual
+            tiempo_llegada=self.tiempo_actual,
+            clase=clase
         )
         self.contador_clientes += 1
         self.todos_los_clientes.append(cliente)
         
+        # Evento para animación (se registra antes de la asignación para que
+        # la traza pueda reproducirse en orden)
+        evento = {
+            'tipo': 'llegada_cliente',
+            'tiempo': self.tiempo_actual,
+            'cliente_id': cliente.id
+        }
+        if self.clases is not None:
+            evento['clase'] = clase
+        self.eventos_animacion.append(evento)
+        
         # Buscar box libre
         box_libre = self.buscar_box_libre()
         if box_libre:
             self.asignar_cliente_a_box(cliente, box_libre)
         else:
-            self.cola_espera.append(cliente)
-            
-        # Evento para animación
-        self.eventos_animacion.append({
-            'tipo': 'llegada_cliente',
-            'tiempo': self.tiempo_actual,
-            'cliente_id': cliente.id,
-            'total_cola': len(self.cola_espera)
-        })
+            self.cola_espera.agregar(cliente)
+        
+        evento['total_cola'] = len(self.cola_espera)
+    
+    def boxes_abiertos(self, tiempo: Optional[int] = None) -> int:
+        """Cantidad de boxes abiertos en el segundo indicado según la agenda (los primeros N)"""
+        if self.agenda is None:
+            return self.num_boxes
+        if tiempo is None:
+            tiempo = self.tiempo_actual
+        bloque = min(tiempo, self.DURACION_SIMULACION - 1) // self.DURACION_BLOQUE_AGENDA
+        return self.agenda[min(bloque, len(self.agenda) - 1)]
     
     def buscar_box_libre(self) -> Optional[Box]:
-        """Busca un box que esté libre"""
-        for box in self.boxes:
+        """Busca un box abierto que esté libre"""
+        for box in self.boxes[:self.boxes_abiertos()]:
             if not box.ocupado:
                 return box
         return None
     
+    def abrir_boxes(self):
+        """Al comenzar un bloque de la agenda, los boxes que abren toman clientes de la cola"""
+        for box in self.boxes[:self.boxes_abiertos()]:
+            if not self.cola_espera:
+                break
+            if not box.ocupado:
+                self.asignar_cliente_a_box(self.cola_espera.extraer(), box)
+    
     def asignar_cliente_a_box(self, cliente: Cliente, box: Box):
         """Asigna un cliente a un box específico"""
         cliente.estado = ClienteEstado.SIENDO_ATENDIDO
@@ -120,14 +368,16 @@ class SimuladorAtencion:
         
         box.ocupado = True
         box.cliente_actual = cliente
-        box.tiempo_fin_atencion = self.tiempo_actual + self.generar_tiempo_atencion()
+        box.tiempo_fin_atencion = self.tiempo_actual + self.generar_tiempo_atencion(cliente.clase)
+        self.boxes_ocupados += 1
         
         # Evento para animación
         self.eventos_animacion.append({
             'tipo': 'inicio_atencion',
             'tiempo': self.tiempo_actual,
             'cliente_id': cliente.id,
-            'box_id': box.id
+            'box_id': box.id,
+            'tiempo_fin': box.tiempo_fin_atencion
         })
     
     def procesar_finalizacion_atencion(self):
@@ -135,31 +385,35 @@ class SimuladorAtencion:
         for box in self.boxes:
             if (box.ocupado and box.tiempo_fin_atencion and 
                 self.tiempo_actual >= box.tiempo_fin_atencion):
-                
-                cliente = box.cliente_actual
-                if cliente is not None:
-                    cliente.estado = ClienteEstado.ATENDIDO
-                    cliente.tiempo_fin_atencion = self.tiempo_actual
-                    
-                    self.clientes_atendidos.append(cliente)
-                    
-                    # Evento para animación
-                    self.eventos_animacion.append({
-                        'tipo': 'fin_atencion',
-                        'tiempo': self.tiempo_actual,
-                        'cliente_id': cliente.id,
-                        'box_id': box.id
-                    })
-                
-                # Liberar box
-                box.ocupado = False
-                box.cliente_actual = None
-                box.tiempo_fin_atencion = None
-                
-                # Asignar siguiente cliente de la cola
-                if self.cola_espera:
-                    siguiente_cliente = self.cola_espera.pop(0)
-                    self.asignar_cliente_a_box(siguiente_cliente, box)
+                self.finalizar_atencion(box)
+    
+    def finalizar_atencion(self, box: Box):
+        """Termina la atención en curso del box y le asigna el siguiente cliente de la cola"""
+        cliente = box.cliente_actual
+        if cliente is not None:
+            cliente.estado = ClienteEstado.ATENDIDO
+            cliente.tiempo_fin_atencion = self.tiempo_actual
+            
+            self.clientes_atendidos.append(cliente)
+            
+            # Evento para animación
+            self.eventos_animacion.append({
+                'tipo': 'fin_atencion',
+                'tiempo': self.tiempo_actual,
+                'cliente_id': cliente.id,
+                'box_id': box.id
+            })
+        
+        # Liberar box
+        box.ocupado = False
+        box.cliente_actual = None
+        box.tiempo_fin_atencion = None
+        self.boxes_ocupados -= 1
+        
+        # Asignar siguiente cliente de la cola (si el box sigue abierto según la agenda)
+        if self.cola_espera and box.id < self.boxes_abiertos():
+            siguiente_cliente = self.cola_espera.extraer()
+            self.asignar_cliente_a_box(siguiente_cliente, box)
     
     def procesar_abandonos(self, durante_horario_normal=True):
         """Procesa clientes que abandonan por tiempo de espera"""
@@ -167,99 +421,301 @@ class SimuladorAtencion:
         if not durante_horario_normal:
             return
             
-        clientes_a_remover = []
+        # Solo se miran los primeros de cada clase: son los que más esperaron
+        vencidos = self.cola_espera.vencidos(self.tiempo_actual, self.paciencias())
+        for cliente in sorted(vencidos, key=lambda c: (c.tiempo_llegada, c.id)):
+            cliente.estado = ClienteEstado.ABANDONO
+            cliente.tiempo_abandono = self.tiempo_actual
+            self.clientes_abandonaron.append(cliente)
+            
+            # Evento para animación
+            self.eventos_animacion.append({
+                'tipo': 'abandono',
+                'tiempo': self.tiempo_actual,
+                'cliente_id': cliente.id
+            })
+    
+    def ejecutar_segundo(self):
+        """Ejecuta un segundo de simulación en tiempo_actual"""
+        en_horario = self.tiempo_actual < self.DURACION_SIMULACION
         
-        for cliente in self.cola_espera:
-            tiempo_esperando = self.tiempo_actual - cliente.tiempo_llegada
-            if tiempo_esperando >= self.TIEMPO_MAX_ESPERA:
-                cliente.estado = ClienteEstado.ABANDONO
-                cliente.tiempo_abandono = self.tiempo_actual
-                self.clientes_abandonaron.append(cliente)
-                clientes_a_remover.append(cliente)
-                
-                # Evento para animación
-                self.eventos_animacion.append({
-                    'tipo': 'abandono',
-                    'tiempo': self.tiempo_actual,
-                    'cliente_id': cliente.id
-                })
-        
-        for cliente in clientes_a_remover:
-            self.cola_espera.remove(cliente)
-    
-    def simular(self):
-        """Ejecuta la simulación completa"""
-        print(f"Iniciando simulación con {self.num_boxes} boxes...")
+        if self.agenda is not None and self.tiempo_actual % self.DURACION_BLOQUE_AGENDA == 0:
+            self.abrir_boxes()
+        
+        # Solo durante horario de atención (8-12h)
+        if en_horario:
+            clase = self.llega_cliente()
+            if clase is not None:
+                self.agregar_cliente(clase)
+        
+        self.procesar_finalizacion_atencion()
+        self.procesar_abandonos(durante_horario_normal=en_horario)
+    
+    def proximo_evento(self) -> Optional[int]:
+        """Segundo del próximo evento posible (llegada, fin de atención o abandono)"""
+        desde = self.proximo_segundo
+        candidatos = []
+        
+        if desde < self.DURACION_SIMULACION:
+            espera = self.segundos_hasta_llegada(self.DURACION_SIMULACION - desde, desde)
+            if desde + espera < self.DURACION_SIMULACION:
+                candidatos.append(desde + espera)
+        
+        for box in self.boxes:
+            if box.ocupado and box.tiempo_fin_atencion is not None:
+                candidatos.append(max(desde, box.tiempo_fin_atencion))
+        
+        # Cada clase está ordenada por llegada: su primero es el próximo en abandonar
+        if self.cola_espera:
+            limite = self.cola_espera.proximo_vencimiento(self.paciencias())
+            if limite < self.DURACION_SIMULACION:
+                candidatos.append(max(desde, limite))
+            
+            # Inicio del próximo bloque de la agenda (pueden abrir boxes)
+            if self.agenda is not None:
+                bloque = self.DURACION_BLOQUE_AGENDA
+                inicio_bloque = -(-desde // bloque) * bloque
+                if inicio_bloque < self.DURACION_SIMULACION:
+                    candidatos.append(inicio_bloque)
+        
+        return min(candidatos) if candidatos else None
+    
+    def avanzar_hasta(self, tiempo: int):
+        """Ejecuta todos los segundos hasta el indicado (inclusive), saltando los que no tienen eventos
+        
+        El resultado es idéntico a ejecutar segundo a segundo: los segundos saltados
+        igual consumen su sorteo de llegada.
+        """
+        while self.proximo_segundo <= tiempo:
+            evento = self.proximo_evento()
+            if evento is None or evento > tiempo:
+                evento = tiempo + 1
+            
+            # Saltar los segundos sin eventos
+            saltados = min(evento, self.DURACION_SIMULACION) - min(self.proximo_segundo, self.DURACION_SIMULACION)
+            if saltados > 0:
+                self.indice_uniforme += saltados
+            self.proximo_segundo = evento
+            
+            if evento <= tiempo:
+                self.tiempo_actual = evento
+                self.ejecutar_segundo()
+                self.proximo_segundo = evento + 1
+        self.tiempo_actual = tiempo
+    
+    def terminada(self) -> bool:
+        """Indica si ya cerró el local y no quedan clientes en cola ni en atención"""
+        return (self.proximo_segundo >= self.DURACION_SIMULACION and not self.cola_espera and
+                self.boxes_ocupados == 0)
+    
+    def simular(self, mostrar_progreso: bool = True):
+        """Ejecuta la simulación completa (mostrar_progreso=False no imprime nada)"""
+        self.mostrar_progreso = mostrar_progreso
+        if mostrar_progreso:
+            print(f"Iniciando simulación con {self.num_boxes} boxes...")
         
         for segundo in range(self.DURACION_SIMULACION):
             self.tiempo_actual = segundo
             
+            if self.agenda is not None and segundo % self.DURACION_BLOQUE_AGENDA == 0:
+                self.abrir_boxes()
+            
             # Solo durante horario de atención (8-12h)
             if segundo < self.DURACION_SIMULACION:
-                if self.llega_cliente():
-                    self.agregar_cliente()
+                clase = self.llega_cliente()
+                if clase is not None:
+                    self.agregar_cliente(clase)
             
             # Procesar eventos
             self.procesar_finalizacion_atencion()
             self.procesar_abandonos(durante_horario_normal=True)
             
             # Progreso cada 10%
-            if segundo % (self.DURACION_SIMULACION // 10) == 0:
+            if mostrar_progreso and segundo % (self.DURACION_SIMULACION // 10) == 0:
                 progreso = (segundo / self.DURACION_SIMULACION) * 100
                 print(f"Progreso: {progreso:.0f}%")
         
+        self.proximo_segundo = self.DURACION_SIMULACION
+        
         # Después del horario de cierre, continuar atendiendo a clientes restantes
         # según la regla 3: "Los clientes que están en cola o siendo atendidos pueden permanecer luego de la hora de cierre"
         clientes_en_cola = len(self.cola_espera)
-        boxes_ocupados = sum(1 for box in self.boxes if box.ocupado)
         
-        if clientes_en_cola > 0 or boxes_ocupados > 0:
+        if mostrar_progreso and (clientes_en_cola > 0 or self.boxes_ocupados > 0):
             print(f"Procesando clientes restantes después del cierre...")
             print(f"  - Clientes en cola: {clientes_en_cola}")
-            print(f"  - Boxes ocupados: {boxes_ocupados}")
+            print(f"  - Boxes ocupados: {self.boxes_ocupados}")
         
-        while (len(self.cola_espera) > 0 or 
-               any(box.ocupado for box in self.boxes)):
-            
-            self.tiempo_actual += 1
-            
-            # Solo procesar finalizaciones, NO abandonos después del cierre
-            # porque según la regla 3, los clientes pueden permanecer
-            self.procesar_finalizacion_atencion()
-            
-            # Mostrar progreso cada minuto (60 segundos)
-            if (self.tiempo_actual - self.DURACION_SIMULACION) % 60 == 0:
-                minutos_extra = (self.tiempo_actual - self.DURACION_SIMULACION) // 60
-                cola_actual = len(self.cola_espera)
-                boxes_actuales = sum(1 for box in self.boxes if box.ocupado)
-                print(f"  Tiempo extra: +{minutos_extra} min, Cola: {cola_actual}, Atendiendo: {boxes_actuales}")
-            
-            # Prevenir bucles infinitos (máximo 3 horas adicionales)
-            if self.tiempo_actual > self.DURACION_SIMULACION + 10800:
-                print("⚠️  Tiempo límite alcanzado (3h extra), finalizando simulación forzadamente...")
-                # Marcar clientes restantes como atendidos (asumiendo que eventualmente serían atendidos)
-                for cliente in self.cola_espera:
-                    cliente.estado = ClienteEstado.ATENDIDO
-                    cliente.tiempo_inicio_atencion = self.tiempo_actual
-                    cliente.tiempo_fin_atencion = self.tiempo_actual + 600  # 10 min promedio
-                    self.clientes_atendidos.append(cliente)
-                self.cola_espera.clear()
-                
-                # Finalizar atenciones en curso como completadas
-                for box in self.boxes:
-                    if box.ocupado and box.cliente_actual:
-                        cliente = box.cliente_actual
-                        cliente.estado = ClienteEstado.ATENDIDO
-                        cliente.tiempo_fin_atencion = self.tiempo_actual
-                        self.clientes_atendidos.append(cliente)
-                        box.ocupado = False
-                        box.cliente_actual = None
-                        box.tiempo_fin_atencion = None
-                break
+        self.drenar_despues_del_cierre()
         
         tiempo_total_minutos = self.tiempo_actual // 60
         tiempo_extra_minutos = max(0, (self.tiempo_actual - self.DURACION_SIMULACION) // 60)
-        print(f"Simulación completada en {tiempo_total_minutos} minutos total (+{tiempo_extra_minutos} min extra)")
+        if mostrar_progreso:
+            print(f"Simulación completada en {tiempo_total_minutos} minutos total (+{tiempo_extra_minutos} min extra)")
+    
+    def drenar_despues_del_cierre(self):
+        """Atiende a los clientes restantes después del cierre, saltando de una finalización a la siguiente
+        
+        Tras el cierre no hay llegadas ni abandonos, así que cada box que se libera toma
+        al primero de la cola. Un heap de (fin de atención, box) procesa las finalizaciones
+        en el mismo orden que el recorrido segundo a segundo (a igual segundo, por número
+        de box), con los mismos tiempos, sorteos y eventos de animación.
+        """
+        # Segundo en el que se fuerza el cierre (máximo 3 horas adicionales)
+        limite = self.DURACION_SIMULACION + 10800 + 1
+        
+        heap = [(box.tiempo_fin_atencion, box.id) for box in self.boxes if box.ocupado]
+        heapq.heapify(heap)
+        
+        def procesar_siguiente():
+            self.tiempo_actual, box_id = heapq.heappop(heap)
+            box = self.boxes[box_id]
+            self.finalizar_atencion(box)
+            if box.ocupado:
+                heapq.heappush(heap, (box.tiempo_fin_atencion, box.id))
+        
+        while heap and heap[0][0] < limite:
+            procesar_siguiente()
+        
+        if heap:
+            # Las finalizaciones del segundo límite se procesan antes del cierre forzado
+            while heap and heap[0][0] == limite:
+                procesar_siguiente()
+            self.tiempo_actual = limite
+            self.cerrar_forzadamente()
+    
+    def cerrar_forzadamente(self):
+        """Da por atendidos a los clientes restantes al alcanzar el límite de tiempo extra"""
+        if self.mostrar_progreso:
+            print("⚠️  Tiempo límite alcanzado (3h extra), finalizando simulación forzadamente...")
+        self.eventos_animacion.append({
+            'tipo': 'cierre_forzado',
+            'tiempo': self.tiempo_actual
+        })
+        # Marcar clientes restantes como atendidos (asumiendo que eventualmente serían atendidos)
+        for cliente in self.cola_espera:
+            cliente.estado = ClienteEstado.ATENDIDO
+            cliente.tiempo_inicio_atencion = self.tiempo_actual
+            cliente.tiempo_fin_atencion = self.tiempo_actual + 600  # 10 min promedio
+            self.clientes_atendidos.append(cliente)
+        self.cola_espera.clear()
+        
+        # Finalizar atenciones en curso como completadas
+        for box in self.boxes:
+            if box.ocupado and box.cliente_actual:
+                cliente = box.cliente_actual
+                cliente.estado = ClienteEstado.ATENDIDO
+                cliente.tiempo_fin_atencion = self.tiempo_actual
+                self.clientes_atendidos.append(cliente)
+                box.ocupado = False
+                box.cliente_actual = None
+                box.tiempo_fin_atencion = None
+        self.boxes_ocupados = 0
+    
+    def continuar(self):
+        """Simula el resto de la mañana desde el estado actual (sin imprimir progreso)"""
+        if self.proximo_segundo < self.DURACION_SIMULACION:
+            self.avanzar_hasta(self.DURACION_SIMULACION - 1)
+        self.drenar_despues_del_cierre()
+    
+    def snapshot(self) -> dict:
+        """Copia completa del estado: boxes, cola, clientes, contadores, parámetros y generadores aleatorios
+        
+        La copia es independiente del simulador (se puede restaurar muchas veces) y se
+        puede enviar a otros procesos.
+        """
+        estado = {
+            'num_boxes': self.num_boxes,
+            'semilla': self.semilla,
+            'perfil_llegadas': self.perfil_llegadas,
+            'agenda': self.agenda,
+            'clases': self.clases,
+            'parametros': {nombre: valor for nombre, valor in vars(self).items() if nombre.isupper()},
+            'tiempo_actual': self.tiempo_actual,
+            'proximo_segundo': self.proximo_segundo,
+            'contador_clientes': self.contador_clientes,
+            'boxes_ocupados': self.boxes_ocupados,
+            'rng_llegadas': self.rng_llegadas.bit_generator.state,
+            'rng_atencion': self.rng_atencion.bit_generator.state,
+            'uniformes_llegada': self.uniformes_llegada[self.indice_uniforme:],
+            'eventos_animacion': list(self.eventos_animacion),
+            # Se copian juntos para conservar los mismos objetos Cliente entre listas
+            'objetos': copy.deepcopy((self.boxes, self.cola_espera, self.clientes_atendidos,
+                                      self.clientes_abandonaron, self.todos_los_clientes)),
+        }
+        return estado
+    
+    def restaurar(self, estado: dict):
+        """Vuelve al estado guardado por snapshot()"""
+        self.num_boxes = estado['num_boxes']
+        self.semilla = estado['semilla']
+        self.perfil_llegadas = estado.get('perfil_llegadas')
+        self.agenda = estado.get('agenda')
+        self.clases = estado.get('clases')
+        for nombre, valor in estado['parametros'].items():
+            setattr(self, nombre, valor)
+        self.tiempo_actual = estado['tiempo_actual']
+        self.proximo_segundo = estado['proximo_segundo']
+        self.contador_clientes = estado['contador_clientes']
+        self.boxes_ocupados = estado['boxes_ocupados']
+        self.rng_llegadas.bit_generator.state = estado['rng_llegadas']
+        self.rng_atencion.bit_generator.state = estado['rng_atencion']
+        self.uniformes_llegada = list(estado['uniformes_llegada'])
+        self.indice_uniforme = 0
+        self.eventos_animacion = list(estado['eventos_animacion'])
+        (self.boxes, self.cola_espera, self.clientes_atendidos,
+         self.clientes_abandonaron, self.todos_los_clientes) = copy.deepcopy(estado['objetos'])
+    
+    @classmethod
+    def desde_snapshot(cls, estado: dict) -> 'SimuladorAtencion':
+        """Crea un simulador nuevo a partir de un snapshot"""
+        simulador = cls(estado['num_boxes'], estado['semilla'], estado.get('perfil_llegadas'),
+                        clases=estado.get('clases'))
+        simulador.restaurar(estado)
+        return simulador
+    
+    def bifurcar(self, num_boxes: Optional[int] = None, semilla=None, **parametros) -> 'SimuladorAtencion':
+        """Crea una rama "qué pasaría si" desde el estado actual
+        
+        num_boxes cambia la cantidad de boxes desde este instante (solo se pueden quitar
+        boxes libres, y reemplaza a la agenda si la había); los boxes nuevos toman de
+        inmediato a los clientes en cola.
+        Sin semilla, la rama sigue con los mismos generadores aleatorios que el original
+        (números aleatorios comunes entre ramas); con semilla, sortea un futuro distinto.
+        Los parámetros en mayúsculas (ej: PERDIDA_CLIENTE) reemplazan a los actuales.
+        """
+        rama = SimuladorAtencion.desde_snapshot(self.snapshot())
+        
+        for nombre, valor in parametros.items():
+            if not nombre.isupper() or not hasattr(rama, nombre):
+                raise ValueError(f"Parámetro desconocido: {nombre}")
+            setattr(rama, nombre, valor)
+        
+        if semilla is not None:
+            rama.semilla = semilla
+            rama.rng_llegadas, rama.rng_atencion = crear_generadores(semilla)
+            rama.uniformes_llegada = []
+            rama.indice_uniforme = 0
+        
+        if num_boxes is not None and (num_boxes != rama.num_boxes or rama.agenda is not None):
+            rama.agenda = None  # Desde la bifurcación la cantidad de boxes queda fija
+            if num_boxes < rama.num_boxes:
+                sobrantes = rama.boxes[num_boxes:]
+                if any(box.ocupado for box in sobrantes):
+                    raise ValueError("Solo se pueden cerrar boxes libres: hay boxes ocupados entre los que se quitan")
+                rama.boxes = rama.boxes[:num_boxes]
+            else:
+                rama.boxes.extend(Box(i) for i in range(rama.num_boxes, num_boxes))
+            rama.num_boxes = num_boxes
+            
+            # Los boxes recién abiertos atienden a la cola desde este instante
+            for box in rama.boxes:
+                if not rama.cola_espera:
+                    break
+                if not box.ocupado:
+                    rama.asignar_cliente_a_box(rama.cola_espera.extraer(), box)
+        
+        return rama
     
     def obtener_estadisticas(self) -> dict:
         """Calcula y retorna las estadísticas de la simulación"""
@@ -281,12 +737,9 @@ class SimuladorAtencion:
         tiempo_min_espera = min(tiempos_espera) if tiempos_espera else 0
         tiempo_max_espera = max(tiempos_espera) if tiempos_espera else 0
         
-        # Costos
-        costo_boxes = self.num_boxes * self.COSTO_BOX
-        costo_perdidas = clientes_no_atendidos * self.PERDIDA_CLIENTE
-        costo_total = costo_boxes + costo_perdidas
+        costo_boxes, costo_perdidas, costo_total = self.calcular_costos()
         
-        return {
+        stats = {
             'clientes_ingresaron': clientes_ingresaron,
             'clientes_atendidos': clientes_atendidos,
             'clientes_no_atendidos': clientes_no_atendidos,
@@ -302,6 +755,39 @@ class SimuladorAtencion:
             'tiempo_min_espera_min': tiempo_min_espera // 60,
             'tiempo_max_espera_min': tiempo_max_espera // 60
         }
+        if self.clases is not None:
+            stats['por_clase'] = self.estadisticas_por_clase()
+        return stats
+    
+    def calcular_costos(self) -> Tuple[int, int, int]:
+        """Costo de boxes, pérdidas por abandono y costo total hasta el momento"""
+        # Con agenda, cada box se paga por los bloques en que está abierto
+        if self.agenda is None:
+            costo_boxes = self.num_boxes * self.COSTO_BOX
+        else:
+            costo_boxes = round(self.COSTO_BOX * sum(self.agenda) / len(self.agenda))
+        if self.clases is None:
+            costo_perdidas = len(self.clientes_abandonaron) * self.PERDIDA_CLIENTE
+        else:
+            costo_perdidas = sum(self.clases[c.clase].perdida_cliente for c in self.clientes_abandonaron)
+        return costo_boxes, costo_perdidas, costo_boxes + costo_perdidas
+    
+    def estadisticas_por_clase(self) -> dict:
+        """Clientes, esperas y pérdidas de cada clase de cliente"""
+        resultado = {}
+        for indice, clase in enumerate(self.clases):
+            atendidos = [c for c in self.clientes_atendidos if c.clase == indice]
+            abandonaron = [c for c in self.clientes_abandonaron if c.clase == indice]
+            esperas = [c.tiempo_espera for c in atendidos + abandonaron]
+            resultado[clase.nombre] = {
+                'clientes_ingresaron': sum(1 for c in self.todos_los_clientes if c.clase == indice),
+                'clientes_atendidos': len(atendidos),
+                'clientes_no_atendidos': len(abandonaron),
+                'tiempo_medio_espera_seg': sum(esperas) / len(esperas) if esperas else 0,
+                'tiempo_max_espera_seg': max(esperas) if esperas else 0,
+                'costo_perdidas': len(abandonaron) * clase.perdida_cliente,
+            }
+        return resultado
     
     def imprimir_estadisticas(self):
         """Imprime las estadísticas de forma legible"""
@@ -332,4 +818,150 @@ class SimuladorAtencion:
         print(f"8) Costo total de operación: ${stats['costo_total']:,}")
         print(f"   - Costo de boxes: ${stats['costo_boxes']:,}")
         print(f"   - Pérdidas por clientes: ${stats['costo_perdidas']:,}")
+        
+        if 'por_clase' in stats:
+            print("\nPor clase de cliente:")
+            for nombre, datos in stats['por_clase'].items():
+                print(f"   - {nombre}: {datos['clientes_ingresaron']} ingresaron, "
+                      f"{datos['clientes_atendidos']} atendidos, {datos['clientes_no_atendidos']} abandonaron, "
+                      f"espera media {datos['tiempo_medio_espera_seg'] / 60:.1f} min "
+                      f"(máx {datos['tiempo_max_espera_seg'] // 60} min), "
+                      f"pérdidas ${datos['costo_perdidas']:,}")
         print("="*50)
+
+
+def _simular_rama(estado: dict, variante: dict) -> dict:
+    """Ejecuta una rama en un proceso de trabajo y devuelve sus estadísticas"""
+    rama = SimuladorAtencion.desde_snapshot(estado).bifurcar(**variante)
+    rama.continuar()
+    estadisticas = rama.obtener_estadisticas()
+    estadisticas['num_boxes'] = rama.num_boxes
+    return estadisticas
+
+def simular_ramas(estado: dict, variantes: List[dict], workers: Optional[int] = None) -> List[dict]:
+    """Simula en paralelo el resto de la mañana para cada variante (argumentos de bifurcar) de un snapshot"""
+    if workers == 1 or len(variantes) == 1:
+        return [_simular_rama(estado, variante) for variante in variantes]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_simular_rama, [estado] * len(variantes), variantes))
+
+
+class ReproductorTraza(SimuladorAtencion):
+    """Reconstruye el estado de una simulación ya ejecutada a partir de sus eventos de animación"""
+    
+    def __init__(self, simulador: SimuladorAtencion):
+        super().__init__(simulador.num_boxes, simulador.semilla, clases=simulador.clases)
+        
+        # Copiar la configuración (constantes en mayúsculas) del simulador original
+        for nombre, valor in vars(simulador).items():
+            if nombre.isupper():
+                setattr(self, nombre, valor)
+        
+        self.eventos = simulador.eventos_animacion
+        self.tiempo_final = simulador.tiempo_actual
+        self.indice_evento = 0
+        self.clientes_por_id = {}
+    
+    def avanzar_hasta(self, tiempo: int):
+        """Aplica todos los eventos ocurridos hasta el segundo indicado (inclusive)"""
+        while (self.indice_evento < len(self.eventos) and
+               self.eventos[self.indice_evento]['tiempo'] <= tiempo):
+            self.aplicar_evento(self.eventos[self.indice_evento])
+            self.indice_evento += 1
+        self.tiempo_actual = tiempo
+    
+    def snapshot(self) -> dict:
+        """Estado reconstruido hasta ahora más los eventos de la traza que faltan aplicar"""
+        estado = super().snapshot()
+        estado['eventos'] = self.eventos[self.indice_evento:]
+        estado['tiempo_final'] = self.tiempo_final
+        return estado
+    
+    def restaurar(self, estado: dict):
+        """Vuelve al estado guardado por snapshot(), con la traza en el mismo punto"""
+        super().restaurar(estado)
+        self.eventos = list(estado['eventos'])
+        self.tiempo_final = estado['tiempo_final']
+        self.indice_evento = 0
+        self.clientes_por_id = {cliente.id: cliente for cliente in self.todos_los_clientes}
+    
+    @classmethod
+    def desde_snapshot(cls, estado: dict) -> 'ReproductorTraza':
+        """Crea un reproductor a partir de un snapshot (por ejemplo, en otro proceso)"""
+        reproductor = cls.__new__(cls)
+        SimuladorAtencion.__init__(reproductor, estado['num_boxes'], estado['semilla'],
+                                   estado.get('perfil_llegadas'), clases=estado.get('clases'))
+        reproductor.restaurar(estado)
+        return reproductor
+    
+    def proximo_evento(self) -> Optional[int]:
+        """Segundo del próximo evento de la traza que aún no se aplicó"""
+        if self.indice_evento < len(self.eventos):
+            return self.eventos[self.indice_evento]['tiempo']
+        return None
+    
+    def aplicar_evento(self, evento: dict):
+        """Aplica un evento de la traza sobre el estado reconstruido"""
+        tipo = evento['tipo']
+        
+        if tipo == 'llegada_cliente':
+            cliente = Cliente(id=evento['cliente_id'], tiempo_llegada=evento['tiempo'],
+                              clase=evento.get('clase', 0))
+            self.clientes_por_id[cliente.id] = cliente
+            self.todos_los_clientes.append(cliente)
+            self.cola_espera.agregar(cliente)
+            
+        elif tipo == 'inicio_atencion':
+            cliente = self.clientes_por_id[evento['cliente_id']]
+            self.quitar_de_cola(cliente)
+            cliente.estado = ClienteEstado.SIENDO_ATENDIDO
+            cliente.tiempo_inicio_atencion = evento['tiempo']
+            cliente.box_asignado = evento['box_id']
+            
+            box = self.boxes[evento['box_id']]
+            box.ocupado = True
+            box.cliente_actual = cliente
+            box.tiempo_fin_atencion = evento.get('tiempo_fin')
+            self.boxes_ocupados += 1
+            
+        elif tipo == 'fin_atencion':
+            cliente = self.clientes_por_id[evento['cliente_id']]
+            cliente.estado = ClienteEstado.ATENDIDO
+            cliente.tiempo_fin_atencion = evento['tiempo']
+            self.clientes_atendidos.append(cliente)
+            
+            box = self.boxes[evento['box_id']]
+            box.ocupado = False
+            box.cliente_actual = None
+            box.tiempo_fin_atencion = None
+            self.boxes_ocupados -= 1
+            
+        elif tipo == 'abandono':
+            cliente = self.clientes_por_id[evento['cliente_id']]
+            self.quitar_de_cola(cliente)
+            cliente.estado = ClienteEstado.ABANDONO
+            cliente.tiempo_abandono = evento['tiempo']
+            self.clientes_abandonaron.append(cliente)
+            
+        elif tipo == 'cierre_forzado':
+            # Mismo tratamiento que el cierre forzado de simular()
+            for cliente in self.cola_espera:
+                cliente.estado = ClienteEstado.ATENDIDO
+                cliente.tiempo_inicio_atencion = evento['tiempo']
+                cliente.tiempo_fin_atencion = evento['tiempo'] + 600
+                self.clientes_atendidos.append(cliente)
+            self.cola_espera.clear()
+            for box in self.boxes:
+                if box.ocupado and box.cliente_actual:
+                    box.cliente_actual.estado = ClienteEstado.ATENDIDO
+                    box.cliente_actual.tiempo_fin_atencion = evento['tiempo']
+                    self.clientes_atendidos.append(box.cliente_actual)
+                    box.ocupado = False
+                    box.cliente_actual = None
+                    box.tiempo_fin_atencion = None
+            self.boxes_ocupados = 0
+    
+    def quitar_de_cola(self, cliente: Cliente):
+        """Quita un cliente de la cola (casi siempre es el primero de su clase)"""
+        if cliente in self.cola_espera:
+            self.cola_espera.quitar(cliente)
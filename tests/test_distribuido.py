@@ -0,0 +1,61 @@
+"""Pruebas del coordinador y los trabajadores TCP sobre localhost"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from distribuido import Coordinador
+from lote import METRICAS, ejecutar_lote
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def iniciar_trabajador(puerto: int) -> subprocess.Popen:
+    entorno = dict(os.environ, MPLBACKEND='Agg', SDL_VIDEODRIVER='dummy')
+    return subprocess.Popen([sys.executable, 'main.py', '--worker', f'127.0.0.1:{puerto}'], cwd=RAIZ,
+                            env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+@pytest.mark.parametrize('muestreo', ['independiente', 'antitetico', 'sobol'])
+def test_trabajadores_con_una_caida_dan_el_mismo_lote(muestreo):
+    configuraciones = [2, 4, (2, 3, 4, 5, 5, 4, 3, 2)]
+    primera_unidad = threading.Event()
+    coordinador = Coordinador(configuraciones, 120, 7, tamano_unidad=10, muestreo=muestreo,
+                              callback_progreso=lambda completadas, total: primera_unidad.set())
+    resultado = {}
+    hilo = threading.Thread(target=lambda: resultado.update(lote=asyncio.run(coordinador.ejecutar('127.0.0.1', 0))),
+                            daemon=True)
+    hilo.start()
+    trabajadores = []
+    try:
+        limite = time.monotonic() + 30
+        while coordinador.puerto is None:
+            assert hilo.is_alive() and time.monotonic() < limite, "El coordinador no arrancó"
+            time.sleep(0.01)
+
+        # El primero entrega una unidad y se cae con la siguiente en curso
+        trabajadores.append(iniciar_trabajador(coordinador.puerto))
+        assert primera_unidad.wait(60), "Ningún trabajador entregó una unidad"
+        trabajadores[0].kill()
+        trabajadores += [iniciar_trabajador(coordinador.puerto) for _ in range(2)]
+
+        hilo.join(120)
+        assert not hilo.is_alive(), "El lote distribuido no terminó"
+        for trabajador in trabajadores[1:]:
+            assert trabajador.wait(30) == 0
+    finally:
+        for trabajador in trabajadores:
+            if trabajador.poll() is None:
+                trabajador.kill()
+        hilo.join(5)
+
+    assert coordinador.reasignadas >= 1
+    esperado = ejecutar_lote(configuraciones, 120, 7, muestreo=muestreo)
+    for nombre in METRICAS:
+        np.testing.assert_array_equal(resultado['lote'].metricas[nombre], esperado.metricas[nombre], err_msg=nombre)
@@ -0,0 +1,123 @@
+"""Pruebas del servicio de trabajos sobre localhost"""
+
+import asyncio
+import json
+
+import pytest
+
+from servicio import ServicioSimulacion
+
+
+async def pedir(puerto: int, metodo: str, ruta: str, datos=None):
+    """Una petición HTTP al servicio; devuelve el código y el cuerpo JSON"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+    cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b''
+    writer.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(cuerpo)}\r\n\r\n"
+                 .encode('latin-1') + cuerpo)
+    await writer.drain()
+    respuesta = await reader.read()
+    writer.close()
+    encabezados, _, contenido = respuesta.partition(b"\r\n\r\n")
+    return int(encabezados.split()[1]), json.loads(contenido) if contenido else None
+
+
+async def eventos(puerto: int, id_trabajo: int) -> list:
+    """Lee /trabajos/<id>/eventos hasta el evento final"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', puerto)
+    writer.write(f"GET /trabajos/{id_trabajo}/eventos HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    while (await reader.readline()).strip():
+        pass  # Encabezados
+    leidos = []
+    while True:
+        linea = await asyncio.wait_for(reader.readline(), 60)
+        assert linea, "El servicio cerró el flujo antes del evento final"
+        leidos.append(json.loads(linea))
+        if leidos[-1]['evento'] in ('terminado', 'error'):
+            break
+    writer.close()
+    return leidos
+
+
+def con_servicio(escenario, **opciones):
+    """Corre escenario(servicio, puerto) con el servicio escuchando en un puerto libre"""
+    async def principal():
+        servicio = ServicioSimulacion(**opciones)
+        tarea = asyncio.ensure_future(servicio.servir('127.0.0.1', 0))
+        while servicio.puerto is None:
+            assert not tarea.done(), tarea.exception()
+            await asyncio.sleep(0.01)
+        try:
+            return await escenario(servicio, servicio.puerto)
+        finally:
+            tarea.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarea
+    return asyncio.run(principal())
+
+
+@pytest.mark.parametrize('datos', [
+    {'configuraciones': [[1, 2]], 'parametros': {'duracion_bloque': 0}},
+    {'boxes': 2, 'parametros': {'prob_llegada': -1}},
+    {'boxes': 2, 'parametros': {'prob_llegada': 1.5}},
+    {'boxes': 2, 'parametros': {'duracion': 0}},
+    {'boxes': 2, 'parametros': {'media_atencion': 0}},
+    {'boxes': 2, 'parametros': {'desvio_atencion': -1}},
+    {'boxes': 2, 'parametros': {'tiempo_max_espera': -1}},
+    {'boxes': 2, 'parametros': {'duracion': 'mucho'}},
+    {'boxes': 0},
+    {'boxes': 2, 'replicas': 0},
+])
+def test_pedido_invalido_da_400(datos):
+    async def escenario(servicio, puerto):
+        codigo, respuesta = await pedir(puerto, 'POST', '/trabajos', datos)
+        assert codigo == 400
+        assert 'error' in respuesta
+        assert not servicio.trabajos
+    con_servicio(escenario, workers=1)
+
+
+def test_pedidos_identicos_se_calculan_una_vez():
+    pedido = {'configuraciones': [2, 3], 'replicas': 60, 'semilla': 3, 'usuario': 'ana'}
+
+    async def escenario(servicio, puerto):
+        _, primero = await pedir(puerto, 'POST', '/trabajos', pedido)
+        _, segundo = await pedir(puerto, 'POST', '/trabajos', dict(pedido, usuario='beto'))
+        assert segundo['id'] == primero['id'] or segundo['desde_cache']
+
+        final = (await eventos(puerto, primero['id']))[-1]
+        assert final['evento'] == 'terminado'
+        assert final['resultado']['replicas'] == 60
+
+        codigo, tercero = await pedir(puerto, 'POST', '/trabajos', pedido)
+        assert codigo == 202
+        assert tercero['desde_cache'] and tercero['estado'] == 'terminado'
+        assert tercero['resultado'] == final['resultado']
+    con_servicio(escenario, workers=2, tamano_unidad=10)
+
+
+def test_turnos_entre_usuarios():
+    servicio = ServicioSimulacion(workers=1, tamano_unidad=10)
+    servicio.enviar({'boxes': 2, 'replicas': 40, 'usuario': 'ana'})
+    servicio.enviar({'boxes': 3, 'replicas': 20, 'usuario': 'beto'})
+    orden = []
+    while (siguiente := servicio.siguiente_unidad()) is not None:
+        orden.append(siguiente[0].usuario)
+    assert orden == ['ana', 'beto', 'ana', 'beto', 'ana', 'ana']
+
+
+def test_trabajo_chico_no_espera_al_grande():
+    async def escenario(servicio, puerto):
+        _, grande = await pedir(puerto, 'POST', '/trabajos', {'boxes': 2, 'replicas': 400, 'usuario': 'ana'})
+        _, chico = await pedir(puerto, 'POST', '/trabajos', {'boxes': 3, 'replicas': 10, 'usuario': 'beto'})
+
+        leidos = await eventos(puerto, chico['id'])
+        assert leidos[-1]['evento'] == 'terminado'
+        _, estado = await pedir(puerto, 'GET', f"/trabajos/{grande['id']}")
+        assert estado['completadas'] < estado['total']
+
+        leidos = await eventos(puerto, grande['id'])
+        progreso = [e for e in leidos if e['evento'] == 'progreso']
+        assert progreso and all(len(e['costo_total_parcial']) == 1 for e in progreso)
+        assert leidos[-1]['evento'] == 'terminado'
+    con_servicio(escenario, workers=1, tamano_unidad=5)
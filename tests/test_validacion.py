@@ -0,0 +1,34 @@
+"""Pruebas de los motores alternativos contra el simulador de referencia"""
+
+import numpy as np
+import pytest
+
+from motor_eventos import ParametrosSimulacion, muestrear_camino, simular_camino_varios
+from nucleo_jit import simular_camino_jit
+from validacion import CAMPOS, PuntoValidacion, validar_motores
+
+CONFIGURACIONES = [2, 4, (2, 3, 4, 5, 5, 4, 3, 2)]
+
+
+def test_validar_motores():
+    puntos = [
+        PuntoValidacion('base', ParametrosSimulacion(), [2, 5]),
+        PuntoValidacion('agenda', ParametrosSimulacion(), [(2, 3, 4, 5, 5, 4, 3, 2)]),
+    ]
+    resultado = validar_motores(replicas=8, semilla=0, puntos=puntos)
+    assert resultado.ok, [(c.punto, c.configuracion, c.motor) for c in resultado.divergencias]
+
+
+@pytest.mark.parametrize('semilla', [0, 7, 2024])
+def test_motores_rapidos_iguales_al_simulador(semilla):
+    parametros = ParametrosSimulacion()
+    camino = muestrear_camino(parametros, np.random.SeedSequence(semilla))
+    una_pasada = simular_camino_varios(camino, CONFIGURACIONES, parametros)
+    for configuracion, rapido in zip(CONFIGURACIONES, una_pasada):
+        simulador = parametros.crear_simulador(configuracion, np.random.SeedSequence(semilla))
+        simulador.simular(mostrar_progreso=False)
+        referencia = simulador.obtener_estadisticas()
+        jit = simular_camino_jit(camino, configuracion, parametros)
+        for campo in CAMPOS:
+            assert rapido[campo] == referencia[campo], campo
+            assert jit[campo] == referencia[campo], campo
@@ -0,0 +1,253 @@
+"""
+Validación de los motores alternativos contra el simulador de referencia
+
+Corre SimuladorAtencion.simular() (el bucle segundo a segundo) y cada motor
+alternativo sobre muchas réplicas con semilla, en varios puntos de parámetros:
+
+- Los motores que consumen los mismos generadores que la referencia (motor rápido,
+  una pasada para todas las cantidades de boxes, núcleo compilado, lotes, clases con
+  una sola clase) deben dar exactamente las mismas estadísticas en cada réplica.
+- Los que sortean de otra forma (pares antitéticos, Sobol, la red de sucursales
+  vectorizada) deben dar las mismas distribuciones: cada campo de
+  obtener_estadisticas() se compara con las pruebas de Kolmogorov-Smirnov y
+  Mann-Whitney y con una banda de tolerancia para la media.
+
+El nivel de las pruebas se reparte (Bonferroni) entre todas las que se hacen, así
+una corrida sin errores se marca como divergente con probabilidad a lo sumo alfa.
+"""
+
+import warnings
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from scipy import stats
+
+from lote import Configuracion, ejecutar_lote
+from motor_eventos import ParametrosSimulacion, simular_camino_varios, simular_rapido, muestrear_camino
+from nucleo_jit import simular_camino_jit
+from perfil_llegadas import PerfilLlegadas
+from red_sucursales import Sucursal, simular_red
+from simulador import ClaseCliente
+
+# Campos de obtener_estadisticas() (los *_min son los *_seg divididos por 60)
+CAMPOS = (
+    'clientes_ingresaron', 'clientes_atendidos', 'clientes_no_atendidos',
+    'tiempo_min_atencion_seg', 'tiempo_max_atencion_seg',
+    'tiempo_min_espera_seg', 'tiempo_max_espera_seg',
+    'costo_boxes', 'costo_perdidas', 'costo_total',
+    'tiempo_min_atencion_min', 'tiempo_max_atencion_min',
+    'tiempo_min_espera_min', 'tiempo_max_espera_min',
+)
+
+
+@dataclass
+class PuntoValidacion:
+    """Parámetros del modelo y configuraciones con que se comparan los motores"""
+    nombre: str
+    parametros: ParametrosSimulacion
+    configuraciones: List[Configuracion]
+
+
+@dataclass
+class Comparacion:
+    """Resultado de comparar un motor con la referencia en un punto y una configuración"""
+    punto: str
+    configuracion: Configuracion
+    motor: str
+    exacta: bool                   # True: réplica por réplica; False: por distribución
+    replicas: int
+    replicas_distintas: int = 0    # Solo exactas: réplicas con algún campo distinto
+    campos_divergentes: List[str] = field(default_factory=list)
+    pruebas: Dict[str, dict] = field(default_factory=dict)  # Por campo: p-valores, medias y banda
+
+    @property
+    def ok(self) -> bool:
+        return self.replicas_distintas == 0 and not self.campos_divergentes
+
+
+@dataclass
+class ResultadoValidacion:
+    comparaciones: List[Comparacion]
+    alfa: float
+
+    @property
+    def divergencias(self) -> List[Comparacion]:
+        return [c for c in self.comparaciones if not c.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.divergencias
+
+
+def puntos_por_defecto() -> List[PuntoValidacion]:
+    """Modelo del enunciado, paciencia corta, demanda alta (con cierres forzados), perfil y agenda"""
+    return [
+        PuntoValidacion('base', ParametrosSimulacion(), [2, 4, 6]),
+        PuntoValidacion('paciencia corta', ParametrosSimulacion(tiempo_max_espera=10 * 60), [3, 5]),
+        PuntoValidacion('demanda alta', ParametrosSimulacion(prob_llegada=1/45, desvio_atencion=8 * 60), [2, 6]),
+        PuntoValidacion('perfil con pico', ParametrosSimulacion(perfil_llegadas=PerfilLlegadas([16, 24, 36, 24],
+                                                                                                suavizar=True)),
+                        [4, 6]),
+        PuntoValidacion('agenda', ParametrosSimulacion(), [(2, 3, 4, 5, 5, 4, 3, 2)]),
+    ]
+
+
+def comparar_exacto(referencia: List[dict], alternativa: List[dict], campos=CAMPOS) -> int:
+    """Cantidad de réplicas en que algún campo difiere"""
+    return sum(any(ref[campo] != alt[campo] for campo in campos) for ref, alt in zip(referencia, alternativa))
+
+
+def comparar_distribuciones(referencia: Dict[str, np.ndarray], alternativa: Dict[str, np.ndarray],
+                            alfa_prueba: float) -> Dict[str, dict]:
+    """Pruebas de dos muestras por campo; 'divergente' si alguna rechaza al nivel alfa_prueba
+
+    La banda de la media es z · el error estándar de la diferencia de medias (como si
+    las réplicas fueran independientes: con muestreos que reducen varianza la banda
+    queda holgada).
+    """
+    z = stats.norm.ppf(1 - alfa_prueba / 2)
+    resultado = {}
+    for campo, ref in referencia.items():
+        alt = alternativa[campo]
+        diferencia = float(alt.mean() - ref.mean())
+        banda = float(z * np.sqrt(ref.var(ddof=1) / len(ref) + alt.var(ddof=1) / len(alt)))
+        if np.ptp(ref) == 0 and np.ptp(alt) == 0:
+            # Campos constantes (por ejemplo el costo de boxes): deben coincidir
+            p_ks = p_mw = 1.0 if ref[0] == alt[0] else 0.0
+        else:
+            p_ks = float(stats.ks_2samp(ref, alt).pvalue)
+            p_mw = float(stats.mannwhitneyu(ref, alt, alternative='two-sided').pvalue)
+        resultado[campo] = {
+            'p_ks': p_ks,
+            'p_mw': p_mw,
+            'media_referencia': float(ref.mean()),
+            'media_alternativa': float(alt.mean()),
+            'banda': banda,
+            'divergente': min(p_ks, p_mw) < alfa_prueba or abs(diferencia) > banda,
+        }
+    return resultado
+
+
+def _clase_unica(parametros: ParametrosSimulacion) -> List[ClaseCliente]:
+    return [ClaseCliente('unica', prioridad=0, prob_llegada=parametros.prob_llegada,
+                         media_atencion=parametros.media_atencion, desvio_atencion=parametros.desvio_atencion,
+                         tiempo_max_espera=parametros.tiempo_max_espera,
+                         perdida_cliente=parametros.perdida_cliente)]
+
+
+def _como_arrays(registros: List[dict]) -> Dict[str, np.ndarray]:
+    return {campo: np.array([r[campo] for r in registros], dtype=float) for campo in CAMPOS}
+
+
+def _admite_red(punto: PuntoValidacion) -> bool:
+    """La red de sucursales usa tasas constantes y cantidades fijas de boxes"""
+    return (punto.parametros.perfil_llegadas is None and
+            all(isinstance(c, (int, np.integer)) for c in punto.configuraciones))
+
+
+def _registros_lote(lote, i: int) -> List[dict]:
+    """Réplicas de la configuración i de un lote (o la sucursal i de una red), con los campos de obtener_estadisticas()"""
+    registros = []
+    for r in range(lote.replicas):
+        registro = {nombre: valores[i, r].item() for nombre, valores in lote.metricas.items()}
+        for unidad in ('atencion', 'espera'):
+            for extremo in ('min', 'max'):
+                registro[f'tiempo_{extremo}_{unidad}_min'] = registro[f'tiempo_{extremo}_{unidad}_seg'] // 60
+        registros.append(registro)
+    return registros
+
+
+def validar_motores(replicas: int = 100, semilla=0, puntos: Optional[List[PuntoValidacion]] = None,
+                    alfa: float = 0.01,
+                    callback_progreso: Optional[Callable[[Comparacion], None]] = None) -> ResultadoValidacion:
+    """Compara todos los motores con la referencia en cada punto; ver el docstring del módulo
+
+    La réplica r usa la semilla SeedSequence(semilla).spawn(replicas)[r] en la
+    referencia y en los motores exactos; los muestreos antitético y Sobol usan otra
+    semilla derivada, así sus réplicas son independientes de las de referencia.
+    """
+    if puntos is None:
+        puntos = puntos_por_defecto()
+    entropia = np.random.SeedSequence(semilla).entropy
+    semillas = np.random.SeedSequence(entropia).spawn(replicas)
+    semilla_alternativa = [entropia, 1]
+
+    # Cantidad total de pruebas de distribución, para repartir alfa
+    muestreos = ('antitetico', 'sobol')
+    comparaciones_distribucion = sum(len(p.configuraciones) * (len(muestreos) + _admite_red(p)) for p in puntos)
+    total_pruebas = comparaciones_distribucion * len(CAMPOS)
+    alfa_prueba = alfa / total_pruebas
+
+    comparaciones = []
+
+    def agregar(comparacion: Comparacion):
+        comparaciones.append(comparacion)
+        if callback_progreso is not None:
+            callback_progreso(comparacion)
+
+    for punto in puntos:
+        parametros = punto.parametros
+        configuraciones = punto.configuraciones
+        referencia = []
+        for configuracion in configuraciones:
+            registros = []
+            for semilla_replica in semillas:
+                simulador = parametros.crear_simulador(configuracion, semilla_replica)
+                simulador.simular(mostrar_progreso=False)
+                registros.append(simulador.obtener_estadisticas())
+            referencia.append(registros)
+
+        # Motores exactos: mismas semillas, mismas estadísticas réplica por réplica
+        exactos = {
+            'rapido': [[simular_rapido(c, s, parametros) for s in semillas] for c in configuraciones],
+        }
+        una_pasada = [simular_camino_varios(muestrear_camino(parametros, s), configuraciones, parametros)
+                      for s in semillas]
+        exactos['una_pasada'] = [[fila[i] for fila in una_pasada] for i in range(len(configuraciones))]
+        exactos['jit'] = [[simular_camino_jit(muestrear_camino(parametros, s), c, parametros) for s in semillas]
+                          for c in configuraciones]
+        lote = ejecutar_lote(configuraciones, replicas, entropia, parametros)
+        exactos['lote'] = [_registros_lote(lote, i) for i in range(len(configuraciones))]
+        if parametros.perfil_llegadas is None:
+            clases = _clase_unica(parametros)
+            registros_clases = []
+            for configuracion in configuraciones:
+                registros = []
+                for semilla_replica in semillas:
+                    simulador = parametros.crear_simulador(configuracion, semilla_replica, clases=clases)
+                    simulador.simular(mostrar_progreso=False)
+                    registros.append(simulador.obtener_estadisticas())
+                registros_clases.append(registros)
+            exactos['clases'] = registros_clases
+
+        for motor, por_configuracion in exactos.items():
+            for i, configuracion in enumerate(configuraciones):
+                distintas = comparar_exacto(referencia[i], por_configuracion[i])
+                agregar(Comparacion(punto.nombre, configuracion, motor, True, replicas, replicas_distintas=distintas))
+
+        # Motores con otro sorteo: mismas distribuciones
+        for muestreo in muestreos:
+            lote = ejecutar_lote(configuraciones, replicas, semilla_alternativa, parametros, muestreo=muestreo)
+            for i, configuracion in enumerate(configuraciones):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    pruebas = comparar_distribuciones(_como_arrays(referencia[i]),
+                                                      _como_arrays(_registros_lote(lote, i)), alfa_prueba)
+                divergentes = [campo for campo, prueba in pruebas.items() if prueba['divergente']]
+                agregar(Comparacion(punto.nombre, configuracion, muestreo, False, replicas,
+                                    campos_divergentes=divergentes, pruebas=pruebas))
+
+        # Red de sucursales: una sucursal por configuración, con los parámetros del punto
+        if _admite_red(punto):
+            sucursales = [Sucursal.desde_parametros(str(c), c, parametros) for c in configuraciones]
+            red = simular_red(sucursales, replicas, [entropia, 2], parametros)
+            for i, configuracion in enumerate(configuraciones):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    pruebas = comparar_distribuciones(_como_arrays(referencia[i]),
+                                                      _como_arrays(_registros_lote(red, i)), alfa_prueba)
+                divergentes = [campo for campo, prueba in pruebas.items() if prueba['divergente']]
+                agregar(Comparacion(punto.nombre, configuracion, 'red', False, replicas,
+                                    campos_divergentes=divergentes, pruebas=pruebas))
+
+    return ResultadoValidacion(comparaciones, alfa)
@@ -0,0 +1,103 @@
+"""
+Estimadores con variables de control
+
+Buena parte de la variación del costo entre réplicas se explica por cuántos clientes
+llegaron y cuánto trabajo trajeron, dos cantidades cuyo valor esperado se conoce
+(con p = 1/144, 14.400 segundos dan 100 clientes esperados). El estimador con
+variables de control corrige el promedio de cada métrica por la diferencia entre lo
+que llegó y lo esperado, con el coeficiente de la regresión estimado en cada
+configuración: Y_vc = media(Y) - beta · (media(C) - E[C]).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from scipy import stats
+
+from lote import ResultadoLote
+from motor_eventos import ParametrosSimulacion
+
+CONTROLES = ('clientes_ingresaron', 'trabajo_ofrecido_seg')
+
+
+@dataclass
+class EstimacionControl:
+    """Promedio ajustado por variables de control, con su intervalo de confianza"""
+    media: float
+    error_estandar: float
+    semiancho: float
+    beta: np.ndarray
+    media_sin_control: float
+    error_sin_control: float
+    semiancho_sin_control: float
+
+    @property
+    def reduccion_varianza(self) -> float:
+        """Cuántas veces menos varianza que el promedio simple"""
+        if self.error_estandar == 0:
+            return float('inf') if self.error_sin_control > 0 else 1.0
+        return (self.error_sin_control / self.error_estandar) ** 2
+
+
+def atencion_esperada(parametros: ParametrosSimulacion) -> float:
+    """E[max(int(X), 30)] con X normal: la duración media de atención que sortea el modelo"""
+    media, desvio = parametros.media_atencion, parametros.desvio_atencion
+    enteros = np.arange(31, int(media + 12 * desvio) + 2)
+    probabilidades = stats.norm.cdf(enteros + 1, media, desvio) - stats.norm.cdf(enteros, media, desvio)
+    return float(30 * stats.norm.cdf(31, media, desvio) + np.sum(enteros * probabilidades))
+
+
+def valores_esperados(parametros: Optional[ParametrosSimulacion] = None) -> Dict[str, float]:
+    """Valor esperado conocido de cada variable de control"""
+    if parametros is None:
+        parametros = ParametrosSimulacion()
+    if parametros.perfil_llegadas is None:
+        clientes = parametros.duracion * parametros.prob_llegada
+    else:
+        clientes = parametros.perfil_llegadas.clientes_esperados(parametros.duracion)
+    return {'clientes_ingresaron': clientes,
+            'trabajo_ofrecido_seg': clientes * atencion_esperada(parametros)}
+
+
+def estimar_con_controles(y: np.ndarray, controles: np.ndarray, esperados: np.ndarray,
+                          nivel: float = 0.95) -> EstimacionControl:
+    """Estimador de regresión: y sobre las columnas de 'controles', cuyas medias son 'esperados'
+
+    El error estándar incluye la incertidumbre de haber estimado beta con las mismas
+    réplicas, con n - q - 1 grados de libertad.
+    """
+    y = np.asarray(y, dtype=float)
+    controles = np.asarray(controles, dtype=float).reshape(len(y), -1)
+    n, q = controles.shape
+    media_y = y.mean()
+    error_sin_control = y.std(ddof=1) / np.sqrt(n)
+    if n <= q + 2:
+        raise ValueError(f"Se necesitan más de {q + 2} réplicas para usar {q} variables de control")
+
+    centrados = controles - controles.mean(axis=0)
+    beta, *_ = np.linalg.lstsq(centrados, y - media_y, rcond=None)
+    diferencia = controles.mean(axis=0) - esperados
+    media = media_y - diferencia @ beta
+
+    residuos = y - media_y - centrados @ beta
+    varianza_residual = residuos @ residuos / (n - q - 1)
+    correccion = diferencia @ np.linalg.pinv(centrados.T @ centrados) @ diferencia
+    error = float(np.sqrt(varianza_residual * (1 / n + correccion)))
+    semiancho = stats.t.ppf((1 + nivel) / 2, n - q - 1) * error
+    semiancho_sin_control = stats.t.ppf((1 + nivel) / 2, n - 1) * error_sin_control
+    return EstimacionControl(float(media), error, float(semiancho), beta, float(media_y),
+                             float(error_sin_control), float(semiancho_sin_control))
+
+
+def ajustar_lote(lote: ResultadoLote, metrica: str, parametros: Optional[ParametrosSimulacion] = None,
+                 controles: Sequence[str] = CONTROLES, nivel: float = 0.95) -> List[EstimacionControl]:
+    """Promedio de la métrica con variables de control para cada configuración del lote"""
+    if lote.muestreo != 'independiente':
+        raise ValueError("Las variables de control requieren réplicas independientes")
+    esperados = valores_esperados(parametros)
+    esperado = np.array([esperados[nombre] for nombre in controles])
+    resultados = []
+    for i in range(len(lote.configuraciones)):
+        columnas = np.column_stack([lote[nombre][i] for nombre in controles])
+        resultados.append(estimar_con_controles(lote[metrica][i], columnas, esperado, nivel))
+    return resultados